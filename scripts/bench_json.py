@@ -0,0 +1,119 @@
+"""Compare JSON backends on the bot's own payloads.
+
+    python scripts/bench_json.py                      # micro + event log with every installed backend
+    python scripts/bench_json.py --events 200000 --backends json orjson
+
+Micro rows time one encode/decode of a logged event, an LLM time entry answer,
+a 10-message batch answer, a journal payload (pydantic model) and a schema
+file. The event log rows write `--events` events through EventLog.append (as
+a batch import does) and read them back into compute_log_stats (as
+`cli logstats` does).
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+import timeit
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from time_bot import serialization
+from time_bot.event_log import EventLog
+from time_bot.log_stats import compute_log_stats
+from time_bot.models import TimeEntry
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "schemas" / "message_batch.json"
+SUBTAGS = ("coding", "gym", "reading", "walking", "social")
+
+
+def _event(index: int, start: datetime) -> dict:
+    return {
+        "timestamp": (start + timedelta(minutes=7 * index)).isoformat(),
+        "status": "success",
+        "kind": "time_log",
+        "raw_text": f"{index % 90 + 10} минут кодинг бота, задача №{index}",
+        "minutes": index % 90 + 10,
+        "maintag": "w1",
+        "subtag": SUBTAGS[index % len(SUBTAGS)],
+        "file_name": f"Кодинг бота {index}.md",
+        "tag_source": "llm",
+        "elapsed_ms": 812.4,
+    }
+
+
+def _entry(index: int) -> dict:
+    return {
+        "title": "Кодинг бота",
+        "minutes": 45,
+        "date": "2024-03-01",
+        "start_time": None,
+        "maintag": "w1",
+        "subtag": "coding",
+        "comment": None,
+        "raw_text": f"45 минут кодинг бота {index}",
+    }
+
+
+def payloads() -> dict[str, object]:
+    entry = _entry(0)
+    items = [{"index": i, "intent": "time_log", "time_entry": _entry(i), "task_entry": None} for i in range(10)]
+    model = TimeEntry.model_validate(entry)
+    return {
+        "event": _event(0, datetime(2024, 3, 1, tzinfo=timezone.utc)),
+        "llm time entry": entry,
+        "llm batch x10": {"items": items},
+        "journal model": model,
+        "schema file": serialization.get_backend("json").loads(SCHEMA_PATH.read_bytes()),
+    }
+
+
+def micro(backends: list[str], number: int) -> None:
+    print(f"\nmicro: µs per call, {number} calls")
+    print(f"{'payload':<16} {'backend':<8} {'dumps':>8} {'loads':>8}")
+    for name, payload in payloads().items():
+        encoded = serialization.get_backend("json").dumps_bytes(payload)
+        for backend_name in backends:
+            backend = serialization.get_backend(backend_name)
+            dumps_s = timeit.timeit(lambda: backend.dumps_bytes(payload), number=number)
+            loads_s = timeit.timeit(lambda: backend.loads(encoded), number=number)
+            print(f"{name:<16} {backend_name:<8} {dumps_s / number * 1e6:>8.2f} {loads_s / number * 1e6:>8.2f}")
+
+
+def event_log(backends: list[str], events: int) -> None:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = [_event(index, start) for index in range(events)]
+    print(f"\nevent log: {events} events")
+    print(f"{'backend':<8} {'append s':>9} {'logstats s':>11}")
+    for backend_name in backends:
+        previous = serialization.use_backend(backend_name)
+        try:
+            with tempfile.TemporaryDirectory(prefix="json-bench-") as tmp:
+                log = EventLog(Path(tmp))
+                started = time.perf_counter()
+                for row in rows:
+                    log.append(row)
+                append_s = time.perf_counter() - started
+                log.wait_for_compaction()
+
+                started = time.perf_counter()
+                stats = compute_log_stats(log.iter_events(date_from=date(2024, 1, 1)))
+                read_s = time.perf_counter() - started
+                assert stats.events == events
+        finally:
+            serialization.use_backend(previous.name)
+        print(f"{backend_name:<8} {append_s:>9.3f} {read_s:>11.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=serialization.available_backends())
+    parser.add_argument("--number", type=int, default=20_000, help="Calls per micro measurement")
+    parser.add_argument("--events", type=int, default=100_000)
+    args = parser.parse_args()
+    micro(args.backends, args.number)
+    event_log(args.backends, args.events)
+
+
+if __name__ == "__main__":
+    main()
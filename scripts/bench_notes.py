@@ -0,0 +1,132 @@
+"""Benchmark note construction and rendering for batch imports and migrations.
+
+    python scripts/bench_notes.py                 # 100k time notes
+    python scripts/bench_notes.py --notes 20000 --no-heap
+
+Rows:
+- previous: the builder and list-join renderer as they were before, kept
+  here as the baseline.
+- construct: the previous builder with TimeNote.model_construct.
+- current: build_note plus render_markdown.
+
+CPU time is per note. With tracemalloc on, the peak heap covers holding all
+notes and their Markdown, plus the block count allocated per note.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import re
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+from time_bot.models import TimeEntry, TimeNote
+from time_bot.note_builder import _sanitize_title, build_note
+from time_bot.note_renderer import render_markdown
+from time_bot.time_utils import get_now_time, get_timezone
+from time_bot.vault_layout import partition_dir
+
+SUBTAGS = ("coding", "gym", "reading", None)
+TZ = get_timezone("Europe/Moscow")
+
+
+def _previous_build(entry: TimeEntry, base_dir: Path, timezone, *, construct=TimeNote) -> TimeNote:
+    created_at = datetime.now(timezone)
+    start_or_now = entry.start_time or get_now_time(timezone)
+    safe_title = " ".join(
+        word.capitalize() for word in re.sub(r"[^0-9A-Za-zА-Яа-яЁё _-]+", "", re.sub(r"\s+", " ", entry.title.strip())).split(" ")
+    )
+    file_name = f"{safe_title} {entry.date.isoformat()} {start_or_now.strftime('%H-%M')}.md"
+    file_path = partition_dir(base_dir, entry.date, "") / file_name
+    return construct(
+        note_id=uuid.uuid4().hex, file_name=file_name, file_path=str(file_path), created_at=created_at, entry=entry
+    )
+
+
+def _previous_render(note: TimeNote) -> str:
+    entry = note.entry
+    frontmatter_lines = [
+        "---",
+        "tags:",
+        "  - time_system",
+        f"time: {entry.minutes}",
+        f"date: {entry.date.isoformat()}",
+        f"maintag: {entry.maintag}",
+    ]
+    if entry.subtag:
+        frontmatter_lines.append(f"subtag: {entry.subtag}")
+    frontmatter_lines.append("---")
+    body_lines = [entry.title, ""]
+    if entry.comment:
+        body_lines.append(entry.comment)
+        body_lines.append("")
+    body_lines.append("Исходный текст:")
+    body_lines.append(f"> {entry.raw_text}")
+    return "\n".join(frontmatter_lines) + "\n\n" + "\n".join(body_lines) + "\n"
+
+
+def make_entries(count: int) -> List[TimeEntry]:
+    start = date(2020, 1, 1)
+    return [
+        TimeEntry(
+            title=f"Кодинг бота {index}",
+            raw_text=f"{index % 90 + 10} минут кодинг бота",
+            minutes=index % 90 + 10,
+            date=start + timedelta(days=index // 40),
+            maintag="w1",
+            subtag=SUBTAGS[index % len(SUBTAGS)],
+            comment="перенос из старого журнала" if index % 3 == 0 else None,
+        )
+        for index in range(count)
+    ]
+
+
+def _measure(label: str, entries: List[TimeEntry], build: Callable, render: Callable, heap: bool) -> None:
+    base_dir = Path("/vault/time")
+    gc.collect()
+    if heap:
+        tracemalloc.start()
+    started = time.process_time()
+    notes = [build(entry, base_dir, TZ) for entry in entries]
+    built = time.process_time()
+    markdowns = [render(note) for note in notes]
+    rendered = time.process_time()
+    peak_mb = tracemalloc.get_traced_memory()[1] / 2**20 if heap else float("nan")
+    if heap:
+        tracemalloc.stop()
+    per_note = 1e6 / len(entries)
+    print(
+        f"{label:<10} {(built - started) * per_note:>8.2f} {(rendered - built) * per_note:>8.2f} "
+        f"{(rendered - started) * per_note:>8.2f} {peak_mb:>9.1f}"
+    )
+    assert len(markdowns) == len(notes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--no-heap", action="store_true", help="Skip tracemalloc (it slows allocation-heavy code)")
+    args = parser.parse_args()
+
+    entries = make_entries(args.notes)
+    for entry in entries[:4]:
+        note = build_note(entry, Path("/vault/time"), TZ)
+        assert _previous_render(note) == render_markdown(note)
+        assert note.file_name.startswith(_sanitize_title(entry.title))
+
+    def _construct(entry, base_dir, timezone):
+        return _previous_build(entry, base_dir, timezone, construct=TimeNote.model_construct)
+
+    print(f"{args.notes} time notes, µs per note")
+    print(f"{'path':<10} {'build':>8} {'render':>8} {'total':>8} {'peak MB':>9}")
+    _measure("previous", entries, _previous_build, _previous_render, not args.no_heap)
+    _measure("construct", entries, _construct, _previous_render, not args.no_heap)
+    _measure("current", entries, build_note, render_markdown, not args.no_heap)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark serial vs thread-pool vault scans on a synthetic vault.
+
+    python scripts/bench_vault_scan.py --notes 10000 100000 --workers 1 4 8 16
+    python scripts/bench_vault_scan.py --notes 10000 --latency-ms 2   # emulate a network mount
+
+`--latency-ms` adds a sleep before every note read, which is what dominates on
+SMB/NFS/cloud-synced folders; without it the numbers reflect the local disk.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+
+from time_bot.stats import _records_from_note
+from time_bot.task_reader import _parse_task_file
+from time_bot.vault_scan import iter_markdown_tree, scan_notes
+
+MAINTAGS = ("w1", "w2", "rt", "rest")
+
+
+def build_vault(root: Path, notes: int) -> tuple[Path, Path]:
+    time_dir = root / "time"
+    tasks_dir = root / "tasks"
+    time_dir.mkdir(parents=True)
+    tasks_dir.mkdir(parents=True)
+    rng = random.Random(notes)
+    start = date(2020, 1, 1)
+    for index in range(notes):
+        day = start + timedelta(days=index // 40)
+        (time_dir / f"Note {index} {day.isoformat()} 10-00.md").write_text(
+            "---\ntags:\n  - time_system\n"
+            f"time: {rng.randint(5, 120)}\ndate: {day.isoformat()}\nmaintag: {rng.choice(MAINTAGS)}\n---\n\n"
+            f"Note {index}\n\nИсходный текст:\n> synthetic entry {index}\n",
+            encoding="utf-8",
+        )
+        if index % 10 == 0:
+            (tasks_dir / f"Task {index} {day.isoformat()} 10-00.md").write_text(
+                f"---\ntags:\n  - task\ndone: {'true' if index % 20 else 'false'}\ndue: {day.isoformat()}\n---\n\n"
+                f"Task {index}\n",
+                encoding="utf-8",
+            )
+    return time_dir, tasks_dir
+
+
+def _with_latency(parse, latency_s: float):
+    if latency_s <= 0:
+        return parse
+
+    def _parse(path):
+        time.sleep(latency_s)
+        return parse(path)
+
+    return _parse
+
+
+def run(notes: int, workers_options: list[int], latency_ms: float) -> None:
+    with tempfile.TemporaryDirectory(prefix="vault-bench-") as tmp:
+        time_dir, tasks_dir = build_vault(Path(tmp), notes)
+        latency_s = latency_ms / 1000
+        print(f"\n{notes} time notes, {notes // 10} tasks, simulated latency {latency_ms} ms")
+        print(f"{'workers':>8} {'stats s':>10} {'tasks s':>10} {'speedup':>8}")
+        baseline = None
+        for workers in workers_options:
+            started = time.perf_counter()
+            parse = _with_latency(partial(_records_from_note, with_titles=False), latency_s)
+            records = sum(len(batch) for batch in scan_notes(iter_markdown_tree(time_dir), parse, workers=workers))
+            stats_elapsed = time.perf_counter() - started
+
+            started = time.perf_counter()
+            parse = _with_latency(_parse_task_file, latency_s)
+            tasks = sum(1 for task in scan_notes(iter_markdown_tree(tasks_dir), parse, workers=workers) if task)
+            tasks_elapsed = time.perf_counter() - started
+
+            assert records == notes and tasks == len(list(tasks_dir.iterdir()))
+            total = stats_elapsed + tasks_elapsed
+            baseline = baseline or total
+            print(f"{workers:>8} {stats_elapsed:>10.3f} {tasks_elapsed:>10.3f} {baseline / total:>7.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    for notes in args.notes:
+        run(notes, args.workers, args.latency_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Load-test the real dispatcher with synthetic updates, a fake Telegram session and a stub LLM.
+
+    python scripts/load_test_dispatcher.py --updates 5000 --chats 200 --concurrency 100
+    python scripts/load_test_dispatcher.py --llm-ms 800 --throttle   # slow model, real send pacing
+
+Updates go through `build_dispatcher()` via `dp.feed_update`, so middlewares
+(dedupe), routers, handlers, the pipeline and note writes all run for real;
+only outgoing Bot API calls and the LLM are faked. The vault, cache and logs
+live in a temporary directory unless OBSIDIAN_VAULT_DIR etc. are already set.
+
+Reported: handler throughput, per-update reply latency, event-loop lag
+(measured by a ticker task) and Python heap growth (tracemalloc).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List
+
+TMP_ROOT = Path(tempfile.mkdtemp(prefix="dispatcher-load-"))
+for _name, _value in {
+    "TELEGRAM_BOT_TOKEN": "42:LOADTEST",
+    "OPENAI_API_KEY": "load-test",
+    "MODEL_NAME": "stub",
+    "OBSIDIAN_VAULT_DIR": str(TMP_ROOT / "vault"),
+    "OBSIDIAN_TASKS_PATH": str(TMP_ROOT / "vault" / "tasks"),
+    "OBSIDIAN_DIARY_FOLDER": str(TMP_ROOT / "vault" / "diary"),
+    "CACHE_DIR": str(TMP_ROOT / "cache"),
+    "LOG_DIR": str(TMP_ROOT / "logs"),
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.session.base import BaseSession  # noqa: E402
+from aiogram.methods import SendMessage, TelegramMethod  # noqa: E402
+from aiogram.types import Chat, Message, Update, User  # noqa: E402
+
+from time_bot import pipeline  # noqa: E402
+from time_bot.bot.main import build_dispatcher  # noqa: E402
+from time_bot.bot.throttling import SendRateLimiter  # noqa: E402
+from time_bot.bot.utils import STATS_BUTTON_TEXT, TASKS_BUTTON_TEXT  # noqa: E402
+from time_bot.config import get_settings  # noqa: E402
+from time_bot.models import MessageClassification, TimeEntry  # noqa: E402
+
+ACTIVITIES = ("спортзал", "чтение", "обед", "созвон", "код-ревью", "прогулка")
+MAINTAGS = ("w1", "w2", "rt", "rest")
+FAKE_TOKEN = "42:LOADTEST"
+
+
+class RecordingSession(BaseSession):
+    """Answers every Bot API call locally and keeps what was sent."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        super().__init__()
+        self.latency_s = latency_ms / 1000
+        self.calls: Counter = Counter()
+        self.sent_at: List[float] = []
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls[type(method).__name__] += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if isinstance(method, SendMessage):
+            self._message_id += 1
+            self.sent_at.append(time.perf_counter())
+            return Message(
+                message_id=self._message_id,
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=int(method.chat_id), type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def close(self) -> None:
+        return None
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+
+def install_stub_llm(latency_ms: float) -> None:
+    delay = latency_ms / 1000
+
+    async def _classify(message_text: str) -> MessageClassification:
+        await asyncio.sleep(delay)
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _parse(message_text: str, today: date) -> TimeEntry:
+        await asyncio.sleep(delay)
+        minutes, _, title = message_text.partition(" минут ")
+        return TimeEntry(
+            title=title or message_text,
+            raw_text=message_text,
+            minutes=int(minutes) if minutes.isdigit() else 30,
+            date=today,
+            maintag=MAINTAGS[len(message_text) % len(MAINTAGS)],
+        )
+
+    pipeline.classify_message_intent = _classify
+    pipeline.parse_time_entry_with_sgr = _parse
+
+
+def build_updates(count: int, chats: int, *, stats_share: float, tasks_share: float, seed: int) -> List[Update]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    updates = []
+    for index in range(count):
+        chat_id = 10_000 + rng.randrange(chats)
+        roll = rng.random()
+        if roll < stats_share:
+            text = STATS_BUTTON_TEXT
+        elif roll < stats_share + tasks_share:
+            text = TASKS_BUTTON_TEXT
+        else:
+            text = f"{rng.randint(5, 120)} минут {rng.choice(ACTIVITIES)} {index}"
+        message = Message(
+            message_id=index + 1,
+            date=now,
+            chat=Chat(id=chat_id, type="private"),
+            from_user=User(id=chat_id, is_bot=False, first_name="Load"),
+            text=text,
+        )
+        updates.append(Update(update_id=index + 1, message=message))
+    return updates
+
+
+async def _measure_loop_lag(samples: List[float], interval: float, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+
+def _quantiles(values: List[float]) -> str:
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return f"p50 {cuts[49]:.1f}  p95 {cuts[94]:.1f}  p99 {cuts[98]:.1f}  max {max(values):.1f}"
+
+
+async def run(args: argparse.Namespace) -> None:
+    install_stub_llm(args.llm_ms)
+    settings = get_settings()
+    session = RecordingSession(args.send_ms)
+    if args.throttle:
+        session.middleware(
+            SendRateLimiter(
+                global_rate=settings.telegram_global_rate,
+                chat_rate=settings.telegram_chat_rate,
+                chat_burst=settings.telegram_chat_burst,
+                max_retries=settings.telegram_max_retries,
+            )
+        )
+    bot = Bot(FAKE_TOKEN, session=session)
+    dp = build_dispatcher()
+    updates = build_updates(
+        args.updates, args.chats, stats_share=args.stats_share, tasks_share=args.tasks_share, seed=args.seed
+    )
+    buttons = (STATS_BUTTON_TEXT, TASKS_BUTTON_TEXT)
+    kinds = Counter(update.message.text if update.message.text in buttons else "log" for update in updates)
+
+    if args.heap:
+        tracemalloc.start()
+    heap_before, _ = tracemalloc.get_traced_memory()
+    latencies: List[float] = []
+    failures = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def _feed(update: Update) -> None:
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await dp.feed_update(bot, update)
+            except Exception:
+                failures += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    lag: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_loop_lag(lag, args.tick_ms / 1000, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(_feed(update) for update in updates))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    heap_after, heap_peak = tracemalloc.get_traced_memory()
+    if args.heap:
+        tracemalloc.stop()
+
+    print(f"updates: {len(updates)} over {args.chats} chats ({dict(kinds)}), concurrency {args.concurrency}")
+    throttle = "on" if args.throttle else "off"
+    print(f"stub LLM {args.llm_ms} ms/call, send latency {args.send_ms} ms, throttle {throttle}")
+    print(f"throughput: {len(updates) / elapsed:.1f} updates/s ({elapsed:.2f} s), failed: {failures}")
+    print(f"bot api calls: {dict(session.calls)}")
+    print(f"reply latency ms: {_quantiles(latencies)}")
+    print(f"event-loop lag ms: {_quantiles(lag)}")
+    if args.heap:
+        print(
+            f"heap: {heap_before / 1e6:.1f} MB -> {heap_after / 1e6:.1f} MB "
+            f"(+{(heap_after - heap_before) / 1e6:.1f} MB, peak {heap_peak / 1e6:.1f} MB)"
+        )
+    print(f"artifacts: {TMP_ROOT}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=100, help="Updates in flight at once")
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="Stub latency per LLM call")
+    parser.add_argument("--send-ms", type=float, default=0.0, help="Fake Bot API latency per call")
+    parser.add_argument("--stats-share", type=float, default=0.05)
+    parser.add_argument("--tasks-share", type=float, default=0.05)
+    parser.add_argument("--tick-ms", type=float, default=10.0, help="Loop-lag probe interval")
+    parser.add_argument("--throttle", action="store_true", help="Apply the production SendRateLimiter")
+    parser.add_argument("--no-heap", dest="heap", action="store_false", help="Skip tracemalloc (it slows the run)")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Per-chat debounce window that merges message bursts into one LLM call."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Set
+
+from aiogram.types import Message
+
+from time_bot.bot.utils import (
+    acknowledge_result,
+    build_error_message,
+    build_success_message,
+    get_main_keyboard,
+    mark_update_processed,
+)
+from time_bot.config import get_settings
+from time_bot.pipeline import PipelineResult, process_message_batch, process_message_text
+
+BatchProcessor = Callable[..., Awaitable[List[PipelineResult | Exception]]]
+SingleProcessor = Callable[..., Awaitable[PipelineResult]]
+
+
+@dataclass(slots=True)
+class _Pending:
+    message: Message
+    text: str
+    future: asyncio.Future
+    processed: bool = False
+
+
+@dataclass(slots=True)
+class _ChatBuffer:
+    items: List[_Pending] = field(default_factory=list)
+    timer: asyncio.Task | None = None
+
+
+class MessageCoalescer:
+    """Collect messages per chat for `window_seconds` and process them together.
+
+    A lone message is processed exactly as without coalescing (only delayed by
+    the window); two or more go through `process_message_batch`. Each original
+    message gets its own reply.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        *,
+        max_batch: int = 10,
+        process_batch: BatchProcessor = process_message_batch,
+        process_single: SingleProcessor = process_message_text,
+    ):
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._process_batch = process_batch
+        self._process_single = process_single
+        self._buffers: Dict[int, _ChatBuffer] = {}
+        # The loop keeps only weak references to tasks; hold running flushes until they finish.
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, message: Message, text: str) -> str:
+        """Queue a message and wait until its reply has been sent; return the reply text."""
+
+        chat_id = message.chat.id
+        future = asyncio.get_running_loop().create_future()
+        buffer = self._buffers.setdefault(chat_id, _ChatBuffer())
+        pending = _Pending(message=message, text=text, future=future)
+        buffer.items.append(pending)
+        if len(buffer.items) >= self.max_batch:
+            if buffer.timer is not None:
+                buffer.timer.cancel()
+            self._start_flush(chat_id)
+        elif buffer.timer is None:
+            buffer.timer = asyncio.create_task(self._flush_later(chat_id))
+        try:
+            return await future
+        finally:
+            # The flush runs in another task; report the saved note in the submitter's context.
+            if pending.processed:
+                mark_update_processed()
+
+    async def _flush_later(self, chat_id: int) -> None:
+        await asyncio.sleep(self.window_seconds)
+        self._start_flush(chat_id)
+
+    def _start_flush(self, chat_id: int) -> None:
+        buffer = self._buffers.pop(chat_id, None)
+        if buffer is None or not buffer.items:
+            return
+        task = asyncio.create_task(self._flush(chat_id, buffer.items))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, chat_id: int, items: List[_Pending]) -> None:
+        try:
+            await self._process_and_reply(chat_id, items)
+        finally:
+            # A short outcome list or a cancelled flush must not leave a handler waiting forever.
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(RuntimeError("The message was not processed"))
+
+    async def _process_and_reply(self, chat_id: int, items: List[_Pending]) -> None:
+        outcomes: List[PipelineResult | Exception]
+        try:
+            if len(items) == 1:
+                try:
+                    outcomes = [await self._process_single(items[0].text, chat_id=chat_id)]
+                except Exception as exc:
+                    outcomes = [exc]
+            else:
+                outcomes = await self._process_batch([item.text for item in items], chat_id=chat_id)
+        except Exception as exc:
+            outcomes = [exc] * len(items)
+
+        for item, outcome in zip(items, outcomes):
+            item.processed = not isinstance(outcome, BaseException)
+            if isinstance(outcome, BaseException):
+                reply = build_error_message(item.text, outcome, chat_id=chat_id)
+            else:
+                reply = build_success_message(outcome)
+            try:
+                if len(items) == 1:
+                    await item.message.answer(reply, reply_markup=get_main_keyboard())
+                else:
+                    await item.message.reply(reply, reply_markup=get_main_keyboard())
+            except Exception as exc:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+                continue
+            if not isinstance(outcome, BaseException):
+                acknowledge_result(outcome)
+            if not item.future.done():
+                item.future.set_result(reply)
+
+
+_COALESCER: MessageCoalescer | None = None
+
+
+def get_coalescer() -> MessageCoalescer | None:
+    """Return the shared coalescer, or None when COALESCE_WINDOW_SECONDS is 0."""
+
+    global _COALESCER
+    settings = get_settings()
+    if settings.coalesce_window_seconds <= 0:
+        return None
+    if _COALESCER is None:
+        _COALESCER = MessageCoalescer(settings.coalesce_window_seconds, max_batch=settings.coalesce_max_batch)
+    return _COALESCER
+
+
+__all__ = ["MessageCoalescer", "get_coalescer"]
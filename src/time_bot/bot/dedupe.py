@@ -0,0 +1,200 @@
+"""Idempotent message handling across restarts, redeliveries and replicas."""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Literal
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message
+
+from time_bot.bot.utils import get_main_keyboard, track_update_processed
+from time_bot.config import get_settings
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+
+DEDUPE_FILE_NAME = "processed_updates.sqlite3"
+PURGE_EVERY = 500
+
+ClaimStatus = Literal["claimed", "done", "in_flight"]
+
+
+@dataclass(slots=True, frozen=True)
+class DedupeRecord:
+    status: ClaimStatus
+    reply: str | None = None
+
+
+def message_key(message: Message) -> str:
+    return f"{message.chat.id}:{message.message_id}"
+
+
+class DedupeStore:
+    """Bounded in-memory ring in front of an on-disk SQLite set with a TTL.
+
+    `claim()` atomically marks a key as in flight; a claim left pending longer
+    than `stale_seconds` (e.g. the process crashed) can be taken over.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        ring_size: int = 10_000,
+        ttl_seconds: float = 72 * 3600,
+        stale_seconds: float = 600,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.ring_size = ring_size
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._clock = clock
+        self._ring: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._claims = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed_updates ("
+            " key TEXT PRIMARY KEY, created_at REAL NOT NULL, status TEXT NOT NULL, reply TEXT)"
+        )
+
+    def _remember(self, key: str, created_at: float, reply: str | None) -> None:
+        self._ring[key] = (created_at, reply)
+        self._ring.move_to_end(key)
+        while len(self._ring) > self.ring_size:
+            self._ring.popitem(last=False)
+
+    def claim(self, key: str) -> DedupeRecord:
+        now = self._clock()
+        with self._lock:
+            cached = self._ring.get(key)
+            if cached is not None and now - cached[0] < self.ttl_seconds:
+                return DedupeRecord("done", cached[1])
+
+            self._claims += 1
+            if self._claims % PURGE_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM processed_updates WHERE created_at < ?", (now - self.ttl_seconds,)
+                )
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO processed_updates (key, created_at, status) VALUES (?, ?, 'pending')",
+                (key, now),
+            )
+            if cursor.rowcount == 1:
+                return DedupeRecord("claimed")
+
+            row = self._conn.execute(
+                "SELECT created_at, status, reply FROM processed_updates WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return self._take_over(key, now)
+            created_at, status, reply = row
+            if now - created_at >= self.ttl_seconds:
+                return self._take_over(key, now)
+            if status == "done":
+                self._remember(key, created_at, reply)
+                return DedupeRecord("done", reply)
+            if now - created_at >= self.stale_seconds:
+                return self._take_over(key, now)
+            return DedupeRecord("in_flight")
+
+    def _take_over(self, key: str, now: float) -> DedupeRecord:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO processed_updates (key, created_at, status, reply) VALUES (?, ?, 'pending', NULL)",
+            (key, now),
+        )
+        return DedupeRecord("claimed")
+
+    def complete(self, key: str, reply: str | None) -> None:
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE processed_updates SET status = 'done', reply = ?, created_at = ? WHERE key = ?",
+                (reply, now, key),
+            )
+            self._remember(key, now, reply)
+
+    def release(self, key: str) -> None:
+        """Forget a failed claim so a redelivery is processed again."""
+
+        with self._lock:
+            self._conn.execute("DELETE FROM processed_updates WHERE key = ? AND status = 'pending'", (key,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+async def _answer_again(message: Message, reply: str) -> None:
+    await message.answer(reply, reply_markup=get_main_keyboard())
+
+
+class DedupeMiddleware(BaseMiddleware):
+    """Outer message middleware: run each (chat_id, message_id) once, replay the stored reply after.
+
+    Handlers that return a string have it stored as the reply to replay. When
+    a handler fails after its note was written (only the reply failed), the
+    key is still marked done so a redelivery does not write the note twice.
+    Store calls are SQLite writes and run off the event loop.
+    """
+
+    def __init__(
+        self,
+        store: DedupeStore,
+        *,
+        replay: Callable[[Message, str], Awaitable[Any]] | None = _answer_again,
+    ):
+        self.store = store
+        self._replay = replay
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        key = message_key(event)
+        record = await asyncio.to_thread(self.store.claim, key)
+        if record.status != "claimed":
+            METRICS.increment("updates.duplicates")
+            LOGGER.info("Skipping duplicate update | key=%s status=%s", key, record.status)
+            if record.status == "done" and record.reply and self._replay is not None:
+                await self._replay(event, record.reply)
+            return None
+
+        with track_update_processed() as processed:
+            try:
+                result = await handler(event, data)
+            except Exception:
+                if processed:
+                    await asyncio.to_thread(self.store.complete, key, None)
+                else:
+                    await asyncio.to_thread(self.store.release, key)
+                raise
+        await asyncio.to_thread(self.store.complete, key, result if isinstance(result, str) else None)
+        return result
+
+
+_STORE: DedupeStore | None = None
+
+
+def get_dedupe_store() -> DedupeStore:
+    global _STORE
+    if _STORE is None:
+        settings = get_settings()
+        _STORE = DedupeStore(
+            Path(settings.cache_dir) / DEDUPE_FILE_NAME,
+            ring_size=settings.dedupe_ring_size,
+            ttl_seconds=settings.dedupe_ttl_hours * 3600,
+        )
+    return _STORE
+
+
+__all__ = ["DedupeMiddleware", "DedupeRecord", "DedupeStore", "get_dedupe_store", "message_key"]
@@ -1,18 +1,33 @@
 """Telegram handlers placeholders."""
 from __future__ import annotations
 
+import asyncio
+
+from datetime import date
+
 from aiogram import Router
-from aiogram.filters import CommandStart, Command
-from aiogram.types import Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import CommandObject, CommandStart, Command
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 
+from time_bot.bot.coalescer import get_coalescer
 from time_bot.bot.utils import (
+    LAST_NOTES_DEFAULT,
+    LAST_NOTES_MAX,
     STATS_BUTTON_TEXT,
     TASKS_BUTTON_TEXT,
-    build_daily_stats_message,
-    build_tasks_overview_message,
+    build_edit_last_message,
+    build_last_notes_message,
+    build_search_message,
+    build_undo_message,
     get_main_keyboard,
     handle_time_entry_message,
+    is_admin_chat,
 )
+from time_bot.bot.views import StatsDay, TasksPage, get_stats_view, get_tasks_view
+from time_bot.metrics import format_metrics
+from time_bot.profiling import get_profiler
+from time_bot.reprocessor import note_activity
 
 router = Router()
 
@@ -28,21 +43,110 @@ async def handle_start(message: Message) -> None:
 @router.message(Command("help"))
 async def handle_help(message: Message) -> None:
     await message.answer(
-        "Напиши, чем занимался и сколько времени ушло. Я превращу сообщение в заметку Obsidian.",
+        "Напиши, чем занимался и сколько времени ушло. Я превращу сообщение в заметку Obsidian.\n"
+        "/search <слова> — поиск по заметкам\n"
+        "/last [N] — последние заметки\n"
+        "/undo — отменить последнюю заметку или правку\n"
+        "/edit_last <текст> — переписать последнюю заметку",
         reply_markup=get_main_keyboard(),
     )
 
 
+@router.message(Command("search"))
+async def handle_search(message: Message, command: CommandObject) -> None:
+    text = await asyncio.to_thread(build_search_message, command.args or "")
+    await message.answer(text, reply_markup=get_main_keyboard())
+
+
+@router.message(Command("last"))
+async def handle_last(message: Message, command: CommandObject) -> None:
+    try:
+        limit = int(command.args) if command.args else LAST_NOTES_DEFAULT
+    except ValueError:
+        limit = LAST_NOTES_DEFAULT
+    limit = max(1, min(limit, LAST_NOTES_MAX))
+    await message.answer(build_last_notes_message(message.chat.id, limit), reply_markup=get_main_keyboard())
+
+
+@router.message(Command("undo"))
+async def handle_undo(message: Message) -> None:
+    await message.answer(build_undo_message(message.chat.id), reply_markup=get_main_keyboard())
+
+
+@router.message(Command("edit_last"))
+async def handle_edit_last(message: Message, command: CommandObject) -> None:
+    reply = await build_edit_last_message(message.chat.id, command.args or "")
+    await message.answer(reply, reply_markup=get_main_keyboard())
+
+
+@router.message(Command("metrics"))
+async def handle_metrics(message: Message) -> None:
+    if not is_admin_chat(message.chat.id):
+        await message.answer("Команда доступна только администратору.", reply_markup=get_main_keyboard())
+        return
+    await message.answer(format_metrics(), reply_markup=get_main_keyboard())
+
+
+@router.message(Command("profile"))
+async def handle_profile(message: Message, command: CommandObject) -> None:
+    if not is_admin_chat(message.chat.id):
+        await message.answer("Команда доступна только администратору.", reply_markup=get_main_keyboard())
+        return
+    profiler = get_profiler()
+    argument = (command.args or "").strip().lower()
+    if argument == "on":
+        profiler.arm()
+    elif argument == "off":
+        profiler.disarm()
+    elif argument.isdigit() and int(argument) > 0:
+        profiler.arm(int(argument))
+    elif argument:
+        await message.answer("Использование: /profile [on|off|N]", reply_markup=get_main_keyboard())
+        return
+    await message.answer(f"Профилирование: {profiler.describe()}", reply_markup=get_main_keyboard())
+
+
 @router.message(lambda message: (message.text or "") == STATS_BUTTON_TEXT)
 async def handle_daily_stats(message: Message) -> None:
-    await message.answer(build_daily_stats_message(), reply_markup=get_main_keyboard())
+    text, keyboard = await get_stats_view()
+    await message.answer(text, reply_markup=keyboard)
 
 
 @router.message(lambda message: (message.text or "") == TASKS_BUTTON_TEXT)
 async def handle_tasks_list(message: Message) -> None:
-    await message.answer(build_tasks_overview_message(), reply_markup=get_main_keyboard())
+    text, keyboard = await get_tasks_view()
+    await message.answer(text, reply_markup=keyboard or get_main_keyboard())
+
+
+@router.callback_query(TasksPage.filter())
+async def handle_tasks_page(callback: CallbackQuery, callback_data: TasksPage) -> None:
+    text, keyboard = await get_tasks_view(callback_data.section, callback_data.page)
+    await _edit_in_place(callback, text, keyboard)
+
+
+@router.callback_query(StatsDay.filter())
+async def handle_stats_day(callback: CallbackQuery, callback_data: StatsDay) -> None:
+    text, keyboard = await get_stats_view(date.fromisoformat(callback_data.day))
+    await _edit_in_place(callback, text, keyboard)
+
+
+async def _edit_in_place(callback: CallbackQuery, text: str, keyboard: InlineKeyboardMarkup | None) -> None:
+    message = callback.message
+    if isinstance(message, Message):
+        try:
+            await message.edit_text(text, reply_markup=keyboard)
+        except TelegramBadRequest as exc:
+            # Pressing the current page again leaves the message as it is.
+            if "message is not modified" not in str(exc):
+                raise
+    await callback.answer()
 
 
 @router.message()
-async def handle_entry(message: Message) -> None:
-    await handle_time_entry_message(message)
+async def handle_entry(message: Message) -> str:
+    note_activity()
+    coalescer = get_coalescer()
+    text = (message.text or message.caption or "").strip()
+    if coalescer is not None and text:
+        return await coalescer.submit(message, text)
+    return await handle_time_entry_message(message)
@@ -6,19 +6,107 @@ import asyncio
 from aiogram import Bot, Dispatcher
 
 from time_bot.config import get_settings
+from time_bot.bot.dedupe import DedupeMiddleware, get_dedupe_store
 from time_bot.bot.handlers import router
+from time_bot.bot.throttling import SendRateLimiter
+from time_bot.bot.utils import acknowledge_result, build_success_message
+from time_bot.journal import get_note_journal
+from time_bot.logging_utils import LOGGER
+from time_bot.pipeline import PipelineResult
+from time_bot.profiling import install_signal_toggle
+from time_bot.reprocessor import build_reprocessor
+from time_bot.vault_sync import VaultSync, build_vault_sync
+
+_REPROCESS_TASK: asyncio.Task | None = None
+_VAULT_SYNC: VaultSync | None = None
+
+
+async def notify_unacknowledged_notes(bot: Bot) -> None:
+    """After a crash, tell chats about notes that were written but never confirmed."""
+
+    journal = get_note_journal()
+    for entry in journal.reconcile():
+        try:
+            await bot.send_message(
+                entry.chat_id,
+                f"Заметка сохранена, но подтверждение не было отправлено: {entry.path.name}",
+            )
+        except Exception as exc:
+            LOGGER.warning("Could not notify chat %s about note %s: %s", entry.chat_id, entry.path, exc)
+            continue
+        journal.acknowledge([entry.id])
+
+
+async def start_reprocessor(bot: Bot) -> None:
+    """Retry failed and unparsed messages in the background while the bot is idle."""
+
+    global _REPROCESS_TASK
+    settings = get_settings()
+    if settings.reprocess_interval_seconds <= 0:
+        return
+
+    async def _notify(chat_id: int, result: PipelineResult) -> None:
+        await bot.send_message(chat_id, "Разобрал отложенное сообщение\n" + build_success_message(result))
+        acknowledge_result(result)
+
+    reprocessor = build_reprocessor(notify=_notify)
+    _REPROCESS_TASK = asyncio.create_task(
+        reprocessor.run_forever(
+            interval_seconds=settings.reprocess_interval_seconds,
+            idle_seconds=settings.reprocess_idle_seconds,
+        )
+    )
+
+
+async def stop_reprocessor() -> None:
+    global _REPROCESS_TASK
+    if _REPROCESS_TASK is not None:
+        _REPROCESS_TASK.cancel()
+        _REPROCESS_TASK = None
+
+
+async def start_vault_sync() -> None:
+    global _VAULT_SYNC
+    _VAULT_SYNC = build_vault_sync()
+    if _VAULT_SYNC is not None:
+        _VAULT_SYNC.start()
+
+
+async def stop_vault_sync() -> None:
+    """Flush writes still waiting for their window before the process exits."""
+
+    global _VAULT_SYNC
+    if _VAULT_SYNC is not None:
+        await asyncio.to_thread(_VAULT_SYNC.stop)
+        _VAULT_SYNC = None
 
 
 def build_dispatcher() -> Dispatcher:
     dp = Dispatcher()
+    if get_settings().dedupe_enabled:
+        dp.message.outer_middleware(DedupeMiddleware(get_dedupe_store()))
     dp.include_router(router)
+    dp.startup.register(notify_unacknowledged_notes)
+    dp.startup.register(start_reprocessor)
+    dp.startup.register(start_vault_sync)
+    dp.shutdown.register(stop_reprocessor)
+    dp.shutdown.register(stop_vault_sync)
     return dp
 
 
 async def run_bot() -> None:
     settings = get_settings()
     bot = Bot(settings.telegram_bot_token.get_secret_value())
+    bot.session.middleware(
+        SendRateLimiter(
+            global_rate=settings.telegram_global_rate,
+            chat_rate=settings.telegram_chat_rate,
+            chat_burst=settings.telegram_chat_burst,
+            max_retries=settings.telegram_max_retries,
+        )
+    )
     dp = build_dispatcher()
+    install_signal_toggle(asyncio.get_running_loop())
     await dp.start_polling(bot)
 
 
@@ -0,0 +1,142 @@
+"""Outgoing request pacing against Telegram flood limits."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Dict
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+
+MAX_IDLE_BUCKETS = 1000
+
+
+class TokenBucket:
+    """Reservation-based token bucket.
+
+    `reserve()` always takes a token and returns how long the caller must wait
+    for it, so concurrent callers are served in FIFO order without a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float, *, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def reserve(self) -> float:
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Make the bucket empty for `seconds` (used after a flood-wait answer)."""
+
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+    @property
+    def idle(self) -> bool:
+        self._refill()
+        return self._tokens >= self.capacity
+
+
+class SendRateLimiter(BaseRequestMiddleware):
+    """Session middleware that paces every chat-bound request.
+
+    Requests carrying a `chat_id` wait for the chat's own bucket and then for
+    the global bucket. A `RetryAfter` answer pauses the chat bucket and the
+    request is retried up to `max_retries` times.
+    """
+
+    def __init__(
+        self,
+        *,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        chat_burst: int = 3,
+        max_retries: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._clock = clock
+        self._global = TokenBucket(global_rate, global_rate, clock=clock)
+        self._chats: Dict[int | str, TokenBucket] = {}
+        self._waiting = 0
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_IDLE_BUCKETS:
+                self._chats = {key: value for key, value in self._chats.items() if not value.idle}
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, clock=self._clock)
+        return bucket
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        attempt = 0
+        while True:
+            await self._wait_turn(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                attempt += 1
+                METRICS.increment("telegram.retry_after")
+                self._chat_bucket(chat_id).pause(exc.retry_after)
+                if attempt > self.max_retries:
+                    raise
+                LOGGER.warning(
+                    "Telegram flood wait | chat=%s method=%s retry_after=%ss attempt=%s",
+                    chat_id,
+                    type(method).__name__,
+                    exc.retry_after,
+                    attempt,
+                )
+
+    async def _wait_turn(self, chat_id: int | str) -> None:
+        # The chat token comes first: a global token reserved up front would sit unused while the
+        # sender sleeps out its chat's backpressure, and other chats would wait for it.
+        chat_delay = self._chat_bucket(chat_id).reserve()
+        await self._sleep(chat_delay)
+        global_delay = self._global.reserve()
+        await self._sleep(global_delay)
+        METRICS.observe("telegram.send_queue_delay_ms", (chat_delay + global_delay) * 1000)
+
+    async def _sleep(self, delay: float) -> None:
+        if delay <= 0:
+            return
+        self._waiting += 1
+        METRICS.set_gauge("telegram.send_queue_depth", self._waiting)
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._waiting -= 1
+            METRICS.set_gauge("telegram.send_queue_depth", self._waiting)
+
+
+__all__ = ["SendRateLimiter", "TokenBucket"]
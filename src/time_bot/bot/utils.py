@@ -1,22 +1,56 @@
 """Reusable utilities for bot handlers."""
 from __future__ import annotations
 
-from datetime import date
-from pathlib import Path
-from typing import List
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Iterator, List
 
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup
 
 from time_bot.config import get_settings
 from time_bot.logging_utils import log_event
-from time_bot.pipeline import PipelineResult, UnsupportedIntentError, process_message_text
+from time_bot.journal import get_note_journal
+from time_bot.pipeline import (
+    PipelineResult,
+    UnsupportedIntentError,
+    learn_correction,
+    process_message_text,
+    rewrite_journaled_note,
+)
+from time_bot.search_index import SearchHit, search_notes
 from time_bot.sgr_client import SGRParseError
 from time_bot.stats import get_daily_stats
-from time_bot.task_reader import TaskRecord, read_tasks
 from time_bot.time_utils import get_timezone, get_today
 
 STATS_BUTTON_TEXT = "Статистика за сегодня"
 TASKS_BUTTON_TEXT = "Задачи"
+SEARCH_RESULTS_LIMIT = 10
+LAST_NOTES_DEFAULT = 5
+LAST_NOTES_MAX = 50
+
+_NOTE_TYPE_LABELS = {"time_log": "время", "task": "задача", "diary": "дневник"}
+_UPDATE_PROCESSED: ContextVar[List[bool] | None] = ContextVar("update_processed", default=None)
+
+
+@contextmanager
+def track_update_processed() -> Iterator[List[bool]]:
+    """Collect `mark_update_processed()` calls of the current update; the list is non-empty once marked."""
+
+    marks: List[bool] = []
+    token = _UPDATE_PROCESSED.set(marks)
+    try:
+        yield marks
+    finally:
+        _UPDATE_PROCESSED.reset(token)
+
+
+def mark_update_processed() -> None:
+    """The update's side effect (a note written, undone or rewritten) happened; a redelivery must not repeat it."""
+
+    marks = _UPDATE_PROCESSED.get()
+    if marks is not None:
+        marks.append(True)
 
 
 def get_main_keyboard() -> ReplyKeyboardMarkup:
@@ -26,99 +60,158 @@ def get_main_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def build_daily_stats_message() -> str:
+def is_admin_chat(chat_id: int) -> bool:
+    return chat_id in get_settings().admin_chat_ids
+
+
+def build_daily_stats_message(day: date | None = None) -> str:
     settings = get_settings()
-    tz = get_timezone(settings.timezone)
-    today = get_today(tz)
-    stats = get_daily_stats(settings.obsidian_vault_dir, today)
+    today = get_today(get_timezone(settings.timezone))
+    day = day or today
+    stats = get_daily_stats(
+        settings.obsidian_vault_dir,
+        day,
+        partition_format=settings.vault_partition_format,
+        workers=settings.vault_scan_workers,
+    )
     if not stats.minutes_by_maintag:
-        return "Нет записей за сегодня."
-    lines = [f"Статистика за {today.isoformat()}:"]
+        return "Нет записей за сегодня." if day == today else f"Нет записей за {day.isoformat()}."
+    lines = [f"Статистика за {day.isoformat()}:"]
     for maintag, minutes in sorted(stats.minutes_by_maintag.items()):
         lines.append(f"- {maintag}: {minutes} мин")
     lines.append(f"Итого: {stats.total_minutes} мин")
     return "\n".join(lines)
 
 
-def build_tasks_overview_message() -> str:
-    settings = get_settings()
-    tasks_dir = Path(settings.obsidian_tasks_path)
-    if not tasks_dir.exists():
-        return "Папка с задачами не найдена."
-    tz = get_timezone(settings.timezone)
-    today = get_today(tz)
-    tasks = [task for task in read_tasks(tasks_dir) if not task.done]
-    if not tasks:
-        return "Нет открытых задач."
-
-    sections = [
-        ("Сегодня", sorted([t for t in tasks if t.due == today], key=_due_sort_key)),
-        ("Просроченные", sorted([t for t in tasks if t.due and t.due < today], key=_due_sort_key)),
-        ("Будущие", sorted([t for t in tasks if t.due and t.due > today], key=_due_sort_key)),
-        ("Без даты", sorted([t for t in tasks if t.due is None], key=lambda t: t.title.lower())),
-    ]
-
-    lines: List[str] = ["Открытые задачи:"]
-    for title, items in sections:
-        if not items:
-            continue
-        lines.append(f"{title}:")
-        for idx, task in enumerate(items, start=1):
-            lines.append(f"{idx}. {_format_task_line(task, tasks_dir)}")
-        lines.append("")
-    if lines[-1] == "":
-        lines.pop()
+def build_search_message(query: str) -> str:
+    query = query.strip()
+    if not query:
+        return "Укажи, что искать, например: /search обед"
+    hits = search_notes(query, limit=SEARCH_RESULTS_LIMIT)
+    if not hits:
+        return f"По запросу «{query}» ничего не найдено."
+    lines = [f"Найдено по запросу «{query}»:"]
+    for idx, hit in enumerate(hits, start=1):
+        lines.append(f"{idx}. {_format_search_hit(hit)}")
     return "\n".join(lines)
 
 
-def _due_sort_key(task: TaskRecord):
-    return (task.due or date.max, task.title.lower())
+def _format_search_hit(hit: SearchHit) -> str:
+    label = _NOTE_TYPE_LABELS.get(hit.note_type, hit.note_type)
+    date_text = f"{hit.note_date}, " if hit.note_date else ""
+    return f"{hit.title} ({date_text}{label}) [{hit.file_name}]"
 
 
-def _format_task_line(task: TaskRecord, tasks_dir: Path) -> str:
-    due_text = task.due.isoformat() if task.due else "без даты"
-    try:
-        rel_path = task.file_path.relative_to(tasks_dir)
-    except ValueError:
-        rel_path = task.file_path.name
-    return f"{due_text} — {task.title} [{rel_path}]"
+async def handle_time_entry_message(message: Message) -> str:
+    """Process a message, answer it and return the reply text."""
 
-
-async def handle_time_entry_message(message: Message) -> None:
     text = (message.text or message.caption or "").strip()
+    result = None
     if not text:
-        await message.answer(
-            "Сообщение пустое. Опиши активность и длительность.",
-            reply_markup=get_main_keyboard(),
-        )
-        return
+        reply = "Сообщение пустое. Опиши активность и длительность."
+    else:
+        try:
+            result = await process_message_text(text, chat_id=message.chat.id)
+        except Exception as exc:
+            reply = build_error_message(text, exc, chat_id=message.chat.id)
+        else:
+            mark_update_processed()
+            reply = build_success_message(result)
+    await message.answer(reply, reply_markup=get_main_keyboard())
+    if result is not None:
+        acknowledge_result(result)
+    return reply
+
+
+def acknowledge_result(result: PipelineResult) -> None:
+    """Mark journaled notes as confirmed to the user."""
+
+    journal_ids = [item.journal_id for item in result.results if item.journal_id is not None]
+    if journal_ids:
+        get_note_journal().acknowledge(journal_ids)
+
+
+def build_last_notes_message(chat_id: int, limit: int = LAST_NOTES_DEFAULT) -> str:
+    entries = get_note_journal().last(chat_id, limit)
+    if not entries:
+        return "Пока нет созданных заметок."
+    tz = get_timezone(get_settings().timezone)
+    lines = ["Последние заметки:"]
+    for idx, entry in enumerate(entries, start=1):
+        created = datetime.fromtimestamp(entry.created_at, tz).strftime("%Y-%m-%d %H:%M")
+        label = _NOTE_TYPE_LABELS.get(entry.note_type, entry.note_type)
+        title = entry.payload.get("title") or entry.path.stem
+        lines.append(f"{idx}. {created} — {label} — {title} [{entry.path.name}]")
+    return "\n".join(lines)
+
+
+def build_undo_message(chat_id: int) -> str:
+    journal = get_note_journal()
+    newest = journal.last(chat_id, 1)
+    entry = journal.undo_last(chat_id)
+    if entry is None:
+        return "Нечего отменять."
+    mark_update_processed()
+    event = {"status": "success", "kind": entry.note_type, "action": "undo", "file_path": str(entry.path)}
+    if newest:
+        # The text that was undone, so the tag predictor can forget its pair.
+        event["previous_raw_text"] = newest[0].raw_text
+    if entry.status != "undone":
+        event["raw_text"] = entry.raw_text
+        if entry.note_type == "time_log":
+            event.update(maintag=entry.payload.get("maintag"), subtag=entry.payload.get("subtag"))
+    log_event(event)
+    learn_correction(event)
+    if entry.status == "undone":
+        return f"Заметка удалена: {entry.path.name}"
+    return f"Правка отменена, заметка восстановлена: {entry.path.name}"
+
+
+async def build_edit_last_message(chat_id: int, text: str) -> str:
+    text = text.strip()
+    if not text:
+        return "Укажи новый текст, например: /edit_last 45 минут обед"
+    entries = get_note_journal().last(chat_id, 1)
+    if not entries:
+        return "Пока нет созданных заметок."
     try:
-        result = await process_message_text(text)
-    except UnsupportedIntentError as exc:
-        log_event({"status": "error", "raw_text": text, "error": str(exc)})
-        await message.answer(
-            "Эта категория сообщений пока не поддерживается.",
-            reply_markup=get_main_keyboard(),
-        )
-        return
-    except SGRParseError as exc:
-        log_event({"status": "error", "raw_text": text, "error": str(exc)})
-        await message.answer(
-            "Не смог разобрать сообщение. Уточни длительность и что делал.",
-            reply_markup=get_main_keyboard(),
-        )
-        return
-    except Exception as exc:  # unexpected failure
-        log_event({"status": "error", "raw_text": text, "error": str(exc)})
-        await message.answer(
-            "Произошла ошибка при обработке сообщения.",
-            reply_markup=get_main_keyboard(),
-        )
-        return
-    await message.answer(_build_success_message(result), reply_markup=get_main_keyboard())
+        result = await rewrite_journaled_note(entries[0], text)
+    except Exception as exc:
+        return build_error_message(text, exc, chat_id=chat_id, retryable=False)
+    mark_update_processed()
+    return "Заметка обновлена\n" + build_success_message(result)
+
 
+def build_error_message(
+    text: str,
+    exc: BaseException,
+    *,
+    chat_id: int | None = None,
+    retryable: bool = True,
+) -> str:
+    """Log a failed message and return the user-facing explanation.
 
-def _build_success_message(result: PipelineResult) -> str:
+    Retryable failures are picked up later by the reprocessor, which needs
+    `chat_id` to report the note it eventually creates.
+    """
+
+    log_event(
+        {
+            "status": "error",
+            "raw_text": text,
+            "error": str(exc),
+            "chat_id": chat_id,
+            "retryable": retryable and not isinstance(exc, UnsupportedIntentError),
+        }
+    )
+    if isinstance(exc, UnsupportedIntentError):
+        return "Эта категория сообщений пока не поддерживается."
+    if isinstance(exc, SGRParseError):
+        return "Не смог разобрать сообщение. Уточни длительность и что делал."
+    return "Произошла ошибка при обработке сообщения."
+
+
+def build_success_message(result: PipelineResult) -> str:
     if result.note_type == "time_log" and result.time_entry:
         entry = result.time_entry
         return "\n".join(
@@ -128,6 +221,17 @@ def _build_success_message(result: PipelineResult) -> str:
                 f"Файл: {result.file_name}",
             ]
         )
+    if result.note_type == "time_log_batch":
+        lines = [f"Создано записей: {len(result.items)}"]
+        total = 0
+        for item in result.items:
+            entry = item.time_entry
+            if entry is None:
+                continue
+            total += entry.minutes
+            lines.append(f"- {entry.minutes} мин, {entry.maintag}/{entry.subtag or '-'} — {entry.title}")
+        lines.append(f"Итого: {total} мин")
+        return "\n".join(lines)
     if result.note_type == "task" and result.task_entry:
         entry = result.task_entry
         due_text = entry.due.isoformat() if entry.due else "не указано"
@@ -152,6 +256,14 @@ def _build_success_message(result: PipelineResult) -> str:
                 f"Файл: {result.file_name}",
             ]
         )
+    if result.note_type == "unparsed":
+        return "\n".join(
+            [
+                "Не успел разобрать сообщение вовремя",
+                "Сохранил его во входящие и разберу позже.",
+                f"Файл: {result.file_name}",
+            ]
+        )
     return "Запись создана"
 
 
@@ -159,7 +271,16 @@ __all__ = [
     "STATS_BUTTON_TEXT",
     "TASKS_BUTTON_TEXT",
     "get_main_keyboard",
+    "is_admin_chat",
     "build_daily_stats_message",
-    "build_tasks_overview_message",
+    "build_search_message",
+    "build_last_notes_message",
+    "build_undo_message",
+    "build_edit_last_message",
+    "acknowledge_result",
     "handle_time_entry_message",
+    "build_error_message",
+    "build_success_message",
+    "mark_update_processed",
+    "track_update_processed",
 ]
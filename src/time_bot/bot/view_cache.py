@@ -0,0 +1,126 @@
+"""Memoized, off-loop builders for the stats reply and the task index."""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Hashable, Iterable, Sequence, Tuple
+
+from time_bot import vault_events
+from time_bot.config import get_settings
+from time_bot.metrics import METRICS
+
+Fingerprint = Tuple[int, ...]
+
+
+@dataclass(slots=True)
+class _Entry:
+    value: Any
+    generations: Tuple[int, ...]
+    fingerprint: Fingerprint
+    created_at: float
+
+
+def folder_fingerprint(folders: Iterable[Path]) -> Fingerprint:
+    """mtimes of the folders; adding, removing or renaming a note in one changes it."""
+
+    values = []
+    for folder in folders:
+        try:
+            values.append(os.stat(folder).st_mtime_ns)
+        except OSError:
+            values.append(-1)
+    return tuple(values)
+
+
+class ViewCache:
+    """Keep built views until a note of their type is written or a watched folder changes.
+
+    Builders run in a worker thread; concurrent requests for the same key
+    share one build. Edits made inside Obsidian do not touch folder mtimes, so
+    entries also expire after `max_age_seconds`.
+    """
+
+    def __init__(self, *, max_age_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, note_type: str, path: Path | None = None) -> None:
+        """Vault write listener: bump the generation of `note_type`."""
+
+        with self._lock:
+            self._generations[note_type] = self._generations.get(note_type, 0) + 1
+
+    def _current_generations(self, note_types: FrozenSet[str]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(note_type, 0) for note_type in sorted(note_types))
+
+    def _is_fresh(self, entry: _Entry, generations: Tuple[int, ...], fingerprint: Fingerprint) -> bool:
+        return (
+            entry.generations == generations
+            and entry.fingerprint == fingerprint
+            and self._clock() - entry.created_at < self.max_age_seconds
+        )
+
+    async def get(
+        self,
+        key: Hashable,
+        build: Callable[[], Any],
+        *,
+        note_types: Iterable[str],
+        folders: Sequence[Path] = (),
+    ) -> Any:
+        types = frozenset(note_types)
+        generations = self._current_generations(types)
+        fingerprint = await asyncio.to_thread(folder_fingerprint, folders) if folders else ()
+        entry = self._entries.get(key)
+        if entry is not None and self._is_fresh(entry, generations, fingerprint):
+            METRICS.increment("view_cache.hit")
+            return entry.value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            METRICS.increment("view_cache.shared")
+            return await asyncio.shield(inflight)
+
+        METRICS.increment("view_cache.miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        started = time.perf_counter()
+        try:
+            value = await asyncio.to_thread(build)
+            future.set_result(value)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved in case nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.cancel()
+            METRICS.observe("view_cache.build_ms", (time.perf_counter() - started) * 1000)
+        # Generations were read before the build, so a write during it leaves this entry stale.
+        self._entries[key] = _Entry(value, generations, fingerprint, self._clock())
+        return value
+
+
+_VIEW_CACHE: ViewCache | None = None
+
+
+def get_view_cache() -> ViewCache:
+    global _VIEW_CACHE
+    if _VIEW_CACHE is None:
+        _VIEW_CACHE = ViewCache(max_age_seconds=get_settings().view_cache_ttl_seconds)
+        vault_events.add_listener(_VIEW_CACHE.invalidate)
+    return _VIEW_CACHE
+
+
+__all__ = ["ViewCache", "folder_fingerprint", "get_view_cache"]
@@ -0,0 +1,213 @@
+"""Paginated task list and day-by-day stats with inline-keyboard navigation.
+
+Open tasks are read and sorted once into a `TaskIndex` (cached by the view
+cache); a page only formats the rows it shows. Buttons carry the cursor
+(section and page, or the stats day) in their callback data, and the
+callback handlers edit the original message in place.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from time_bot.bot.utils import build_daily_stats_message
+from time_bot.bot.view_cache import get_view_cache
+from time_bot.config import get_settings
+from time_bot.task_reader import TaskRecord, read_tasks
+from time_bot.time_utils import get_timezone, get_today
+from time_bot.vault_layout import partition_dir
+
+View = Tuple[str, InlineKeyboardMarkup | None]
+
+TELEGRAM_TEXT_LIMIT = 4096
+SECTION_TITLES: Dict[str, str] = {
+    "today": "Сегодня",
+    "overdue": "Просроченные",
+    "future": "Будущие",
+    "undated": "Без даты",
+}
+
+
+class TasksPage(CallbackData, prefix="tasks"):
+    section: str
+    page: int
+
+
+class StatsDay(CallbackData, prefix="stats"):
+    day: str
+
+
+@dataclass(slots=True)
+class TaskIndex:
+    """Open tasks split into sections, each sorted once; "all" lists the sections in order."""
+
+    tasks_dir: Path
+    sections: Dict[str, List[TaskRecord]] = field(default_factory=dict)
+    all_rows: List[Tuple[str, int, TaskRecord]] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return len(self.all_rows)
+
+    def count(self, section: str) -> int:
+        return self.total if section == "all" else len(self.sections.get(section, []))
+
+    def rows(self, section: str, start: int, stop: int) -> List[Tuple[str, int, TaskRecord]]:
+        """(section, position in section, task) for rows `start`..`stop` of the view."""
+
+        if section == "all":
+            return self.all_rows[start:stop]
+        items = self.sections.get(section, [])[start:stop]
+        return [(section, position, task) for position, task in enumerate(items, start=start + 1)]
+
+
+def _watched_folders(base_dir: Path, today: date, partition_format: str) -> List[Path]:
+    folders = [base_dir]
+    current = partition_dir(base_dir, today, partition_format)
+    if current != base_dir:
+        folders.append(current)
+    return folders
+
+
+def _due_sort_key(task: TaskRecord):
+    return (task.due or date.max, task.title.lower())
+
+
+def _format_task_line(task: TaskRecord, tasks_dir: Path) -> str:
+    due_text = task.due.isoformat() if task.due else "без даты"
+    try:
+        rel_path = task.file_path.relative_to(tasks_dir)
+    except ValueError:
+        rel_path = task.file_path.name
+    return f"{due_text} — {task.title} [{rel_path}]"
+
+
+def build_task_index() -> TaskIndex | None:
+    """Read and sort open tasks; None when the tasks folder does not exist."""
+
+    settings = get_settings()
+    tasks_dir = Path(settings.obsidian_tasks_path)
+    if not tasks_dir.exists():
+        return None
+    today = get_today(get_timezone(settings.timezone))
+    tasks = [task for task in read_tasks(tasks_dir, workers=settings.vault_scan_workers) if not task.done]
+    sections = {
+        "today": sorted([t for t in tasks if t.due == today], key=_due_sort_key),
+        "overdue": sorted([t for t in tasks if t.due and t.due < today], key=_due_sort_key),
+        "future": sorted([t for t in tasks if t.due and t.due > today], key=_due_sort_key),
+        "undated": sorted([t for t in tasks if t.due is None], key=lambda t: t.title.lower()),
+    }
+    index = TaskIndex(tasks_dir, sections)
+    for section, items in sections.items():
+        index.all_rows.extend((section, position, task) for position, task in enumerate(items, start=1))
+    return index
+
+
+def _fit(lines: List[str]) -> str:
+    """Join lines, dropping whole lines from the end if a page still exceeds Telegram's limit."""
+
+    text = "\n".join(lines)
+    while len(text) > TELEGRAM_TEXT_LIMIT and len(lines) > 1:
+        lines = lines[:-2] + ["…"]
+        text = "\n".join(lines)
+    return text[:TELEGRAM_TEXT_LIMIT]
+
+
+def render_tasks_page(index: TaskIndex | None, section: str = "all", page: int = 0, *, page_size: int = 15) -> View:
+    if index is None:
+        return "Папка с задачами не найдена.", None
+    if not index.total:
+        return "Нет открытых задач.", None
+    if section != "all" and section not in SECTION_TITLES:
+        section = "all"
+    count = index.count(section)
+    pages = max(1, -(-count // page_size))
+    page = min(max(page, 0), pages - 1)
+
+    lines: List[str] = ["Открытые задачи:"]
+    if not count:
+        lines.append(f"В разделе «{SECTION_TITLES[section]}» задач нет.")
+    current = None
+    for row_section, position, task in index.rows(section, page * page_size, (page + 1) * page_size):
+        if row_section != current:
+            if current is not None:
+                lines.append("")
+            lines.append(f"{SECTION_TITLES[row_section]}:")
+            current = row_section
+        lines.append(f"{position}. {_format_task_line(task, index.tasks_dir)}")
+    return _fit(lines), _tasks_keyboard(index, section, page, pages)
+
+
+def _tasks_keyboard(index: TaskIndex, section: str, page: int, pages: int) -> InlineKeyboardMarkup:
+    def _button(label: str, target: str, target_page: int) -> InlineKeyboardButton:
+        return InlineKeyboardButton(text=label, callback_data=TasksPage(section=target, page=target_page).pack())
+
+    filters = [_button(("· " if section == "all" else "") + f"Все ({index.total})", "all", 0)]
+    for key, title in SECTION_TITLES.items():
+        count = index.count(key)
+        if count:
+            filters.append(_button(("· " if section == key else "") + f"{title} ({count})", key, 0))
+    keyboard = [filters[:3], filters[3:]] if len(filters) > 3 else [filters]
+    if pages > 1:
+        keyboard.append(
+            [
+                _button("‹", section, (page - 1) % pages),
+                _button(f"{page + 1}/{pages}", section, page),
+                _button("›", section, (page + 1) % pages),
+            ]
+        )
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+async def get_tasks_view(section: str = "all", page: int = 0) -> View:
+    """Page of the cached task index; only the index build runs off the event loop."""
+
+    settings = get_settings()
+    today = get_today(get_timezone(settings.timezone))
+    tasks_dir = Path(settings.obsidian_tasks_path)
+    folders = _watched_folders(tasks_dir, today, settings.vault_partition_format)
+    index = await get_view_cache().get(("tasks", today), build_task_index, note_types=("task",), folders=folders)
+    return render_tasks_page(index, section, page, page_size=settings.tasks_page_size)
+
+
+def _day_button(label: str, day: date) -> InlineKeyboardButton:
+    return InlineKeyboardButton(text=label, callback_data=StatsDay(day=day.isoformat()).pack())
+
+
+def _stats_keyboard(day: date, today: date) -> InlineKeyboardMarkup:
+    previous = day - timedelta(days=1)
+    buttons = [_day_button(f"‹ {previous.isoformat()}", previous)]
+    if day < today:
+        following = day + timedelta(days=1)
+        buttons.append(_day_button(f"{following.isoformat()} ›", following))
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
+
+async def get_stats_view(day: date | None = None) -> View:
+    """Cached stats for `day` (today by default), with buttons to the neighbouring days."""
+
+    settings = get_settings()
+    today = get_today(get_timezone(settings.timezone))
+    day = min(day or today, today)
+    vault_dir = Path(settings.obsidian_vault_dir)
+    folders = _watched_folders(vault_dir, day, settings.vault_partition_format)
+    text = await get_view_cache().get(
+        ("stats", day), lambda: build_daily_stats_message(day), note_types=("time_log",), folders=folders
+    )
+    return text, _stats_keyboard(day, today)
+
+
+__all__ = [
+    "StatsDay",
+    "TaskIndex",
+    "TasksPage",
+    "build_task_index",
+    "get_stats_view",
+    "get_tasks_view",
+    "render_tasks_page",
+]
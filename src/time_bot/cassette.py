@@ -0,0 +1,170 @@
+"""Record/replay storage for structured LLM calls."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Mapping, Sequence
+
+from time_bot.config import get_settings
+from time_bot.serialization import dumps, loads
+
+CassetteMode = Literal["record", "replay"]
+CASSETTE_FILE_NAME = "sgr_cassette.jsonl"
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when no recorded response matches the request."""
+
+
+@dataclass(slots=True)
+class CassetteEntry:
+    key: str
+    schema_name: str
+    model: str
+    messages: List[Dict[str, Any]]
+    content: str
+    latency_ms: float = 0.0
+
+
+def request_key(messages: Sequence[Mapping[str, Any]], schema_name: str, model: str) -> str:
+    """Stable hash of everything that determines the model's answer.
+
+    Uses the standard library on purpose: the key must not change with the
+    installed JSON backend, or recorded cassettes would stop matching.
+    """
+
+    canonical = json.dumps(
+        {"schema_name": schema_name, "model": model, "messages": list(messages)},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """JSONL file of request/response pairs.
+
+    In replay mode identical requests are served in recording order; once the
+    recorded responses for a key are exhausted the last one is repeated.
+    `latency_scale` multiplies the recorded latency (0 replays instantly).
+    """
+
+    def __init__(self, path: Path, mode: CassetteMode, *, latency_scale: float = 0.0):
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[CassetteEntry]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            raise FileNotFoundError(f"Cassette file not found: {self.path}")
+        with self.path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = CassetteEntry(**loads(line))
+                self._entries[entry.key].append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(
+        self,
+        messages: Sequence[Mapping[str, Any]],
+        schema_name: str,
+        model: str,
+        content: str,
+        *,
+        latency_ms: float = 0.0,
+    ) -> CassetteEntry:
+        entry = CassetteEntry(
+            key=request_key(messages, schema_name, model),
+            schema_name=schema_name,
+            model=model,
+            messages=[dict(message) for message in messages],
+            content=content,
+            latency_ms=round(latency_ms, 3),
+        )
+        line = dumps(
+            {
+                "key": entry.key,
+                "schema_name": entry.schema_name,
+                "model": entry.model,
+                "messages": entry.messages,
+                "content": entry.content,
+                "latency_ms": entry.latency_ms,
+            }
+        )
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as handle:
+                handle.write(line)
+                handle.write("\n")
+            self._entries[entry.key].append(entry)
+        return entry
+
+    def lookup(self, messages: Sequence[Mapping[str, Any]], schema_name: str, model: str) -> CassetteEntry:
+        key = request_key(messages, schema_name, model)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(f"No recorded response for {schema_name} request (key={key[:12]})")
+            index = min(self._cursor[key], len(entries) - 1)
+            self._cursor[key] += 1
+            return entries[index]
+
+    async def replay(self, messages: Sequence[Mapping[str, Any]], schema_name: str, model: str) -> str:
+        entry = self.lookup(messages, schema_name, model)
+        delay = entry.latency_ms * self.latency_scale / 1000
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return entry.content
+
+
+_CASSETTE: Cassette | None = None
+_CASSETTE_CONFIGURED = False
+
+
+def get_cassette() -> Cassette | None:
+    """Return the process-wide cassette configured via settings, if any."""
+
+    global _CASSETTE, _CASSETTE_CONFIGURED
+    if not _CASSETTE_CONFIGURED:
+        settings = get_settings()
+        if settings.sgr_cassette_mode != "off":
+            path = settings.sgr_cassette_path or Path(settings.cache_dir) / CASSETTE_FILE_NAME
+            _CASSETTE = Cassette(
+                path,
+                settings.sgr_cassette_mode,
+                latency_scale=settings.sgr_cassette_latency_scale,
+            )
+        _CASSETTE_CONFIGURED = True
+    return _CASSETTE
+
+
+def set_cassette(cassette: Cassette | None) -> None:
+    """Override the process-wide cassette (None disables record/replay)."""
+
+    global _CASSETTE, _CASSETTE_CONFIGURED
+    _CASSETTE = cassette
+    _CASSETTE_CONFIGURED = True
+
+
+__all__ = [
+    "Cassette",
+    "CassetteEntry",
+    "CassetteMissError",
+    "CassetteMode",
+    "get_cassette",
+    "request_key",
+    "set_cassette",
+]
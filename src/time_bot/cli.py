@@ -2,26 +2,349 @@
 from __future__ import annotations
 
 import argparse
-import asyncio
+import sys
+from datetime import date
 from pathlib import Path
+from typing import List, Sequence
 
-from time_bot.pipeline import process_message_text
+# The pipeline and asyncio are imported where they are used: `send` only talks
+# to the daemon socket and should start without them.
+
+COMMANDS = ("search", "export", "migrate-daily", "migrate-layout", "reprocess", "logstats", "tags", "daemon", "send")
+
+
+def result_lines(result, *, dry_run: bool = False) -> List[str]:
+    """What the CLI prints for a processed message: the Markdown, or the saved paths."""
+
+    if dry_run:
+        return [result.markdown]
+    return [f"Saved note to {item.note_path}" for item in result.results]
 
 
 async def run_cli(text: str, *, dry_run: bool = False, output_dir: Path | None = None) -> None:
+    from time_bot.pipeline import process_message_text
+
     result = await process_message_text(text, output_dir=output_dir)
-    if dry_run:
-        print(result.markdown)
+    for line in result_lines(result, dry_run=dry_run):
+        print(line)
+
+
+def _cmd_search(args: argparse.Namespace) -> None:
+    from time_bot.search_index import search_notes
+
+    hits = search_notes(" ".join(args.query), limit=args.limit)
+    if not hits:
+        print("Nothing found")
+        return
+    for hit in hits:
+        date_text = hit.note_date or "-"
+        print(f"{hit.score:6.2f}  {hit.note_type:<8} {date_text:<10}  {hit.title}  [{hit.file_path}]")
+
+
+def _cmd_export(args: argparse.Namespace) -> None:
+    from time_bot.config import get_settings
+    from time_bot.export import ExportFilter, export_time_entries
+
+    settings = get_settings()
+    base_dir = args.vault_dir or Path(settings.obsidian_vault_dir)
+    export_filter = ExportFilter(
+        date_from=args.date_from,
+        date_to=args.date_to,
+        maintags=frozenset(args.maintag or ()),
+        subtags=frozenset(args.subtag or ()),
+    )
+    if args.format == "parquet" and args.output is None:
+        raise SystemExit("--output is required for parquet export")
+    count = export_time_entries(
+        base_dir,
+        args.format,
+        output=args.output,
+        stream=sys.stdout,
+        export_filter=export_filter,
+        partition_format=settings.vault_partition_format,
+        workers=settings.vault_scan_workers,
+    )
+    if args.output is not None:
+        print(f"Exported {count} entries to {args.output}", file=sys.stderr)
+
+
+def _cmd_migrate_daily(args: argparse.Namespace) -> None:
+    from time_bot.config import get_settings
+    from time_bot.daily_notes import migrate_to_daily
+    from time_bot.journal import get_note_journal
+
+    settings = get_settings()
+    journal = get_note_journal()
+    note_ids = journal.live_note_ids()
+    targets = [
+        (args.vault_dir or Path(settings.obsidian_vault_dir), "time"),
+        (args.diary_dir or Path(settings.obsidian_diary_folder), "diary"),
+    ]
+    moves = []
+    for directory, kind in targets:
+        plan = migrate_to_daily(
+            directory,
+            kind,
+            partition_format=settings.vault_partition_format,
+            dry_run=args.dry_run,
+            note_ids=note_ids,
+        )
+        for daily_path, sources in plan.items():
+            verb = "Would fold" if args.dry_run else "Folded"
+            print(f"{verb} {len(sources)} {kind} notes into {daily_path}")
+            moves.extend((source, daily_path) for source in sources)
+    if args.dry_run or not moves:
+        return
+    relocated = journal.relocate(moves)
+    print(f"Updated {relocated} journal entries")
+
+
+def _cmd_migrate_layout(args: argparse.Namespace) -> None:
+    from time_bot.config import get_settings
+    from time_bot.journal import get_note_journal
+    from time_bot.stats import is_time_note
+    from time_bot.vault_layout import apply_moves, plan_partition_moves, rewrite_links, validate_partition_format
+
+    settings = get_settings()
+    partition_format = validate_partition_format((args.format or settings.vault_partition_format).strip("/"))
+    if not partition_format:
+        raise SystemExit("Set VAULT_PARTITION_FORMAT or pass --format, e.g. --format %Y/%m")
+    vault_dir = Path(settings.obsidian_vault_dir)
+    targets = [
+        (vault_dir, is_time_note),
+        (Path(settings.obsidian_tasks_path), None),
+        (Path(settings.obsidian_diary_folder), None),
+    ]
+    all_moves = []
+    for directory, include in targets:
+        moves, skipped = plan_partition_moves(directory, partition_format, include=include)
+        verb = "Would move" if args.dry_run else "Moving"
+        print(f"{verb} {len(moves)} notes in {directory}")
+        for path in skipped:
+            print(f"  skipped (no date or name taken): {path}")
+        all_moves.extend(moves)
+    if args.dry_run or not all_moves:
+        return
+    apply_moves(all_moves)
+    changed = rewrite_links(vault_dir, all_moves)
+    relocated = get_note_journal().relocate((move.source, move.target) for move in all_moves)
+    print(f"Moved {len(all_moves)} notes, updated links in {changed} notes, {relocated} journal entries")
+
+
+def _cmd_reprocess(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from time_bot.reprocess_queue import get_reprocess_queue
+    from time_bot.reprocessor import harvest_failed_messages
+
+    queue = get_reprocess_queue()
+    if not args.no_scan:
+        added = harvest_failed_messages(queue)
+        print(f"Queued {added} failed messages from the event log")
+    if args.dry_run:
+        for item in queue.due(args.limit):
+            print(f"#{item.id} attempts={item.attempts} chat={item.chat_id} reason={item.reason}: {item.raw_text}")
+    else:
+        report = asyncio.run(_run_reprocess(args.limit, notify=args.notify))
+        print(f"Succeeded: {report.succeeded}, retry later: {report.retried}, abandoned: {report.abandoned}")
+    counts = queue.counts()
+    print(", ".join(f"{status}: {counts[status]}" for status in sorted(counts)) or "Queue is empty")
+
+
+async def _run_reprocess(limit: int, *, notify: bool):
+    from time_bot.reprocessor import build_reprocessor
+
+    if not notify:
+        return await build_reprocessor().run_once(limit)
+
+    from aiogram import Bot
+
+    from time_bot.bot.utils import acknowledge_result, build_success_message
+    from time_bot.config import get_settings
+
+    bot = Bot(get_settings().telegram_bot_token.get_secret_value())
+
+    async def _notify(chat_id, result) -> None:
+        await bot.send_message(chat_id, "Разобрал отложенное сообщение\n" + build_success_message(result))
+        acknowledge_result(result)
+
+    try:
+        return await build_reprocessor(notify=_notify).run_once(limit)
+    finally:
+        await bot.session.close()
+
+
+def _cmd_logstats(args: argparse.Namespace) -> None:
+    from datetime import datetime, timedelta, timezone
+
+    from time_bot.event_log import get_event_log
+    from time_bot.log_stats import compute_log_stats, format_log_stats
+
+    event_log = get_event_log()
+    if args.import_legacy:
+        print(f"Imported {event_log.import_legacy()} events from the single-file log")
+    if args.compact:
+        for path in event_log.compact():
+            print(f"Compressed {path}")
+    date_to = args.date_to or datetime.now(timezone.utc).date()
+    date_from = args.date_from or date_to - timedelta(days=args.days - 1)
+    print(f"{date_from} .. {date_to}")
+    print(format_log_stats(compute_log_stats(event_log.iter_events(date_from, date_to))))
+
+
+def _cmd_tags(args: argparse.Namespace) -> None:
+    import statistics
+
+    from time_bot.config import get_settings
+    from time_bot.event_log import get_event_log
+    from time_bot.tag_predictor import evaluate, load_or_train, model_path
+
+    settings = get_settings()
+    if args.action == "train":
+        path = model_path()
+        if args.rebuild:
+            path.unlink(missing_ok=True)
+        predictor = load_or_train(path, k=settings.tag_predictor_k)
+        print(f"Model has {len(predictor)} examples, trained until {predictor.trained_until or '-'} [{path}]")
+        return
+
+    threshold = settings.tag_predictor_min_confidence if args.min_confidence is None else args.min_confidence
+    report = evaluate(get_event_log().iter_events(), k=settings.tag_predictor_k, min_confidence=threshold)
+    if not report.evaluated:
+        print("No LLM-tagged time logs to evaluate")
+        return
+    total = report.evaluated
+    print(f"Evaluated {total} time logs (each predicted from the entries before it)")
+    print(
+        f"Agreement with the LLM: maintag {report.maintag_agree / total:.1%}, "
+        f"maintag+subtag {report.pair_agree / total:.1%}"
+    )
+    confident_share = report.confident / total
+    confident_agreement = report.confident_agree / report.confident if report.confident else 0.0
+    print(f"Confidence >= {threshold:.2f}: {confident_share:.1%} of messages, {confident_agreement:.1%} agree")
+    latencies = sorted(report.latencies_ms)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"Latency per prediction: median {statistics.median(latencies):.2f} ms, p95 {p95:.2f} ms")
+
+
+def _cmd_daemon(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from time_bot.cli_daemon import serve
+
+    asyncio.run(serve(args.socket))
+
+
+def _cmd_send(args: argparse.Namespace) -> None:
+    from time_bot.cli_daemon import DaemonUnavailableError, send
+
+    try:
+        lines = send(
+            args.text, dry_run=args.dry_run, output_dir=args.output_dir, socket_path=args.socket, timeout=args.timeout
+        )
+    except DaemonUnavailableError as exc:
+        if args.no_fallback:
+            raise SystemExit(str(exc))
+        print(f"{exc}; processing in this process instead", file=sys.stderr)
+        import asyncio
+
+        asyncio.run(run_cli(args.text, dry_run=args.dry_run, output_dir=args.output_dir))
         return
-    print(f"Saved note to {result.note_path}")
+    except (OSError, RuntimeError) as exc:
+        raise SystemExit(f"Daemon error: {exc}")
+    for line in lines:
+        print(line)
 
 
-def main() -> None:
+def _build_command_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="time_bot.cli", description="time_system_bot maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search = subparsers.add_parser("search", help="Full-text search over time, task and diary notes")
+    search.add_argument("query", nargs="+", help="Words to look for")
+    search.add_argument("--limit", type=int, default=10, help="Maximum number of results")
+    search.set_defaults(func=_cmd_search)
+
+    export = subparsers.add_parser("export", help="Stream time entries as CSV, NDJSON or Parquet")
+    export.add_argument("--format", choices=("csv", "ndjson", "parquet"), default="csv")
+    export.add_argument("--output", type=Path, help="Output file (stdout for csv/ndjson when omitted)")
+    export.add_argument("--vault-dir", type=Path, help="Override Obsidian vault path")
+    export.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First date, YYYY-MM-DD")
+    export.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last date, YYYY-MM-DD")
+    export.add_argument("--maintag", action="append", help="Keep only this maintag (repeatable)")
+    export.add_argument("--subtag", action="append", help="Keep only this subtag (repeatable)")
+    export.set_defaults(func=_cmd_export)
+
+    migrate = subparsers.add_parser("migrate-daily", help="Fold per-entry time and diary notes into daily notes")
+    migrate.add_argument("--vault-dir", type=Path, help="Override Obsidian vault path")
+    migrate.add_argument("--diary-dir", type=Path, help="Override diary folder")
+    migrate.add_argument("--dry-run", action="store_true", help="Only print what would be folded")
+    migrate.set_defaults(func=_cmd_migrate_daily)
+
+    layout = subparsers.add_parser("migrate-layout", help="Move flat notes into date partition folders")
+    layout.add_argument("--format", help="Partition format, defaults to VAULT_PARTITION_FORMAT (e.g. %%Y/%%m)")
+    layout.add_argument("--dry-run", action="store_true", help="Only print what would be moved")
+    layout.set_defaults(func=_cmd_migrate_layout)
+
+    reprocess = subparsers.add_parser("reprocess", help="Retry failed and unparsed messages now")
+    reprocess.add_argument("--limit", type=int, default=50, help="Maximum number of messages to retry")
+    reprocess.add_argument("--no-scan", action="store_true", help="Skip scanning the event log for failures")
+    reprocess.add_argument("--notify", action="store_true", help="Tell the chats about messages that now succeed")
+    reprocess.add_argument("--dry-run", action="store_true", help="Only list the messages that are due")
+    reprocess.set_defaults(func=_cmd_reprocess)
+
+    logstats = subparsers.add_parser(
+        "logstats", help="Error rate, intent mix, latency and throughput from the event log"
+    )
+    logstats.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First UTC day, YYYY-MM-DD")
+    logstats.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last UTC day, YYYY-MM-DD")
+    logstats.add_argument("--days", type=int, default=7, help="Period length when --from is omitted")
+    logstats.add_argument("--compact", action="store_true", help="Compress segments of past months first")
+    logstats.add_argument("--import-legacy", action="store_true", help="Move processed_messages.jsonl into segments")
+    logstats.set_defaults(func=_cmd_logstats)
+
+    tags = subparsers.add_parser("tags", help="Train or evaluate the local maintag/subtag predictor")
+    tags.add_argument("action", choices=("train", "eval"))
+    tags.add_argument("--rebuild", action="store_true", help="Train from scratch instead of incrementally")
+    tags.add_argument("--min-confidence", type=float, help="Threshold to evaluate, defaults to the setting")
+    tags.set_defaults(func=_cmd_tags)
+
+    daemon = subparsers.add_parser("daemon", help="Keep a warm pipeline serving `send` on a Unix socket")
+    daemon.add_argument("--socket", type=Path, help="Socket path, defaults to TIME_BOT_SOCKET or the runtime dir")
+    daemon.set_defaults(func=_cmd_daemon)
+
+    send = subparsers.add_parser("send", help="Process a message in the running daemon")
+    send.add_argument("text", help="Message to parse")
+    send.add_argument("--dry-run", action="store_true", help="Print markdown instead of the saved paths")
+    send.add_argument("--output-dir", type=Path, help="Override Obsidian vault path")
+    send.add_argument("--socket", type=Path, help="Socket path, defaults to TIME_BOT_SOCKET or the runtime dir")
+    send.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for the daemon")
+    send.add_argument("--no-fallback", action="store_true", help="Fail instead of processing locally without a daemon")
+    send.set_defaults(func=_cmd_send)
+
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    arguments = list(sys.argv[1:] if argv is None else argv)
+    if arguments and arguments[0] in COMMANDS:
+        args = _build_command_parser().parse_args(arguments)
+        args.func(args)
+        return
+
     parser = argparse.ArgumentParser(description="Manual CLI entry point for time_system_bot")
-    parser.add_argument("text", help="Message to parse")
+    parser.add_argument("text", help=f"Message to parse (or one of the commands: {', '.join(COMMANDS)})")
     parser.add_argument("--dry-run", action="store_true", help="Print markdown instead of writing file")
     parser.add_argument("--output-dir", type=Path, help="Override Obsidian vault path")
-    args = parser.parse_args()
+    parser.add_argument("--profile", action="store_true", help="Write a profile of this message to LOG_DIR/profiles")
+    args = parser.parse_args(arguments)
+
+    import asyncio
+
+    if args.profile:
+        from time_bot.profiling import get_profiler
+
+        get_profiler().arm(1)
 
     asyncio.run(run_cli(args.text, dry_run=args.dry_run, output_dir=args.output_dir))
 
@@ -0,0 +1,199 @@
+"""Warm pipeline process behind `cli daemon`, and the thin client behind `cli send`.
+
+The daemon imports the pipeline once, keeps a single AsyncOpenAI client (and
+its connection pool), the loaded schemas and the tag predictor, and serves
+messages on a Unix domain socket. Each connection carries one JSON request
+line and gets one JSON response line back.
+
+The client side of this module only uses the standard library, so `cli send`
+starts without loading settings, pydantic or the OpenAI SDK. For the same
+reason the socket path comes from `--socket` or TIME_BOT_SOCKET rather than
+from the settings.
+"""
+from __future__ import annotations
+
+import json
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+SOCKET_ENV_VAR = "TIME_BOT_SOCKET"
+MAX_REQUEST_BYTES = 1 << 20
+
+
+class DaemonUnavailableError(ConnectionError):
+    """Raised by the client when no daemon listens on the socket."""
+
+
+def default_socket_path() -> Path:
+    """TIME_BOT_SOCKET, else time_bot.sock in XDG_RUNTIME_DIR, else a per-user name in the temp dir."""
+
+    configured = os.environ.get(SOCKET_ENV_VAR)
+    if configured:
+        return Path(configured)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "time_bot.sock"
+    return Path(tempfile.gettempdir()) / f"time_bot-{os.getuid()}.sock"
+
+
+def request(payload: Dict[str, Any], socket_path: Path | None = None, *, timeout: float | None = None) -> Dict[str, Any]:
+    """Send one request to the daemon and return its decoded response."""
+
+    path = str(socket_path or default_socket_path())
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        try:
+            client.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError) as exc:
+            raise DaemonUnavailableError(f"No time_bot daemon listens on {path}") from exc
+        client.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := client.recv(65536):
+            chunks.append(chunk)
+    if not chunks:
+        raise ConnectionError(f"The daemon on {path} closed the connection without a response")
+    return json.loads(b"".join(chunks))
+
+
+def _socket_in_use(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def _warm_up() -> None:
+    """Load what the first message would otherwise pay for."""
+
+    import time_bot.pipeline  # noqa: F401 - the import chain is most of a cold start
+    from time_bot import sgr_client
+    from time_bot.config import get_settings
+    from time_bot.tag_predictor import get_tag_predictor
+
+    get_settings()
+    sgr_client._get_client()
+    schemas_dir = Path(sgr_client.__file__).resolve().parent.parent.parent / "schemas"
+    for schema_path in sorted(schemas_dir.glob("*.json")):
+        sgr_client._load_schema(schema_path.stem)
+    get_tag_predictor()
+
+
+async def _handle_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if payload.get("op") == "ping":
+        return {"ok": True, "pid": os.getpid()}
+
+    from time_bot.cli import result_lines
+    from time_bot.pipeline import process_message_text
+
+    text = payload.get("text")
+    if not isinstance(text, str) or not text.strip():
+        return {"ok": False, "error": "Request has no text"}
+    output_dir = Path(payload["output_dir"]) if payload.get("output_dir") else None
+    result = await process_message_text(text, output_dir=output_dir)
+    return {"ok": True, "lines": result_lines(result, dry_run=bool(payload.get("dry_run")))}
+
+
+async def serve(socket_path: Path | None = None) -> None:
+    """Serve requests until SIGINT/SIGTERM; the socket file is removed on exit."""
+
+    import asyncio
+    import signal
+
+    from time_bot.logging_utils import LOGGER
+    from time_bot.metrics import METRICS
+    from time_bot.profiling import install_signal_toggle
+    from time_bot.vault_sync import build_vault_sync
+
+    path = Path(socket_path or default_socket_path())
+    if path.exists():
+        if _socket_in_use(path):
+            raise RuntimeError(f"Another daemon already listens on {path}")
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    await asyncio.to_thread(_warm_up)
+    LOGGER.info("CLI daemon warmed up in %.0f ms", (time.perf_counter() - started) * 1000)
+
+    async def _on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        started = time.perf_counter()
+        try:
+            line = await reader.readline()
+            try:
+                response = await _handle_request(json.loads(line))
+            except Exception as exc:  # noqa: BLE001 - the client gets the error, the daemon keeps serving
+                LOGGER.exception("CLI daemon request failed")
+                response = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            response["elapsed_ms"] = round(elapsed_ms, 1)
+            METRICS.increment("cli_daemon.requests" if response["ok"] else "cli_daemon.errors")
+            METRICS.observe("cli_daemon.request_ms", elapsed_ms)
+            writer.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            await writer.drain()
+        except (ConnectionError, ValueError) as exc:
+            LOGGER.warning("CLI daemon dropped a connection: %s", exc)
+        finally:
+            writer.close()
+
+    old_umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(_on_connection, path=str(path), limit=MAX_REQUEST_BYTES)
+    finally:
+        os.umask(old_umask)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    install_signal_toggle(loop)
+    vault_sync = build_vault_sync()
+    if vault_sync is not None:
+        vault_sync.start()
+    LOGGER.info("CLI daemon listening on %s", path)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        for signum in (signal.SIGINT, signal.SIGTERM, getattr(signal, "SIGUSR2", None)):
+            if signum is not None:
+                loop.remove_signal_handler(signum)
+        if vault_sync is not None:
+            await asyncio.to_thread(vault_sync.stop)
+        path.unlink(missing_ok=True)
+        LOGGER.info("CLI daemon stopped")
+
+
+def send(
+    text: str,
+    *,
+    dry_run: bool = False,
+    output_dir: Path | None = None,
+    socket_path: Path | None = None,
+    timeout: float | None = None,
+) -> List[str]:
+    """Process `text` in the daemon and return the lines `cli` would print."""
+
+    payload: Dict[str, Any] = {"text": text, "dry_run": dry_run}
+    if output_dir is not None:
+        payload["output_dir"] = str(Path(output_dir).resolve())
+    response = request(payload, socket_path, timeout=timeout)
+    if not response.get("ok"):
+        raise RuntimeError(response.get("error") or "The daemon could not process the message")
+    return list(response.get("lines", []))
+
+
+__all__ = [
+    "DaemonUnavailableError",
+    "SOCKET_ENV_VAR",
+    "default_socket_path",
+    "request",
+    "send",
+    "serve",
+]
@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Optional
+from typing import List, Literal, Optional
 
-from pydantic import Field, SecretStr
+from pydantic import Field, SecretStr, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from time_bot.vault_layout import validate_partition_format
+
 
 class Settings(BaseSettings):
     """Project-level settings loaded from environment variables/.env."""
@@ -19,14 +21,85 @@ class Settings(BaseSettings):
     model_name: str = Field(..., alias="MODEL_NAME")
     sgr_endpoint: Optional[str] = Field(None, alias="SGR_ENDPOINT")
 
+    classifier_model_name: Optional[str] = Field(None, alias="CLASSIFIER_MODEL_NAME")
+    classifier_fallback_model_name: Optional[str] = Field(None, alias="CLASSIFIER_FALLBACK_MODEL_NAME")
+    time_entry_model_name: Optional[str] = Field(None, alias="TIME_ENTRY_MODEL_NAME")
+    time_entry_fallback_model_name: Optional[str] = Field(None, alias="TIME_ENTRY_FALLBACK_MODEL_NAME")
+    task_entry_model_name: Optional[str] = Field(None, alias="TASK_ENTRY_MODEL_NAME")
+    task_entry_fallback_model_name: Optional[str] = Field(None, alias="TASK_ENTRY_FALLBACK_MODEL_NAME")
+    model_fallback_latency_ms: float = Field(0.0, ge=0, alias="MODEL_FALLBACK_LATENCY_MS")
+    model_fallback_error_rate: float = Field(0.5, ge=0, le=1, alias="MODEL_FALLBACK_ERROR_RATE")
+    model_health_window: int = Field(20, ge=1, alias="MODEL_HEALTH_WINDOW")
+    model_fallback_cooldown_seconds: float = Field(60.0, ge=0, alias="MODEL_FALLBACK_COOLDOWN_SECONDS")
+    llm_concurrency_initial: float = Field(4.0, ge=1, alias="LLM_CONCURRENCY_INITIAL")
+    llm_concurrency_min: int = Field(1, ge=1, alias="LLM_CONCURRENCY_MIN")
+    llm_concurrency_max: int = Field(16, ge=1, alias="LLM_CONCURRENCY_MAX")
+
     obsidian_vault_dir: Path = Field(..., alias="OBSIDIAN_VAULT_DIR")
     obsidian_tasks_path: Path = Field(..., alias="OBSIDIAN_TASKS_PATH")
     obsidian_diary_folder: Path = Field(..., alias="OBSIDIAN_DIARY_FOLDER")
+    obsidian_inbox_folder: Optional[Path] = Field(None, alias="OBSIDIAN_INBOX_FOLDER")
     timezone: str = Field("Europe/Riga", alias="TIMEZONE")
+    note_storage_mode: Literal["per_entry", "daily"] = Field("per_entry", alias="NOTE_STORAGE_MODE")
+    vault_partition_format: str = Field("", alias="VAULT_PARTITION_FORMAT")
+    vault_scan_workers: int = Field(1, ge=1, alias="VAULT_SCAN_WORKERS")
+    view_cache_ttl_seconds: float = Field(60.0, ge=0, alias="VIEW_CACHE_TTL_SECONDS")
+    tasks_page_size: int = Field(15, ge=1, le=100, alias="TASKS_PAGE_SIZE")
+
+    telegram_global_rate: float = Field(30.0, gt=0, alias="TELEGRAM_GLOBAL_RATE")
+    telegram_chat_rate: float = Field(1.0, gt=0, alias="TELEGRAM_CHAT_RATE")
+    telegram_chat_burst: int = Field(3, ge=1, alias="TELEGRAM_CHAT_BURST")
+    telegram_max_retries: int = Field(3, ge=0, alias="TELEGRAM_MAX_RETRIES")
+    admin_chat_ids: List[int] = Field(default_factory=list, alias="ADMIN_CHAT_IDS")
+
+    message_deadline_seconds: float = Field(30.0, ge=0, alias="MESSAGE_DEADLINE_SECONDS")
+    deadline_classifier_share: float = Field(0.4, gt=0, le=1, alias="DEADLINE_CLASSIFIER_SHARE")
+    deadline_write_reserve_seconds: float = Field(2.0, ge=0, alias="DEADLINE_WRITE_RESERVE_SECONDS")
+
+    vault_sync_mode: Literal["off", "git", "rsync", "command"] = Field("off", alias="VAULT_SYNC_MODE")
+    vault_sync_window_seconds: float = Field(10.0, ge=0, alias="VAULT_SYNC_WINDOW_SECONDS")
+    vault_sync_max_batch: int = Field(100, ge=1, alias="VAULT_SYNC_MAX_BATCH")
+    vault_sync_backoff_seconds: float = Field(30.0, ge=0, alias="VAULT_SYNC_BACKOFF_SECONDS")
+    vault_sync_timeout_seconds: float = Field(120.0, gt=0, alias="VAULT_SYNC_TIMEOUT_SECONDS")
+    vault_sync_git_push: bool = Field(False, alias="VAULT_SYNC_GIT_PUSH")
+    vault_sync_target: str = Field("", alias="VAULT_SYNC_TARGET")
+    vault_sync_command: str = Field("", alias="VAULT_SYNC_COMMAND")
+
+    tag_predictor_enabled: bool = Field(False, alias="TAG_PREDICTOR_ENABLED")
+    tag_predictor_min_confidence: float = Field(0.8, ge=0, le=1, alias="TAG_PREDICTOR_MIN_CONFIDENCE")
+    tag_predictor_k: int = Field(5, ge=1, alias="TAG_PREDICTOR_K")
+
+    reprocess_interval_seconds: float = Field(300.0, ge=0, alias="REPROCESS_INTERVAL_SECONDS")
+    reprocess_idle_seconds: float = Field(60.0, ge=0, alias="REPROCESS_IDLE_SECONDS")
+    reprocess_concurrency: int = Field(2, ge=1, alias="REPROCESS_CONCURRENCY")
+    reprocess_rate_per_minute: float = Field(20.0, gt=0, alias="REPROCESS_RATE_PER_MINUTE")
+    reprocess_max_attempts: int = Field(5, ge=1, alias="REPROCESS_MAX_ATTEMPTS")
+    reprocess_backoff_seconds: float = Field(120.0, ge=0, alias="REPROCESS_BACKOFF_SECONDS")
+
+    coalesce_window_seconds: float = Field(0.0, ge=0, alias="COALESCE_WINDOW_SECONDS")
+    coalesce_max_batch: int = Field(10, ge=1, alias="COALESCE_MAX_BATCH")
+
+    dedupe_enabled: bool = Field(True, alias="DEDUPE_ENABLED")
+    dedupe_ttl_hours: float = Field(72.0, gt=0, alias="DEDUPE_TTL_HOURS")
+    dedupe_ring_size: int = Field(10_000, ge=1, alias="DEDUPE_RING_SIZE")
 
     cache_dir: Path = Field(Path("cache"), alias="CACHE_DIR")
     log_dir: Path = Field(Path("logs"), alias="LOG_DIR")
 
+    profile_sample_every: int = Field(0, ge=0, alias="PROFILE_SAMPLE_EVERY")
+    profile_vault_scans: bool = Field(False, alias="PROFILE_VAULT_SCANS")
+    profile_mode: Literal["sample", "cprofile"] = Field("sample", alias="PROFILE_MODE")
+    profile_interval_ms: float = Field(5.0, gt=0, alias="PROFILE_INTERVAL_MS")
+
+    sgr_cassette_mode: Literal["off", "record", "replay"] = Field("off", alias="SGR_CASSETTE_MODE")
+    sgr_cassette_path: Optional[Path] = Field(None, alias="SGR_CASSETTE_PATH")
+    sgr_cassette_latency_scale: float = Field(0.0, ge=0, alias="SGR_CASSETTE_LATENCY_SCALE")
+
+    @field_validator("vault_partition_format")
+    @classmethod
+    def _check_partition_format(cls, value: str) -> str:
+        return validate_partition_format(value.strip("/"))
+
 
 _SETTINGS: Optional[Settings] = None
 
@@ -0,0 +1,367 @@
+"""Daily rollup notes: one Markdown file per day holding a block per entry."""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Literal, Mapping, Sequence
+
+from time_bot.models import DiaryNote, TimeNote
+from time_bot.vault_layout import iter_note_files
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; in-process locking only
+    fcntl = None  # type: ignore[assignment]
+
+DAILY_TIME_PREFIX = "Time Log "
+DAILY_DIARY_PREFIX = "Diary "
+TIME_BLOCK_TYPE = "time-entry"
+DIARY_BLOCK_TYPE = "diary-entry"
+_DAILY_TAGS = {TIME_BLOCK_TYPE: "time_system_daily", DIARY_BLOCK_TYPE: "diary_daily"}
+
+_DAILY_NAME_PATTERN = re.compile(r"^(?:Time Log|Diary) \d{4}-\d{2}-\d{2}\.md$")
+_BLOCK_PATTERN = re.compile(
+    r"<!-- entry:(?P<note_id>[0-9a-f]+) -->\n(?P<content>.*?)<!-- /entry:(?P=note_id) -->\n?",
+    re.DOTALL,
+)
+_FIELDS_PATTERN = re.compile(r"```(?P<kind>[a-z-]+)\n(?P<fields>.*?)\n```", re.DOTALL)
+
+_PATH_LOCKS: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_PATH_LOCKS_GUARD = threading.Lock()
+
+
+@dataclass(slots=True)
+class DailyBlock:
+    note_id: str
+    kind: str
+    heading: str
+    fields: Dict[str, str]
+    body: str
+
+
+def daily_note_name(prefix: str, day: date) -> str:
+    return f"{prefix}{day.isoformat()}.md"
+
+
+def is_daily_note(path: Path | str) -> bool:
+    """Per-entry notes always end with an ` HH-MM` stamp, so the names never collide."""
+
+    return _DAILY_NAME_PATTERN.match(Path(path).name) is not None
+
+
+def format_block(note_id: str, kind: str, heading: str, fields: Mapping[str, object], body: str) -> str:
+    field_lines = "\n".join(f"{key}: {value}" for key, value in fields.items() if value not in (None, ""))
+    body = body.strip("\n")
+    parts = [f"<!-- entry:{note_id} -->", f"### {heading}", f"```{kind}", field_lines, "```"]
+    if body:
+        parts.append(body)
+    parts.append(f"<!-- /entry:{note_id} -->")
+    return "\n".join(parts) + "\n"
+
+
+def render_time_block(note: TimeNote) -> str:
+    entry = note.entry
+    body_lines = []
+    if entry.comment:
+        body_lines.extend([entry.comment, ""])
+    body_lines.extend(["Исходный текст:", f"> {entry.raw_text}"])
+    fields = {
+        "time": entry.minutes,
+        "date": entry.date.isoformat(),
+        "maintag": entry.maintag,
+        "subtag": entry.subtag,
+        "start_time": entry.start_time.strftime("%H:%M") if entry.start_time else None,
+    }
+    return format_block(note.note_id, TIME_BLOCK_TYPE, entry.title, fields, "\n".join(body_lines))
+
+
+def render_diary_block(note: DiaryNote) -> str:
+    entry = note.entry
+    timestamp = entry.created_at.strftime("%Y-%m-%d %H-%M")
+    heading = f"{entry.created_at.strftime('%H:%M')} {entry.title}"
+    return format_block(note.note_id, DIARY_BLOCK_TYPE, heading, {"date": timestamp}, entry.body)
+
+
+def to_daily_note(note: TimeNote | DiaryNote) -> str:
+    """Point `note` at its day's rollup file (same folder) and return the block to append."""
+
+    if isinstance(note, TimeNote):
+        name = daily_note_name(DAILY_TIME_PREFIX, note.entry.date)
+        block = render_time_block(note)
+    else:
+        name = daily_note_name(DAILY_DIARY_PREFIX, note.entry.created_at.date())
+        block = render_diary_block(note)
+    note.file_path = str(Path(note.file_path).with_name(name))
+    note.file_name = name
+    return block
+
+
+def daily_note_header(kind: str, day: date) -> str:
+    return "\n".join(["---", "tags:", f"  - {_DAILY_TAGS[kind]}", f"date: {day.isoformat()}", "---", "", ""])
+
+
+def _lock_for(path: Path) -> threading.Lock:
+    with _PATH_LOCKS_GUARD:
+        return _PATH_LOCKS[str(path)]
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Hold the day's note against other threads and, via flock on a sidecar file, other processes.
+
+    The bot, the CLI daemon and one-shot CLI runs all rewrite the same daily
+    notes. The note itself cannot carry the lock because every write replaces
+    it with a new file, so `.<name>.lock` next to it does; it is never removed.
+    """
+
+    with _lock_for(path):
+        if fcntl is None:
+            yield
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path.with_name(f".{path.name}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(content, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def append_block(path: Path, block: str) -> Path:
+    """Append a block to the day's note, creating it with a header if needed.
+
+    The whole file is rewritten through a temp file + rename so readers never
+    observe a half-written note.
+    """
+
+    return append_blocks(path, [block])
+
+
+def append_blocks(path: Path, blocks: Sequence[str], *, skip_existing: bool = False) -> Path:
+    """Append several blocks at once; with `skip_existing`, blocks whose id the note already has are left out."""
+
+    path = Path(path)
+    kind = TIME_BLOCK_TYPE if path.name.startswith(DAILY_TIME_PREFIX) else DIARY_BLOCK_TYPE
+    day = date.fromisoformat(path.stem[-10:])
+    with _locked(path):
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            content = daily_note_header(kind, day)
+        if skip_existing:
+            present = {match.group("note_id") for match in _BLOCK_PATTERN.finditer(content)}
+            blocks = [block for block in blocks if _block_id(block) not in present]
+            if not blocks:
+                return path
+        if content and not content.endswith("\n"):
+            content += "\n"
+        if not content.endswith("\n\n"):
+            content += "\n"
+        _atomic_write(path, content + "\n".join(blocks))
+    return path
+
+
+def _block_id(block: str) -> str | None:
+    match = _BLOCK_PATTERN.match(block)
+    return match.group("note_id") if match else None
+
+
+def get_block(path: Path, note_id: str) -> str | None:
+    try:
+        content = Path(path).read_text(encoding="utf-8")
+    except OSError:
+        return None
+    for match in _BLOCK_PATTERN.finditer(content):
+        if match.group("note_id") == note_id:
+            return match.group(0)
+    return None
+
+
+def replace_block(path: Path, note_id: str, block: str | None) -> bool:
+    """Replace (or with `None`, remove) the block of `note_id`; returns False if it is missing."""
+
+    path = Path(path)
+    if not path.exists():
+        return False
+    with _locked(path):
+        try:
+            content = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        for match in _BLOCK_PATTERN.finditer(content):
+            if match.group("note_id") != note_id:
+                continue
+            replacement = block or ""
+            if replacement and not replacement.endswith("\n"):
+                replacement += "\n"
+            _atomic_write(path, content[: match.start()] + replacement + content[match.end() :])
+            return True
+    return False
+
+
+def iter_blocks(path: Path) -> Iterator[DailyBlock]:
+    try:
+        content = Path(path).read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return
+    for match in _BLOCK_PATTERN.finditer(content):
+        inner = match.group("content")
+        heading, _, rest = inner.partition("\n")
+        fields_match = _FIELDS_PATTERN.search(rest)
+        if fields_match is None:
+            continue
+        fields: Dict[str, str] = {}
+        for line in fields_match.group("fields").splitlines():
+            key, sep, value = line.partition(":")
+            if sep:
+                fields[key.strip().lower()] = value.strip()
+        yield DailyBlock(
+            note_id=match.group("note_id"),
+            kind=fields_match.group("kind"),
+            heading=heading.removeprefix("### ").strip(),
+            fields=fields,
+            body=rest[fields_match.end() :].strip("\n"),
+        )
+
+
+def split_note(content: str) -> tuple[Dict[str, str], List[str]]:
+    """Flat `key: value` frontmatter plus body lines of a per-entry note."""
+
+    lines = content.splitlines()
+    if not lines or lines[0].strip() != "---":
+        return {}, lines
+    frontmatter: Dict[str, str] = {}
+    for idx, line in enumerate(lines[1:], start=1):
+        if line.strip() == "---":
+            return frontmatter, lines[idx + 1 :]
+        key, sep, value = line.partition(":")
+        if sep and not line.startswith(" "):
+            frontmatter[key.strip().lower()] = value.strip()
+    return {}, lines
+
+
+def _time_block_from_note(
+    note_id: str, frontmatter: Dict[str, str], body_lines: List[str]
+) -> tuple[date, str] | None:
+    if not frontmatter.get("maintag") or not frontmatter.get("time"):
+        return None
+    try:
+        day = date.fromisoformat(frontmatter.get("date", ""))
+    except ValueError:
+        return None
+    lines = list(body_lines)
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    heading = lines.pop(0).strip() if lines else "Note"
+    fields = {key: frontmatter.get(key) for key in ("time", "date", "maintag", "subtag")}
+    return day, format_block(note_id, TIME_BLOCK_TYPE, heading, fields, "\n".join(lines))
+
+
+def _diary_block_from_note(
+    note_id: str, frontmatter: Dict[str, str], body_lines: List[str]
+) -> tuple[date, str] | None:
+    try:
+        created_at = datetime.strptime(frontmatter.get("date", ""), "%Y-%m-%d %H-%M")
+    except ValueError:
+        return None
+    body = "\n".join(body_lines).strip("\n")
+    title = next((line.strip() for line in body_lines if line.strip()), "Запись")
+    heading = f"{created_at.strftime('%H:%M')} {title}"
+    fields = {"date": created_at.strftime("%Y-%m-%d %H-%M")}
+    return created_at.date(), format_block(note_id, DIARY_BLOCK_TYPE, heading, fields, body)
+
+
+def _source_note_id(path: Path) -> str:
+    return hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:32]
+
+
+def migrate_to_daily(
+    directory: Path,
+    kind: Literal["time", "diary"],
+    *,
+    partition_format: str = "",
+    dry_run: bool = False,
+    note_ids: Mapping[Path, str] | None = None,
+) -> Dict[Path, List[Path]]:
+    """Fold per-entry notes of `directory` into daily notes; return daily note -> folded files.
+
+    Each daily note lives in the folder its entries came from. A block keeps
+    the journal's note id of its file (`note_ids`), so journal entries still
+    find it once relocated; other files get an id derived from their path.
+    Originals are deleted only after their day's note has been written, and
+    blocks already in a daily note are not appended again, so an interrupted
+    run can simply be repeated.
+    """
+
+    directory = Path(directory)
+    note_ids = note_ids or {}
+    if kind == "time":
+        prefix, convert = DAILY_TIME_PREFIX, _time_block_from_note
+    else:
+        prefix, convert = DAILY_DIARY_PREFIX, _diary_block_from_note
+
+    by_day: Dict[tuple[Path, date], List[tuple[str, Path, str]]] = defaultdict(list)
+    if directory.exists():
+        for path in iter_note_files(directory, partition_format):
+            if is_daily_note(path):
+                continue
+            try:
+                frontmatter, body_lines = split_note(path.read_text(encoding="utf-8"))
+            except (OSError, UnicodeDecodeError):
+                continue
+            note_id = note_ids.get(path) or _source_note_id(path)
+            converted = convert(note_id, frontmatter, body_lines) if frontmatter else None
+            if converted is None:
+                continue
+            day, block = converted
+            # File names end with "YYYY-MM-DD HH-MM", which orders entries within a day.
+            by_day[(path.parent, day)].append((path.stem[-16:], path, block))
+
+    plan: Dict[Path, List[Path]] = {}
+    for folder, day in sorted(by_day):
+        items = sorted(by_day[(folder, day)])
+        daily_path = folder / daily_note_name(prefix, day)
+        plan[daily_path] = [path for _, path, _ in items]
+        if dry_run:
+            continue
+        append_blocks(daily_path, [block for _, _, block in items], skip_existing=True)
+        for _, path, _ in items:
+            path.unlink(missing_ok=True)
+    return plan
+
+
+__all__ = [
+    "DAILY_DIARY_PREFIX",
+    "DAILY_TIME_PREFIX",
+    "DIARY_BLOCK_TYPE",
+    "DailyBlock",
+    "TIME_BLOCK_TYPE",
+    "append_block",
+    "append_blocks",
+    "daily_note_name",
+    "format_block",
+    "get_block",
+    "is_daily_note",
+    "iter_blocks",
+    "migrate_to_daily",
+    "render_diary_block",
+    "render_time_block",
+    "replace_block",
+    "split_note",
+    "to_daily_note",
+]
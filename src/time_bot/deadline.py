@@ -0,0 +1,152 @@
+"""Per-message time budget shared by the pipeline stages and their LLM calls."""
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceededError(TimeoutError):
+    """The message ran out of its time budget."""
+
+    def __init__(self, stage: str | None = None):
+        super().__init__(f"Deadline exceeded in stage {stage!r}" if stage else "Deadline exceeded")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute monotonic expiry plus the expiry of the stage currently running.
+
+    A stage may take `share` of the remaining time and always leaves `reserve`
+    seconds for what follows (writing the note, replying). Stages get their own
+    `Deadline` view so concurrent tasks of one message don't share stage state;
+    stage timings are collected in one dict.
+    """
+
+    def __init__(
+        self,
+        expires_at: float,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        stage: str | None = None,
+        stage_expires_at: float | None = None,
+        timings_ms: Dict[str, float] | None = None,
+        started_at: float | None = None,
+    ):
+        self._clock = clock
+        self.started_at = clock() if started_at is None else started_at
+        self.expires_at = expires_at
+        self.stage = stage
+        self.stage_expires_at = expires_at if stage_expires_at is None else stage_expires_at
+        self.timings_ms: Dict[str, float] = {} if timings_ms is None else timings_ms
+
+    @classmethod
+    def after(cls, seconds: float, *, clock: Callable[[], float] = time.monotonic) -> "Deadline":
+        return cls(clock() + seconds, clock=clock)
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started_at
+
+    def remaining(self) -> float:
+        return self.expires_at - self._clock()
+
+    def budget(self) -> float:
+        """Seconds left for the current stage (may be negative)."""
+
+        return min(self.stage_expires_at, self.expires_at) - self._clock()
+
+    def check(self) -> None:
+        if self.budget() <= 0:
+            raise DeadlineExceededError(self.stage)
+
+    def for_stage(self, name: str, *, share: float = 1.0, reserve: float = 0.0) -> "Deadline":
+        remaining = self.remaining()
+        stage_seconds = max(0.0, min(remaining * share, remaining - reserve))
+        return Deadline(
+            self.expires_at,
+            clock=self._clock,
+            stage=name,
+            stage_expires_at=min(self.stage_expires_at, self._clock() + stage_seconds),
+            timings_ms=self.timings_ms,
+            started_at=self.started_at,
+        )
+
+
+_CURRENT: ContextVar[Deadline | None] = ContextVar("time_bot_deadline", default=None)
+
+
+def current_deadline() -> Deadline | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float, *, clock: Callable[[], float] = time.monotonic) -> Iterator[Deadline | None]:
+    """Install a deadline for the enclosed code unless one is already running (or `seconds` is 0)."""
+
+    existing = _CURRENT.get()
+    if existing is not None or seconds <= 0:
+        yield existing
+        return
+    deadline = Deadline.after(seconds, clock=clock)
+    token = _CURRENT.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _CURRENT.reset(token)
+
+
+@contextmanager
+def stage(name: str, *, share: float = 1.0, reserve: float = 0.0) -> Iterator[Deadline | None]:
+    """Run a named pipeline stage inside the current deadline, if any, recording its duration."""
+
+    deadline = _CURRENT.get()
+    if deadline is None:
+        yield None
+        return
+    child = deadline.for_stage(name, share=share, reserve=reserve)
+    token = _CURRENT.set(child)
+    started = deadline._clock()
+    try:
+        yield child
+    finally:
+        _CURRENT.reset(token)
+        elapsed_ms = (deadline._clock() - started) * 1000
+        child.timings_ms[name] = child.timings_ms.get(name, 0.0) + elapsed_ms
+
+
+async def run_stage(name: str, awaitable: Awaitable[T], *, share: float = 1.0, reserve: float = 0.0) -> T:
+    """Await `awaitable` as stage `name`, cancelling it when the stage budget runs out."""
+
+    with stage(name, share=share, reserve=reserve) as deadline:
+        if deadline is None:
+            return await awaitable
+        try:
+            async with asyncio.timeout(max(deadline.budget(), 0.0)):
+                return await awaitable
+        except TimeoutError:
+            raise DeadlineExceededError(name) from None
+
+
+def stage_budget() -> float | None:
+    """Seconds the current stage may still spend, or None without a deadline; raises when exhausted."""
+
+    deadline = _CURRENT.get()
+    if deadline is None:
+        return None
+    deadline.check()
+    return deadline.budget()
+
+
+__all__ = [
+    "Deadline",
+    "DeadlineExceededError",
+    "current_deadline",
+    "deadline_scope",
+    "run_stage",
+    "stage",
+    "stage_budget",
+]
@@ -0,0 +1,321 @@
+"""Month segments of the processed-messages log with a per-day offset index.
+
+Events are appended to `YYYY-MM.jsonl` in the events directory. The sidecar
+`YYYY-MM.jsonl.idx` records one `day offset` line each time a new UTC day
+starts, so a reader can seek straight to the days it needs. Once a month is
+over its segment is rewritten as `YYYY-MM.jsonl.gz`, one gzip member per
+day, with a sidecar of `day offset length` lines. That happens on a
+background thread started when the first event of a new month arrives (or via
+`cli logstats --compact`), never inside `append`. Concatenated members are
+still an ordinary gzip file, and each one can be inflated on its own.
+"""
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import re
+import shutil
+import threading
+import zlib
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, List, Mapping, NamedTuple
+
+from time_bot.config import get_settings
+from time_bot.serialization import dumps_bytes, loads
+
+EVENTS_DIR_NAME = "events"
+LEGACY_FILE_NAME = "processed_messages.jsonl"
+INDEX_SUFFIX = ".idx"
+READ_CHUNK_SIZE = 64 * 1024
+
+_SEGMENT_PATTERN = re.compile(r"^(\d{4}-\d{2})\.jsonl(\.gz)?$")
+# logging_utils imports this module, so use the logger by name.
+_LOGGER = logging.getLogger("time_bot")
+
+
+class DayRange(NamedTuple):
+    day: str
+    offset: int
+    end: int | None
+
+
+def _event_day(payload: Mapping[str, Any]) -> str:
+    timestamp = payload.get("timestamp")
+    if isinstance(timestamp, str) and len(timestamp) >= 10:
+        return timestamp[:10]
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _read_index(path: Path) -> List[DayRange]:
+    """Parse a sidecar; open segments store only starts, closed ones also lengths."""
+
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) == 2:
+            entries.append((parts[0], int(parts[1]), None))
+        elif len(parts) == 3:
+            entries.append((parts[0], int(parts[1]), int(parts[1]) + int(parts[2])))
+    ranges = []
+    for position, (day, offset, end) in enumerate(entries):
+        if end is None and position + 1 < len(entries):
+            end = entries[position + 1][1]
+        ranges.append(DayRange(day, offset, end))
+    return ranges
+
+
+def _iter_lines(handle: BinaryIO, offset: int, end: int | None) -> Iterator[bytes]:
+    handle.seek(offset)
+    position = offset
+    for line in handle:
+        position += len(line)
+        yield line
+        if end is not None and position >= end:
+            return
+
+
+def _iter_member_lines(handle: BinaryIO, offset: int, end: int) -> Iterator[bytes]:
+    """Inflate one gzip member chunk by chunk and yield its lines."""
+
+    handle.seek(offset)
+    inflater = zlib.decompressobj(wbits=31)
+    remaining = end - offset
+    pending = b""
+    while remaining > 0:
+        chunk = handle.read(min(READ_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        pending += inflater.decompress(chunk)
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    pending += inflater.flush()
+    if pending:
+        yield from pending.split(b"\n")
+
+
+def _decode(line: bytes) -> dict | None:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        event = loads(line)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+class EventLog:
+    """Append-only event store; appends are serialized with a lock, reads never take it."""
+
+    def __init__(self, directory: Path, *, legacy_path: Path | None = None):
+        self.directory = Path(directory)
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._open_month: str | None = None
+        self._last_day: str | None = None
+        self._compactor: threading.Thread | None = None
+        # Serializes compactions (background thread, `cli logstats --compact`); appends never take it.
+        self._compact_lock = threading.Lock()
+        self._compact_before = ""
+
+    def segment_path(self, month: str, *, compressed: bool = False) -> Path:
+        return self.directory / (f"{month}.jsonl.gz" if compressed else f"{month}.jsonl")
+
+    def months(self) -> List[str]:
+        if not self.directory.is_dir():
+            return []
+        found = set()
+        for entry in os.scandir(self.directory):
+            match = _SEGMENT_PATTERN.match(entry.name)
+            if match:
+                found.add(match.group(1))
+        return sorted(found)
+
+    def append(self, payload: Mapping[str, Any]) -> None:
+        day = _event_day(payload)
+        month = day[:7]
+        line = dumps_bytes(payload) + b"\n"
+        with self._lock:
+            if month != self._open_month:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._open_month = month
+                ranges = _read_index(self._index_path(self.segment_path(month)))
+                self._last_day = ranges[-1].day if ranges else None
+                self._start_compaction(before=month)
+            segment = self.segment_path(month)
+            with segment.open("ab") as handle:
+                offset = handle.seek(0, os.SEEK_END)
+                if offset == 0:
+                    # The segment was compressed away (by this or another process) since the last append.
+                    self._last_day = None
+                if day != self._last_day:
+                    with self._index_path(segment).open("a", encoding="utf-8") as index:
+                        index.write(f"{day} {offset}\n")
+                    self._last_day = day
+                handle.write(line)
+
+    @staticmethod
+    def _index_path(segment: Path) -> Path:
+        return segment.with_name(segment.name + INDEX_SUFFIX)
+
+    def _start_compaction(self, *, before: str) -> None:
+        """Compress closed months off the caller's thread; called with the append lock held."""
+
+        self._compact_before = max(self._compact_before, before)
+        if self._compactor is not None:
+            return  # the running compactor picks up the newer month before it exits
+        self._compactor = threading.Thread(target=self._compact_pending, name="event-log-compact", daemon=True)
+        self._compactor.start()
+
+    def _compact_pending(self) -> None:
+        done = ""
+        while True:
+            with self._lock:
+                before = self._compact_before
+                if before <= done:
+                    self._compactor = None
+                    return
+            try:
+                self.compact(before=before)
+            except OSError as exc:
+                _LOGGER.warning("Event log compaction failed, the segments stay uncompressed: %s", exc)
+            done = before
+
+    def wait_for_compaction(self) -> None:
+        while (compactor := self._compactor) is not None:
+            compactor.join()
+
+    def compress(self, month: str) -> Path | None:
+        """Rewrite a closed month as one gzip member per day with a `day offset length` sidecar.
+
+        When the month already has a compressed segment (events written after
+        it was compressed), the new days are added as further members behind
+        the existing ones. Returns None (and keeps the plain segment) when an
+        event for that month was appended while it was being compressed.
+        """
+
+        source = self.segment_path(month)
+        try:
+            size = source.stat().st_size
+        except FileNotFoundError:  # compressed meanwhile by another compaction
+            return None
+        target = self.segment_path(month, compressed=True)
+        target_index = self._index_path(target)
+        ranges = _read_index(self._index_path(source))
+        if not ranges:
+            ranges = [DayRange(f"{month}-01", 0, None)]
+        existing = _read_index(target_index) if target.exists() else []
+        tmp_target = target.with_name(target.name + ".tmp")
+        tmp_index = target_index.with_name(target_index.name + ".tmp")
+        with source.open("rb") as reader, tmp_target.open("wb") as writer, tmp_index.open(
+            "w", encoding="utf-8"
+        ) as index:
+            if existing:
+                with target.open("rb") as previous:
+                    shutil.copyfileobj(previous, writer)
+                for day_range in existing:
+                    index.write(f"{day_range.day} {day_range.offset} {day_range.end - day_range.offset}\n")
+            for day_range in ranges:
+                start = writer.tell()
+                with gzip.GzipFile(fileobj=writer, mode="wb", mtime=0) as member:
+                    for line in _iter_lines(reader, day_range.offset, day_range.end):
+                        member.write(line)
+                index.write(f"{day_range.day} {start} {writer.tell() - start}\n")
+        # Only the swap holds the append lock, so appends never wait for the gzip work.
+        with self._lock:
+            if source.stat().st_size != size:
+                tmp_target.unlink()
+                tmp_index.unlink()
+                return None
+            os.replace(tmp_target, target)
+            os.replace(tmp_index, target_index)
+            source.unlink()
+            self._index_path(source).unlink(missing_ok=True)
+        return target
+
+    def compact(self, before: str | None = None) -> List[Path]:
+        """Compress every month before `before` (YYYY-MM, the current UTC month by default)."""
+
+        before = before or datetime.now(timezone.utc).strftime("%Y-%m")
+        with self._compact_lock:
+            closed = [month for month in self.months() if month < before and self.segment_path(month).exists()]
+            compressed = [self.compress(month) for month in closed]
+        return [path for path in compressed if path is not None]
+
+    def iter_events(self, date_from: date | None = None, date_to: date | None = None) -> Iterator[dict]:
+        """Yield events of the given UTC days, reading only the segments and byte ranges they cover."""
+
+        first = date_from.isoformat() if date_from else ""
+        last = date_to.isoformat() if date_to else "9999-12-31"
+        if self.legacy_path is not None and self.legacy_path.exists():
+            with self.legacy_path.open("rb") as handle:
+                for line in handle:
+                    event = _decode(line)
+                    if event is not None and first <= _event_day(event) <= last:
+                        yield event
+        for month in self.months():
+            if not (first[:7] <= month <= last[:7]):
+                continue
+            # A compressed month can still have a plain segment: events written after it was compressed.
+            compressed = self.segment_path(month, compressed=True)
+            if compressed.exists() and self._index_path(compressed).exists():
+                yield from self._iter_segment(compressed, first, last, compressed=True)
+            if self.segment_path(month).exists():
+                yield from self._iter_segment(self.segment_path(month), first, last, compressed=False)
+
+    def _iter_segment(self, segment: Path, first: str, last: str, *, compressed: bool) -> Iterator[dict]:
+        ranges = [item for item in _read_index(self._index_path(segment)) if first <= item.day <= last]
+        if not ranges:
+            return
+        with segment.open("rb") as handle:
+            for day_range in ranges:
+                if compressed:
+                    lines = _iter_member_lines(handle, day_range.offset, day_range.end)
+                else:
+                    lines = _iter_lines(handle, day_range.offset, day_range.end)
+                for line in lines:
+                    event = _decode(line)
+                    if event is not None:
+                        yield event
+
+    def import_legacy(self) -> int:
+        """Move the single-file log into segments (events must be in time order)."""
+
+        if self.legacy_path is None or not self.legacy_path.exists():
+            return 0
+        legacy, self.legacy_path = self.legacy_path, None
+        count = 0
+        try:
+            with legacy.open("rb") as handle:
+                for line in handle:
+                    event = _decode(line)
+                    if event is not None:
+                        self.append(event)
+                        count += 1
+        except BaseException:
+            self.legacy_path = legacy
+            raise
+        legacy.rename(legacy.with_name(legacy.name + ".imported"))
+        return count
+
+
+_EVENT_LOG: EventLog | None = None
+
+
+def get_event_log() -> EventLog:
+    global _EVENT_LOG
+    if _EVENT_LOG is None:
+        log_dir = Path(get_settings().log_dir)
+        _EVENT_LOG = EventLog(log_dir / EVENTS_DIR_NAME, legacy_path=log_dir / LEGACY_FILE_NAME)
+    return _EVENT_LOG
+
+
+__all__ = ["DayRange", "EventLog", "get_event_log"]
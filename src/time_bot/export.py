@@ -0,0 +1,180 @@
+"""Streaming export of time entries to CSV, NDJSON and Parquet."""
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Literal
+
+from time_bot.serialization import dumps
+from time_bot.stats import TimeRecord, iter_time_entries
+
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+
+EXPORT_COLUMNS = ("date", "minutes", "maintag", "subtag", "title", "file_path")
+DEFAULT_ROW_GROUP_SIZE = 10_000
+
+
+@dataclass(slots=True)
+class ExportFilter:
+    date_from: date | None = None
+    date_to: date | None = None
+    maintags: frozenset[str] = field(default_factory=frozenset)
+    subtags: frozenset[str] = field(default_factory=frozenset)
+
+    def matches(self, record: TimeRecord) -> bool:
+        if self.date_from and record.date < self.date_from:
+            return False
+        if self.date_to and record.date > self.date_to:
+            return False
+        if self.maintags and record.maintag not in self.maintags:
+            return False
+        if self.subtags and (record.subtag or "") not in self.subtags:
+            return False
+        return True
+
+
+def iter_export_records(
+    base_dir: Path,
+    export_filter: ExportFilter | None = None,
+    *,
+    partition_format: str = "",
+    workers: int = 1,
+) -> Iterator[TimeRecord]:
+    """Yield filtered entries using the same frontmatter parsing as the stats module."""
+
+    records = iter_time_entries(
+        base_dir,
+        with_titles=True,
+        partition_format=partition_format,
+        date_from=export_filter.date_from if export_filter else None,
+        date_to=export_filter.date_to if export_filter else None,
+        workers=workers,
+    )
+    for record in records:
+        if export_filter is None or export_filter.matches(record):
+            yield record
+
+
+def _as_row(record: TimeRecord) -> dict:
+    return {
+        "date": record.date.isoformat(),
+        "minutes": record.minutes,
+        "maintag": record.maintag,
+        "subtag": record.subtag,
+        "title": record.title,
+        "file_path": str(record.file_path),
+    }
+
+
+def write_csv(records: Iterable[TimeRecord], stream: IO[str]) -> int:
+    writer = csv.DictWriter(stream, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(_as_row(record))
+        count += 1
+    return count
+
+
+def write_ndjson(records: Iterable[TimeRecord], stream: IO[str]) -> int:
+    count = 0
+    for record in records:
+        stream.write(dumps(_as_row(record)))
+        stream.write("\n")
+        count += 1
+    return count
+
+
+def write_parquet(
+    records: Iterable[TimeRecord],
+    path: Path,
+    *,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """Write records in row groups so only one group is held in memory at a time."""
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # optional dependency
+        raise RuntimeError("Parquet export requires pyarrow (pip install 'time-system-bot[parquet]')") from exc
+
+    schema = pa.schema(
+        [
+            ("date", pa.date32()),
+            ("minutes", pa.int32()),
+            ("maintag", pa.string()),
+            ("subtag", pa.string()),
+            ("title", pa.string()),
+            ("file_path", pa.string()),
+        ]
+    )
+    count = 0
+    batch: List[TimeRecord] = []
+    with pq.ParquetWriter(str(path), schema) as writer:
+
+        def _flush() -> None:
+            table = pa.table(
+                {
+                    "date": [item.date for item in batch],
+                    "minutes": [item.minutes for item in batch],
+                    "maintag": [item.maintag for item in batch],
+                    "subtag": [item.subtag for item in batch],
+                    "title": [item.title for item in batch],
+                    "file_path": [str(item.file_path) for item in batch],
+                },
+                schema=schema,
+            )
+            writer.write_table(table, row_group_size=row_group_size)
+            batch.clear()
+
+        for record in records:
+            batch.append(record)
+            count += 1
+            if len(batch) >= row_group_size:
+                _flush()
+        if batch:
+            _flush()
+    return count
+
+
+def export_time_entries(
+    base_dir: Path,
+    fmt: ExportFormat,
+    *,
+    output: Path | None = None,
+    stream: IO[str] | None = None,
+    export_filter: ExportFilter | None = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    partition_format: str = "",
+    workers: int = 1,
+) -> int:
+    """Export entries to `output` (or `stream` for text formats) and return the row count."""
+
+    records = iter_export_records(base_dir, export_filter, partition_format=partition_format, workers=workers)
+    if fmt == "parquet":
+        if output is None:
+            raise ValueError("Parquet export needs an output path")
+        return write_parquet(records, output, row_group_size=row_group_size)
+
+    writer = write_csv if fmt == "csv" else write_ndjson
+    if output is None:
+        if stream is None:
+            raise ValueError("Either output or stream must be provided")
+        return writer(records, stream)
+    with Path(output).open("w", encoding="utf-8", newline="") as handle:
+        return writer(records, handle)
+
+
+__all__ = [
+    "EXPORT_COLUMNS",
+    "ExportFilter",
+    "ExportFormat",
+    "export_time_entries",
+    "iter_export_records",
+    "write_csv",
+    "write_ndjson",
+    "write_parquet",
+]
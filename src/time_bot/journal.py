@@ -0,0 +1,299 @@
+"""Per-chat write-ahead journal of created notes."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Literal
+
+from time_bot.config import get_settings
+from time_bot.daily_notes import get_block, is_daily_note, replace_block
+from time_bot.reprocess_queue import get_reprocess_queue
+from time_bot.serialization import dumps, loads
+from time_bot.vault_events import note_written
+
+JOURNAL_FILE_NAME = "note_journal.sqlite3"
+
+JournalStatus = Literal["pending", "written", "acknowledged", "undone", "failed"]
+
+
+@dataclass(slots=True)
+class JournalEntry:
+    id: int
+    chat_id: int
+    note_id: str
+    path: Path
+    note_type: str
+    payload: Dict[str, Any]
+    raw_text: str
+    status: JournalStatus
+    created_at: float
+    previous_content: str | None = None
+    previous_payload: Dict[str, Any] | None = None
+    previous_raw_text: str | None = None
+
+
+_COLUMNS = (
+    "id, chat_id, note_id, path, note_type, payload, raw_text, status, created_at,"
+    " previous_content, previous_payload, previous_raw_text"
+)
+
+
+def _row_to_entry(row: tuple) -> JournalEntry:
+    (
+        entry_id,
+        chat_id,
+        note_id,
+        path,
+        note_type,
+        payload,
+        raw_text,
+        status,
+        created_at,
+        previous,
+        previous_payload,
+        previous_raw_text,
+    ) = row
+    return JournalEntry(
+        id=entry_id,
+        chat_id=chat_id,
+        note_id=note_id,
+        path=Path(path),
+        note_type=note_type,
+        payload=loads(payload),
+        raw_text=raw_text,
+        status=status,
+        created_at=created_at,
+        previous_content=previous,
+        previous_payload=loads(previous_payload) if previous_payload is not None else None,
+        previous_raw_text=previous_raw_text,
+    )
+
+
+class NoteJournal:
+    """SQLite journal indexed by (chat_id, id) so per-chat lookups don't depend on history size.
+
+    A note is recorded as `pending` before it is written, `written` once it is
+    on disk and `acknowledged` after the user got a reply; anything left
+    behind by a crash is picked up by `reconcile()`.
+    """
+
+    def __init__(self, path: Path, *, clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                note_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                note_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                raw_text TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                previous_content TEXT,
+                previous_payload TEXT,
+                previous_raw_text TEXT
+            );
+            CREATE INDEX IF NOT EXISTS journal_chat_idx ON journal (chat_id, id);
+            CREATE INDEX IF NOT EXISTS journal_status_idx ON journal (status);
+            """
+        )
+
+    def begin(
+        self,
+        chat_id: int,
+        *,
+        note_id: str,
+        path: Path | str,
+        note_type: str,
+        payload: Dict[str, Any],
+        raw_text: str,
+    ) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO journal (chat_id, note_id, path, note_type, payload, raw_text, status, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, 'pending', ?)",
+                (chat_id, note_id, str(path), note_type, dumps(payload), raw_text, self._clock()),
+            )
+            return int(cursor.lastrowid)
+
+    def _set_status(self, entry_ids: Iterable[int], status: JournalStatus, *, only_from: str | None = None) -> None:
+        ids = list(entry_ids)
+        if not ids:
+            return
+        placeholders = ", ".join("?" for _ in ids)
+        query = f"UPDATE journal SET status = ? WHERE id IN ({placeholders})"
+        params: List[Any] = [status, *ids]
+        if only_from is not None:
+            query += " AND status = ?"
+            params.append(only_from)
+        with self._lock:
+            self._conn.execute(query, params)
+
+    def mark_written(self, entry_id: int) -> None:
+        self._set_status([entry_id], "written", only_from="pending")
+
+    def mark_failed(self, entry_id: int) -> None:
+        self._set_status([entry_id], "failed", only_from="pending")
+
+    def acknowledge(self, entry_ids: Iterable[int]) -> None:
+        self._set_status(entry_ids, "acknowledged", only_from="written")
+
+    def get(self, entry_id: int) -> JournalEntry | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM journal WHERE id = ?", (entry_id,)).fetchone()
+        return _row_to_entry(row) if row else None
+
+    def last(self, chat_id: int, limit: int = 1) -> List[JournalEntry]:
+        """Most recent live notes of a chat, newest first."""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM journal WHERE chat_id = ? AND status IN ('written', 'acknowledged')"
+                " ORDER BY id DESC LIMIT ?",
+                (chat_id, limit),
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def record_edit(self, entry_id: int, *, payload: Dict[str, Any], raw_text: str, previous_content: str) -> None:
+        """Store the edited payload and keep the one it replaces, so `undo_last` can put both back."""
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE journal SET previous_payload = payload, previous_raw_text = raw_text,"
+                " payload = ?, raw_text = ?, previous_content = ? WHERE id = ?",
+                (dumps(payload), raw_text, previous_content, entry_id),
+            )
+
+    def live_note_ids(self) -> Dict[Path, str]:
+        """Note id of the newest live entry of every journaled file."""
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, note_id FROM journal WHERE status IN ('written', 'acknowledged') ORDER BY id"
+            ).fetchall()
+        return {Path(path): note_id for path, note_id in rows}
+
+    def relocate(self, moves: Iterable[tuple[Path, Path]]) -> int:
+        """Follow notes moved on disk (e.g. by a layout migration); return the number of entries updated."""
+
+        updated = 0
+        with self._lock:
+            for source, target in moves:
+                cursor = self._conn.execute("UPDATE journal SET path = ? WHERE path = ?", (str(target), str(source)))
+                updated += cursor.rowcount
+        return updated
+
+    def retire(self, path: Path) -> int:
+        """Drop live entries of a note that was deleted because another note replaced it."""
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE journal SET status = 'undone' WHERE path = ? AND status IN ('written', 'acknowledged')",
+                (str(path),),
+            )
+        return cursor.rowcount
+
+    def undo_last(self, chat_id: int) -> JournalEntry | None:
+        """Revert the newest note: restore it (file and journaled text) if it was edited, otherwise delete it.
+
+        One edit level is kept, so undoing twice after an edit deletes the note.
+
+        Entries of a daily note are a block inside a shared file, so only that
+        block is restored or removed. Undoing an unparsed inbox note also drops
+        its reprocess queue item.
+        """
+
+        entries = self.last(chat_id, 1)
+        if not entries:
+            return None
+        entry = entries[0]
+        daily = is_daily_note(entry.path)
+        if entry.previous_content is not None:
+            if daily:
+                replace_block(entry.path, entry.note_id, entry.previous_content)
+            else:
+                entry.path.parent.mkdir(parents=True, exist_ok=True)
+                entry.path.write_text(entry.previous_content, encoding="utf-8")
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE journal SET payload = COALESCE(previous_payload, payload),"
+                    " raw_text = COALESCE(previous_raw_text, raw_text),"
+                    " previous_content = NULL, previous_payload = NULL, previous_raw_text = NULL WHERE id = ?",
+                    (entry.id,),
+                )
+            if entry.previous_payload is not None:
+                entry.payload = entry.previous_payload
+            if entry.previous_raw_text is not None:
+                entry.raw_text = entry.previous_raw_text
+            entry.previous_content = entry.previous_payload = entry.previous_raw_text = None
+            note_written(entry.note_type, entry.path)
+            return entry
+        if daily:
+            replace_block(entry.path, entry.note_id, None)
+        else:
+            try:
+                entry.path.unlink()
+            except FileNotFoundError:
+                pass
+        self._set_status([entry.id], "undone")
+        entry.status = "undone"
+        if entry.note_type == "unparsed":
+            # Otherwise the reprocessor would parse the message later and recreate the note.
+            get_reprocess_queue().abandon_inbox_note(entry.path, "Undone by the user")
+        note_written(entry.note_type, entry.path)
+        return entry
+
+    def reconcile(self) -> List[JournalEntry]:
+        """Settle notes interrupted by a crash; return written-but-unacknowledged entries.
+
+        Pending entries whose file exists are promoted to `written`, the rest
+        are marked `failed`.
+        """
+
+        with self._lock:
+            pending = [
+                _row_to_entry(row)
+                for row in self._conn.execute(f"SELECT {_COLUMNS} FROM journal WHERE status = 'pending'")
+            ]
+        for entry in pending:
+            if _note_exists(entry):
+                self.mark_written(entry.id)
+            else:
+                self.mark_failed(entry.id)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM journal WHERE status = 'written' ORDER BY id"
+            ).fetchall()
+        return [_row_to_entry(row) for row in rows]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _note_exists(entry: JournalEntry) -> bool:
+    if is_daily_note(entry.path):
+        return get_block(entry.path, entry.note_id) is not None
+    return entry.path.exists()
+
+
+_JOURNAL: NoteJournal | None = None
+
+
+def get_note_journal() -> NoteJournal:
+    global _JOURNAL
+    if _JOURNAL is None:
+        _JOURNAL = NoteJournal(Path(get_settings().cache_dir) / JOURNAL_FILE_NAME)
+    return _JOURNAL
+
+
+__all__ = ["JournalEntry", "JournalStatus", "NoteJournal", "get_note_journal"]
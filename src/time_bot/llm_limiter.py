@@ -0,0 +1,160 @@
+"""AIMD concurrency limits for LLM calls, one per endpoint/model.
+
+Every model call takes a permit first. Each success that ran while the limit
+was fully used raises the limit by `1 / limit`, so it grows by about one
+slot per round trip. A 429, an overload status or a client timeout halves
+it; running out of a message's own stage budget does not. Only the first
+overload after a cut counts: calls already in flight when the limit dropped
+were sent at the old limit and say nothing about the new one. Calls over the
+limit wait in FIFO order.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Literal, Tuple
+from urllib.parse import urlparse
+
+from time_bot.config import get_settings
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+
+Signal = Literal["ok", "overload", "error"]
+
+
+@dataclass(slots=True)
+class _Limit:
+    label: str
+    limit: float
+    inflight: int = 0
+    cuts: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+
+class Permit:
+    """One in-flight call; release it exactly once with what the call observed."""
+
+    __slots__ = ("_limiter", "_state", "_cuts_at_start", "_released")
+
+    def __init__(self, limiter: "AdaptiveLimiter", state: _Limit):
+        self._limiter = limiter
+        self._state = state
+        self._cuts_at_start = state.cuts
+        self._released = False
+
+    def release(self, signal: Signal = "ok") -> None:
+        if self._released:
+            return
+        self._released = True
+        self._limiter._release(self._state, signal, stale=self._cuts_at_start != self._state.cuts)
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease limits keyed by (endpoint, model).
+
+    The limiter lives on the event loop and is not thread-safe; waiters are
+    plain futures, so it works across successive loops (CLI runs, tests).
+    """
+
+    def __init__(
+        self,
+        *,
+        initial: float = 4.0,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        decrease_factor: float = 0.5,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.initial = min(max(initial, min_limit), max_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self._clock = clock
+        self._limits: Dict[Tuple[str, str], _Limit] = {}
+
+    def _state(self, endpoint: str, model: str) -> _Limit:
+        key = (endpoint, model)
+        state = self._limits.get(key)
+        if state is None:
+            host = urlparse(endpoint).netloc or endpoint
+            state = self._limits[key] = _Limit(label=f"{host}/{model}", limit=self.initial)
+            self._publish(state)
+        return state
+
+    def limit(self, endpoint: str, model: str) -> float:
+        return self._state(endpoint, model).limit
+
+    def _capacity(self, state: _Limit) -> int:
+        return max(self.min_limit, int(state.limit))
+
+    async def acquire(self, endpoint: str, model: str) -> Permit:
+        state = self._state(endpoint, model)
+        started = self._clock()
+        if state.waiters or state.inflight >= self._capacity(state):
+            waiter = asyncio.get_running_loop().create_future()
+            state.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just before the cancel: pass it on.
+                    state.inflight -= 1
+                    self._wake(state)
+                elif waiter in state.waiters:
+                    state.waiters.remove(waiter)
+                raise
+        else:
+            state.inflight += 1
+        METRICS.observe(f"llm_limiter.{state.label}.queue_wait_ms", (self._clock() - started) * 1000)
+        self._publish(state)
+        return Permit(self, state)
+
+    def _release(self, state: _Limit, signal: Signal, *, stale: bool) -> None:
+        was_saturated = state.inflight >= self._capacity(state)
+        state.inflight -= 1
+        if signal == "ok":
+            if was_saturated and state.limit < self.max_limit:
+                state.limit = min(self.max_limit, state.limit + 1.0 / state.limit)
+        elif signal == "overload":
+            METRICS.increment(f"llm_limiter.{state.label}.overloads")
+            if not stale:
+                previous = state.limit
+                state.limit = max(float(self.min_limit), state.limit * self.decrease_factor)
+                state.cuts += 1
+                LOGGER.info("LLM concurrency for %s cut %.1f -> %.1f", state.label, previous, state.limit)
+        self._wake(state)
+        self._publish(state)
+
+    def _wake(self, state: _Limit) -> None:
+        while state.waiters and state.inflight < self._capacity(state):
+            waiter = state.waiters.popleft()
+            if waiter.done():
+                continue
+            state.inflight += 1
+            waiter.set_result(None)
+
+    @staticmethod
+    def _publish(state: _Limit) -> None:
+        METRICS.set_gauge(f"llm_limiter.{state.label}.limit", round(state.limit, 2))
+        METRICS.set_gauge(f"llm_limiter.{state.label}.inflight", state.inflight)
+        METRICS.set_gauge(f"llm_limiter.{state.label}.waiting", len(state.waiters))
+
+
+_LIMITER: AdaptiveLimiter | None = None
+
+
+def get_llm_limiter() -> AdaptiveLimiter:
+    global _LIMITER
+    if _LIMITER is None:
+        settings = get_settings()
+        _LIMITER = AdaptiveLimiter(
+            initial=settings.llm_concurrency_initial,
+            min_limit=settings.llm_concurrency_min,
+            max_limit=settings.llm_concurrency_max,
+        )
+    return _LIMITER
+
+
+__all__ = ["AdaptiveLimiter", "Permit", "Signal", "get_llm_limiter"]
@@ -0,0 +1,102 @@
+"""Aggregate the event log into error rates, intent mix, latency and throughput."""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+LATENCY_BUCKET_MS = 10
+
+
+def _percentile(histogram: Counter, fraction: float) -> float | None:
+    """Percentile of a value -> count histogram; memory stays bounded by the distinct values."""
+
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank = fraction * (total - 1)
+    seen = 0
+    for value in sorted(histogram):
+        seen += histogram[value]
+        if seen > rank:
+            return float(value)
+    return float(max(histogram))
+
+
+@dataclass(slots=True)
+class LogStats:
+    events: int = 0
+    statuses: Counter = field(default_factory=Counter)
+    kinds: Counter = field(default_factory=Counter)
+    per_day: Counter = field(default_factory=Counter)
+    per_hour: Counter = field(default_factory=Counter)
+    latency_ms: Counter = field(default_factory=Counter)
+    minutes_by_maintag: Dict[str, Counter] = field(default_factory=dict)
+
+    def add(self, event: dict) -> None:
+        self.events += 1
+        status = str(event.get("status") or "info")
+        self.statuses[status] += 1
+        timestamp = event.get("timestamp")
+        if isinstance(timestamp, str) and len(timestamp) >= 13:
+            self.per_day[timestamp[:10]] += 1
+            self.per_hour[timestamp[11:13]] += 1
+        elapsed = event.get("elapsed_ms")
+        if isinstance(elapsed, (int, float)):
+            self.latency_ms[int(elapsed // LATENCY_BUCKET_MS) * LATENCY_BUCKET_MS] += 1
+        if status != "success" or event.get("action"):
+            return
+        self.kinds[str(event.get("kind") or "unknown")] += 1
+        minutes = event.get("minutes")
+        if isinstance(minutes, int) and event.get("maintag"):
+            self.minutes_by_maintag.setdefault(str(event["maintag"]), Counter())[minutes] += 1
+
+    @property
+    def messages(self) -> int:
+        return self.statuses["success"] + self.statuses["error"] + self.statuses["unparsed"]
+
+    @property
+    def error_rate(self) -> float:
+        failed = self.statuses["error"] + self.statuses["unparsed"]
+        return failed / self.messages if self.messages else 0.0
+
+
+def compute_log_stats(events: Iterable[dict]) -> LogStats:
+    stats = LogStats()
+    for event in events:
+        stats.add(event)
+    return stats
+
+
+def format_log_stats(stats: LogStats) -> str:
+    if not stats.events:
+        return "No events in the selected period"
+    lines: List[str] = [
+        f"Events: {stats.events}, messages: {stats.messages}",
+        f"Error rate: {stats.error_rate:.1%} "
+        f"(errors {stats.statuses['error']}, unparsed {stats.statuses['unparsed']})",
+    ]
+    if stats.kinds:
+        total = sum(stats.kinds.values())
+        mix = ", ".join(f"{kind} {count / total:.0%}" for kind, count in stats.kinds.most_common())
+        lines.append(f"Intent mix: {mix}")
+    if stats.latency_ms:
+        p50 = _percentile(stats.latency_ms, 0.5)
+        p95 = _percentile(stats.latency_ms, 0.95)
+        lines.append(f"Latency: p50 {p50:.0f} ms, p95 {p95:.0f} ms ({sum(stats.latency_ms.values())} timed)")
+    if stats.per_day:
+        day, peak = stats.per_day.most_common(1)[0]
+        hour, _ = stats.per_hour.most_common(1)[0]
+        average = stats.events / len(stats.per_day)
+        lines.append(f"Throughput: {average:.1f} events/day over {len(stats.per_day)} days, peak {peak} on {day}")
+        lines.append(f"Busiest hour (UTC): {hour}:00")
+    if stats.minutes_by_maintag:
+        lines.append("Minutes per maintag (median / total):")
+        for maintag in sorted(stats.minutes_by_maintag):
+            histogram = stats.minutes_by_maintag[maintag]
+            total_minutes = sum(minutes * count for minutes, count in histogram.items())
+            lines.append(f"  {maintag}: {_percentile(histogram, 0.5):.0f} / {total_minutes}")
+    return "\n".join(lines)
+
+
+__all__ = ["LogStats", "compute_log_stats", "format_log_stats"]
@@ -1,16 +1,15 @@
 """Append-only logging helpers for processed messages."""
 from __future__ import annotations
 
-import json
 import logging
 import sys
 from datetime import datetime, timezone
-from pathlib import Path
 from typing import Any, Mapping
 
-from time_bot.config import get_settings
+from time_bot.deadline import current_deadline
+from time_bot.event_log import get_event_log
+from time_bot.model_router import current_routes
 
-LOG_FILE_NAME = "processed_messages.jsonl"
 LOGGER_NAME = "time_bot"
 
 
@@ -29,25 +28,25 @@ def _setup_logger() -> logging.Logger:
 LOGGER = _setup_logger()
 
 
-def _log_path() -> Path:
-    settings = get_settings()
-    log_dir = Path(settings.log_dir)
-    log_dir.mkdir(parents=True, exist_ok=True)
-    return log_dir / LOG_FILE_NAME
-
-
 def log_event(data: Mapping[str, Any]) -> None:
-    """Append a JSON event to the log file and emit console output."""
+    """Append a JSON event to the segmented event log and emit console output.
+
+    Inside a message deadline the event also records the time spent so far,
+    and it lists the models the message was routed to (stage, model, reason).
+    """
 
     payload = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         **data,
     }
+    deadline = current_deadline()
+    if deadline is not None and "elapsed_ms" not in payload:
+        payload["elapsed_ms"] = round(deadline.elapsed() * 1000, 1)
+    routes = current_routes()
+    if routes and "routes" not in payload:
+        payload["routes"] = list(routes)
     try:
-        path = _log_path()
-        with path.open("a", encoding="utf-8") as handle:
-            handle.write(json.dumps(payload, ensure_ascii=False))
-            handle.write("\n")
+        get_event_log().append(payload)
     except OSError:
         # Logging is best-effort; avoid breaking the pipeline.
         pass
@@ -0,0 +1,100 @@
+"""In-process counters, gauges and latency summaries."""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict
+
+RESERVOIR_SIZE = 1024
+
+
+@dataclass(slots=True)
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    recent: Deque[float] = field(default_factory=lambda: deque(maxlen=RESERVOIR_SIZE))
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+    def as_dict(self) -> dict[str, float]:
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "mean": round(mean, 3),
+            "p50": round(self.percentile(0.5), 3),
+            "p95": round(self.percentile(0.95), 3),
+            "max": round(self.max, 3),
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry; values live only for the lifetime of the process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Summary] = {}
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = Summary()
+            summary.observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {name: summary.as_dict() for name, summary in self._summaries.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+def format_metrics(snapshot: dict | None = None) -> str:
+    """Render a snapshot as plain text lines sorted by metric name."""
+
+    snapshot = snapshot or METRICS.snapshot()
+    lines = []
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"{name} = {value:g}")
+    for name, value in sorted(snapshot["gauges"].items()):
+        lines.append(f"{name} = {value:g}")
+    for name, values in sorted(snapshot["summaries"].items()):
+        details = " ".join(f"{key}={value:g}" for key, value in values.items())
+        lines.append(f"{name}: {details}")
+    return "\n".join(lines) or "no metrics yet"
+
+
+__all__ = ["METRICS", "MetricsRegistry", "Summary", "format_metrics"]
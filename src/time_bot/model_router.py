@@ -0,0 +1,214 @@
+"""Per-stage model selection with latency/error-aware fallback."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterator, List, Literal, Tuple
+
+from time_bot.config import Settings, get_settings
+
+Stage = Literal["classifier", "time_entry", "message_batch", "task_entry"]
+STAGES: Tuple[Stage, ...] = ("classifier", "time_entry", "message_batch", "task_entry")
+MIN_SAMPLES = 5
+
+# logging_utils reads the routes of the current message, so use the logger by name.
+_LOGGER = logging.getLogger("time_bot")
+_ROUTES: ContextVar[List[Dict[str, str]] | None] = ContextVar("model_routes", default=None)
+
+
+@dataclass(slots=True, frozen=True)
+class StageModels:
+    primary: str
+    fallback: str | None = None
+
+
+@dataclass(slots=True, frozen=True)
+class RouteDecision:
+    stage: Stage
+    model: str
+    reason: str
+
+
+class _ModelHealth:
+    def __init__(self, window: int):
+        self.samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+
+    def add(self, latency_ms: float, ok: bool) -> None:
+        self.samples.append((latency_ms, ok))
+
+    def mean_latency_ms(self) -> float:
+        latencies = [latency for latency, ok in self.samples if ok]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples)
+
+
+class ModelRouter:
+    """Route each stage to its primary model unless the primary looks unhealthy.
+
+    A stage trips to its fallback when the primary's mean latency or error rate
+    over the last `window` calls of that stage exceeds the thresholds. After
+    `cooldown_seconds` the primary's history is cleared and it gets traffic
+    again. Health is kept per stage and model, as stages differ in how long a
+    call takes (a batch of entries vs a single one).
+    """
+
+    def __init__(
+        self,
+        stages: Dict[Stage, StageModels],
+        *,
+        latency_threshold_ms: float = 0.0,
+        error_rate_threshold: float = 0.5,
+        window: int = 20,
+        cooldown_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.stages = stages
+        self.latency_threshold_ms = latency_threshold_ms
+        self.error_rate_threshold = error_rate_threshold
+        self.window = window
+        self.cooldown_seconds = cooldown_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._health: Dict[Tuple[Stage, str], _ModelHealth] = {}
+        self._tripped: Dict[Stage, Tuple[float, str]] = {}
+
+    def _health_for(self, stage: Stage, model: str) -> _ModelHealth:
+        health = self._health.get((stage, model))
+        if health is None:
+            health = self._health[(stage, model)] = _ModelHealth(self.window)
+        return health
+
+    def _unhealthy_reason(self, stage: Stage, model: str) -> str | None:
+        health = self._health_for(stage, model)
+        if len(health.samples) < MIN_SAMPLES:
+            return None
+        if self.error_rate_threshold and health.error_rate() > self.error_rate_threshold:
+            return "errors"
+        if self.latency_threshold_ms and health.mean_latency_ms() > self.latency_threshold_ms:
+            return "latency"
+        return None
+
+    def choose(self, stage: Stage) -> RouteDecision:
+        models = self.stages[stage]
+        with self._lock:
+            if models.fallback is None:
+                decision = RouteDecision(stage, models.primary, "primary")
+            else:
+                decision = self._choose_with_fallback(stage, models)
+        _log_decision(decision)
+        return decision
+
+    def _choose_with_fallback(self, stage: Stage, models: StageModels) -> RouteDecision:
+        tripped = self._tripped.get(stage)
+        now = self._clock()
+        if tripped is not None:
+            tripped_at, reason = tripped
+            if now - tripped_at < self.cooldown_seconds:
+                return RouteDecision(stage, models.fallback, f"fallback:{reason}")
+            del self._tripped[stage]
+            self._health_for(stage, models.primary).samples.clear()
+            return RouteDecision(stage, models.primary, "probe")
+        reason = self._unhealthy_reason(stage, models.primary)
+        if reason is not None:
+            self._tripped[stage] = (now, reason)
+            return RouteDecision(stage, models.fallback, f"fallback:{reason}")
+        return RouteDecision(stage, models.primary, "primary")
+
+    def fallback_after_error(self, decision: RouteDecision) -> RouteDecision | None:
+        """Return a retry route when a primary call failed and a fallback exists."""
+
+        models = self.stages[decision.stage]
+        if models.fallback is None or decision.model == models.fallback:
+            return None
+        retry = RouteDecision(decision.stage, models.fallback, "fallback:retry")
+        _log_decision(retry)
+        return retry
+
+    def report(self, decision: RouteDecision, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            self._health_for(decision.stage, decision.model).add(latency_ms, ok)
+
+
+@contextmanager
+def track_routes() -> Iterator[List[Dict[str, str]]]:
+    """Collect the routing decisions of the enclosed message; `log_event` adds them to its events."""
+
+    routes: List[Dict[str, str]] = []
+    token = _ROUTES.set(routes)
+    try:
+        yield routes
+    finally:
+        _ROUTES.reset(token)
+
+
+def current_routes() -> List[Dict[str, str]] | None:
+    return _ROUTES.get()
+
+
+def _log_decision(decision: RouteDecision) -> None:
+    routes = _ROUTES.get()
+    if routes is not None:
+        routes.append({"stage": decision.stage, "model": decision.model, "reason": decision.reason})
+    level = logging.DEBUG if decision.reason == "primary" else logging.INFO
+    _LOGGER.log(level, "LLM route | stage=%s model=%s reason=%s", decision.stage, decision.model, decision.reason)
+
+
+def build_router(settings: Settings) -> ModelRouter:
+    stages: Dict[Stage, StageModels] = {
+        "classifier": StageModels(
+            settings.classifier_model_name or settings.model_name,
+            settings.classifier_fallback_model_name,
+        ),
+        "time_entry": StageModels(
+            settings.time_entry_model_name or settings.model_name,
+            settings.time_entry_fallback_model_name,
+        ),
+        # Batches use the time entry models but keep their own health statistics.
+        "message_batch": StageModels(
+            settings.time_entry_model_name or settings.model_name,
+            settings.time_entry_fallback_model_name,
+        ),
+        "task_entry": StageModels(
+            settings.task_entry_model_name or settings.model_name,
+            settings.task_entry_fallback_model_name,
+        ),
+    }
+    return ModelRouter(
+        stages,
+        latency_threshold_ms=settings.model_fallback_latency_ms,
+        error_rate_threshold=settings.model_fallback_error_rate,
+        window=settings.model_health_window,
+        cooldown_seconds=settings.model_fallback_cooldown_seconds,
+    )
+
+
+_ROUTER: ModelRouter | None = None
+
+
+def get_model_router() -> ModelRouter:
+    global _ROUTER
+    if _ROUTER is None:
+        _ROUTER = build_router(get_settings())
+    return _ROUTER
+
+
+__all__ = [
+    "ModelRouter",
+    "RouteDecision",
+    "STAGES",
+    "Stage",
+    "StageModels",
+    "build_router",
+    "current_routes",
+    "get_model_router",
+    "track_routes",
+]
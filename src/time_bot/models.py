@@ -43,6 +43,12 @@ class TimeEntry(BaseModel):
     comment: Optional[str] = None
 
 
+class TimeEntryBatch(BaseModel):
+    """Several time entries extracted from a single recap message."""
+
+    entries: List[TimeEntry] = Field(..., min_length=1)
+
+
 class TimeNote(BaseModel):
     """Metadata for an Obsidian note derived from a time entry."""
 
@@ -70,6 +76,21 @@ class TaskEntry(BaseModel):
     project: List[ProjectTag] = Field(..., min_length=1)
 
 
+class MessageBatchItem(BaseModel):
+    """Intent and parsed payload for one message of a coalesced batch."""
+
+    index: int = Field(..., ge=0)
+    intent: MessageIntent
+    time_entry: Optional[TimeEntry] = None
+    task_entry: Optional[TaskEntry] = None
+
+
+class MessageBatch(BaseModel):
+    """Structured answer for several messages classified and parsed in one call."""
+
+    items: List[MessageBatchItem] = Field(..., min_length=1)
+
+
 class TaskNote(BaseModel):
     """Metadata for an Obsidian task note."""
 
@@ -97,15 +118,38 @@ class DiaryNote(BaseModel):
     entry: DiaryEntry
 
 
+class InboxEntry(BaseModel):
+    """A message saved verbatim because it could not be parsed in time."""
+
+    raw_text: str
+    reason: str
+    created_at: datetime
+
+
+class InboxNote(BaseModel):
+    """Metadata for an unparsed inbox note."""
+
+    note_id: str
+    file_name: str
+    file_path: str
+    created_at: datetime
+    entry: InboxEntry
+
+
 __all__ = [
     "Maintag",
     "Subtag",
     "TimeEntry",
+    "TimeEntryBatch",
     "TimeNote",
+    "InboxEntry",
+    "InboxNote",
     "MessageIntent",
     "MessageClassification",
     "ProjectTag",
     "TaskEntry",
+    "MessageBatchItem",
+    "MessageBatch",
     "TaskNote",
     "DiaryEntry",
     "DiaryNote",
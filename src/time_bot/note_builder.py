@@ -1,20 +1,31 @@
 """Helpers for constructing TimeNote objects and filenames."""
 from __future__ import annotations
 
+import os
 import re
 import uuid
-from datetime import datetime, time
+from datetime import date, datetime, time
 from pathlib import Path
 
-from time_bot.models import DiaryEntry, DiaryNote, TaskEntry, TaskNote, TimeEntry, TimeNote
-from time_bot.time_utils import get_now_time
+from time_bot.models import (
+    DiaryEntry,
+    DiaryNote,
+    InboxEntry,
+    InboxNote,
+    TaskEntry,
+    TaskNote,
+    TimeEntry,
+    TimeNote,
+)
+from time_bot.vault_layout import partition_dir
 
 
 _SAFE_TITLE_PATTERN = re.compile(r"[^0-9A-Za-zА-Яа-яЁё _-]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
 
 
 def _sanitize_title(title: str) -> str:
-    normalized = re.sub(r"\s+", " ", title.strip())
+    normalized = _WHITESPACE_PATTERN.sub(" ", title.strip())
     cleaned = _SAFE_TITLE_PATTERN.sub("", normalized)
     safe = cleaned.strip()
     if not safe:
@@ -23,67 +34,91 @@ def _sanitize_title(title: str) -> str:
     return safe
 
 
+def _note_path(base_dir: Path, day: date, partition_format: str, file_name: str) -> str:
+    # Plain string joins: a Path per note would be built and then re-parsed by str().
+    if partition_format:
+        return os.path.join(partition_dir(base_dir, day, partition_format), file_name)
+    return os.path.join(base_dir, file_name)
+
+
 def build_note(
     entry: TimeEntry,
     base_dir: Path,
     timezone,
     *,
     existing_time: time | None = None,
+    partition_format: str = "",
 ) -> TimeNote:
     """Create a note structure with deterministic identifiers."""
 
     created_at = datetime.now(timezone)
-    start_or_now = entry.start_time or existing_time or get_now_time(timezone)
+    start_or_now = entry.start_time or existing_time or created_at.replace(second=0, microsecond=0).time()
     safe_title = _sanitize_title(entry.title)
     file_name = f"{safe_title} {entry.date.isoformat()} {start_or_now.strftime('%H-%M')}.md"
-    file_path = base_dir / file_name
+    file_path = _note_path(base_dir, entry.date, partition_format, file_name)
     note_id = uuid.uuid4().hex
 
     return TimeNote(
         note_id=note_id,
         file_name=file_name,
-        file_path=str(file_path),
+        file_path=file_path,
         created_at=created_at,
         entry=entry,
     )
 
 
-def build_task_note(entry: TaskEntry, tasks_dir: Path, timezone) -> TaskNote:
+def build_task_note(entry: TaskEntry, tasks_dir: Path, timezone, *, partition_format: str = "") -> TaskNote:
     """Create a task note with deterministic metadata."""
 
     created_at = datetime.now(timezone)
     safe_title = _sanitize_title(entry.title)
     timestamp_str = created_at.strftime("%Y-%m-%d %H-%M")
     file_name = f"{safe_title} {timestamp_str}.md"
-    file_path = tasks_dir / file_name
+    file_path = _note_path(tasks_dir, created_at.date(), partition_format, file_name)
     note_id = uuid.uuid4().hex
 
     return TaskNote(
         note_id=note_id,
         file_name=file_name,
-        file_path=str(file_path),
+        file_path=file_path,
         created_at=created_at,
         entry=entry,
     )
 
 
-def build_diary_note(entry: DiaryEntry, diary_dir: Path) -> DiaryNote:
+def build_diary_note(entry: DiaryEntry, diary_dir: Path, *, partition_format: str = "") -> DiaryNote:
     """Create a diary note using the entry timestamp."""
 
     created_at = entry.created_at
     safe_title = _sanitize_title(entry.title)
     timestamp_str = created_at.strftime("%Y-%m-%d %H-%M")
     file_name = f"{safe_title} {timestamp_str}.md"
-    file_path = diary_dir / file_name
+    file_path = _note_path(diary_dir, created_at.date(), partition_format, file_name)
     note_id = uuid.uuid4().hex
 
     return DiaryNote(
         note_id=note_id,
         file_name=file_name,
-        file_path=str(file_path),
+        file_path=file_path,
         created_at=created_at,
         entry=entry,
     )
 
 
-__all__ = ["build_note", "build_task_note", "build_diary_note"]
+def build_inbox_note(text: str, inbox_dir: Path, timezone, *, reason: str) -> InboxNote:
+    """Create an inbox note for a message that still has to be parsed."""
+
+    created_at = datetime.now(timezone)
+    note_id = uuid.uuid4().hex
+    file_name = f"Unparsed {created_at.strftime('%Y-%m-%d %H-%M-%S')} {note_id[:6]}.md"
+
+    return InboxNote(
+        note_id=note_id,
+        file_name=file_name,
+        file_path=os.path.join(inbox_dir, file_name),
+        created_at=created_at,
+        entry=InboxEntry(raw_text=text, reason=reason, created_at=created_at),
+    )
+
+
+__all__ = ["build_note", "build_task_note", "build_diary_note", "build_inbox_note"]
@@ -1,86 +1,69 @@
-"""Utilities for turning note models into Markdown."""
+"""Utilities for turning note models into Markdown.
+
+Each note type renders through a single f-string template (optional lines
+are prepared first), and the renderer is looked up by exact note type before
+falling back to `isinstance`.
+"""
 from __future__ import annotations
 
-from time_bot.models import DiaryNote, TaskNote, TimeNote
+from typing import Callable, Dict
+
+from time_bot.models import DiaryNote, InboxNote, TaskNote, TimeNote
 
 
-def render_markdown(note: TimeNote | TaskNote | DiaryNote) -> str:
+def render_markdown(note: TimeNote | TaskNote | DiaryNote | InboxNote) -> str:
     """Render note into Obsidian-friendly Markdown."""
 
-    if isinstance(note, TimeNote):
-        return _render_time_entry(note)
-    if isinstance(note, TaskNote):
-        return _render_task(note)
-    if isinstance(note, DiaryNote):
-        return _render_diary(note)
-    raise TypeError(f"Unsupported note type: {type(note)!r}")
+    renderer = _RENDERERS.get(type(note))
+    if renderer is None:
+        renderer = next((render for kind, render in _RENDERERS.items() if isinstance(note, kind)), None)
+        if renderer is None:
+            raise TypeError(f"Unsupported note type: {type(note)!r}")
+    return renderer(note)
 
 
 def _render_time_entry(note: TimeNote) -> str:
     entry = note.entry
-    frontmatter_lines = [
-        "---",
-        "tags:",
-        "  - time_system",
-        f"time: {entry.minutes}",
-        f"date: {entry.date.isoformat()}",
-        f"maintag: {entry.maintag}",
-    ]
-    if entry.subtag:
-        frontmatter_lines.append(f"subtag: {entry.subtag}")
-    frontmatter_lines.append("---")
-
-    body_lines = [entry.title, ""]
-    if entry.comment:
-        body_lines.append(entry.comment)
-        body_lines.append("")
-    body_lines.append("Исходный текст:")
-    body_lines.append(f"> {entry.raw_text}")
-    body = "\n".join(body_lines)
-
-    return "\n".join(frontmatter_lines) + "\n\n" + body + "\n"
+    subtag = f"subtag: {entry.subtag}\n" if entry.subtag else ""
+    comment = f"{entry.comment}\n\n" if entry.comment else ""
+    return (
+        f"---\ntags:\n  - time_system\ntime: {entry.minutes}\ndate: {entry.date.isoformat()}\n"
+        f"maintag: {entry.maintag}\n{subtag}---\n\n"
+        f"{entry.title}\n\n{comment}Исходный текст:\n> {entry.raw_text}\n"
+    )
 
 
 def _render_task(note: TaskNote) -> str:
     entry = note.entry
-    due_value = entry.due.isoformat() if entry.due else ""
-    projects = entry.project or ["routine"]
-    frontmatter_lines = [
-        "---",
-        "tags:",
-        "  - task",
-        "done: false",
-        "status: not started",
-        "priority: 1",
-        f"due: {due_value}",
-        "project:",
-    ]
-    for project in projects:
-        frontmatter_lines.append(f"  - {project}")
-    frontmatter_lines.append("---")
-
-    body_lines = [
-        entry.title,
-        "",
-        "Описание задачи:",
-        f"> {entry.raw_text}",
-    ]
-
-    return "\n".join(frontmatter_lines) + "\n\n" + "\n".join(body_lines) + "\n"
+    due = entry.due.isoformat() if entry.due else ""
+    projects = "".join(f"  - {project}\n" for project in entry.project or ["routine"])
+    return (
+        f"---\ntags:\n  - task\ndone: false\nstatus: not started\npriority: 1\ndue: {due}\nproject:\n{projects}---\n\n"
+        f"{entry.title}\n\nОписание задачи:\n> {entry.raw_text}\n"
+    )
 
 
 def _render_diary(note: DiaryNote) -> str:
     entry = note.entry
-    timestamp = entry.created_at.strftime("%Y-%m-%d %H-%M")
-    frontmatter_lines = [
-        "---",
-        "tags:",
-        "  - diary",
-        f"date: {timestamp}",
-        "---",
-    ]
     body = entry.body.strip("\n")
-    return "\n".join(frontmatter_lines) + "\n\n" + (body + "\n")
+    return f"---\ntags:\n  - diary\ndate: {entry.created_at.strftime('%Y-%m-%d %H-%M')}\n---\n\n{body}\n"
+
+
+def _render_inbox(note: InboxNote) -> str:
+    entry = note.entry
+    return (
+        f"---\ntags:\n  - inbox\nstatus: unparsed\ndate: {entry.created_at.strftime('%Y-%m-%d %H-%M')}\n"
+        f"reason: {entry.reason}\n---\n\n"
+        f"Не разобрано, будет обработано повторно.\n\nИсходный текст:\n> {entry.raw_text}\n"
+    )
+
+
+_RENDERERS: Dict[type, Callable[..., str]] = {
+    TimeNote: _render_time_entry,
+    TaskNote: _render_task,
+    DiaryNote: _render_diary,
+    InboxNote: _render_inbox,
+}
 
 
 __all__ = ["render_markdown"]
@@ -1,28 +1,66 @@
 """High-level pipeline utilities: message text -> note."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Sequence
 
 from aiogram.types import Message
 
 from time_bot.config import get_settings
-from time_bot.logging_utils import log_event
-from time_bot.models import DiaryEntry, MessageClassification, TaskEntry, TimeEntry
-from time_bot.note_builder import build_diary_note, build_note, build_task_note
+from time_bot.daily_notes import (
+    append_block,
+    get_block,
+    is_daily_note,
+    render_diary_block,
+    render_time_block,
+    replace_block,
+    to_daily_note,
+)
+from time_bot.deadline import DeadlineExceededError, deadline_scope, run_stage
+from time_bot.journal import JournalEntry, get_note_journal
+from time_bot.logging_utils import LOGGER, log_event
+from time_bot.metrics import METRICS
+from time_bot.model_router import track_routes
+from time_bot.models import (
+    DiaryEntry,
+    InboxNote,
+    MessageBatchItem,
+    MessageClassification,
+    TaskEntry,
+    DiaryNote,
+    TaskNote,
+    TimeEntry,
+    TimeNote,
+)
+from time_bot.note_builder import build_diary_note, build_inbox_note, build_note, build_task_note
 from time_bot.note_renderer import render_markdown
 from time_bot.obsidian_writer import write_note_file
+from time_bot.profiling import get_profiler
+from time_bot.reprocess_queue import get_reprocess_queue
 from time_bot.sgr_client import (
+    SGRParseError,
     classify_message_intent,
+    parse_message_batch,
     parse_task_entry_with_sgr,
+    parse_time_entries_with_sgr,
     parse_time_entry_with_sgr,
 )
+from time_bot.tag_predictor import TagPrediction, TagPredictor, get_tag_predictor, learn_from_event
 from time_bot.time_utils import get_timezone, get_today
+from time_bot.vault_events import note_written
 
 TASK_TIMEZONE = "Europe/Moscow"
 
+_INTENT_BY_NOTE_TYPE = {"time_log": "time_log", "task": "task", "diary": "journal"}
+
+# "30 мин", "1 час", "1.5 часа", "2ч", "20 min" — two or more of these mean a multi-activity recap.
+_DURATION_PATTERN = re.compile(r"\d+(?:[.,]\d+)?\s*(?:мин|час|ч\b|min|h\b)", re.IGNORECASE)
+
 
 class UnsupportedIntentError(RuntimeError):
     """Raised when an intent is classified but not supported yet."""
@@ -41,6 +79,15 @@ class PipelineResult:
     time_entry: TimeEntry | None = None
     task_entry: TaskEntry | None = None
     diary_entry: DiaryEntry | None = None
+    items: list["PipelineResult"] = field(default_factory=list)
+    journal_id: int | None = None
+    stage_timings: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def results(self) -> list["PipelineResult"]:
+        """Individual notes produced by the message (one unless it was a batch)."""
+
+        return self.items or [self]
 
 
 async def process_message_text(
@@ -48,19 +95,71 @@ async def process_message_text(
     *,
     today: date | None = None,
     output_dir: Path | None = None,
+    chat_id: int | None = None,
+    deadline_seconds: float | None = None,
+) -> PipelineResult:
+    """Classify, parse and save a message; with `chat_id` the note is also journaled.
+
+    The whole message runs under MESSAGE_DEADLINE_SECONDS (or `deadline_seconds`,
+    0 meaning no deadline). When it runs out the raw text is saved as an
+    unparsed inbox note and queued for reprocessing, so the message is never
+    lost and the reply is never later than the deadline.
+    """
+
+    settings = get_settings()
+    if deadline_seconds is None:
+        deadline_seconds = settings.message_deadline_seconds
+    with get_profiler().profile("message", chat_id=chat_id, chars=len(text)) as profile_tags:
+        with deadline_scope(deadline_seconds) as deadline, track_routes():
+            try:
+                result = await _process_message_text(text, today=today, output_dir=output_dir, chat_id=chat_id)
+            except DeadlineExceededError as exc:
+                result = await asyncio.to_thread(
+                    _save_unparsed, text, reason=str(exc), output_dir=output_dir, chat_id=chat_id
+                )
+            if deadline is not None:
+                result.stage_timings = dict(deadline.timings_ms)
+        profile_tags.update(note_type=result.note_type, notes=len(result.results), stage_timings=result.stage_timings)
+    return result
+
+
+async def _process_message_text(
+    text: str,
+    *,
+    today: date | None,
+    output_dir: Path | None,
+    chat_id: int | None,
 ) -> PipelineResult:
     settings = get_settings()
     tz = get_timezone(settings.timezone)
     today_value = today or get_today(tz)
-    base_dir = output_dir or Path(settings.obsidian_vault_dir)
-    if output_dir is not None:
-        tasks_dir = Path(output_dir) / "tasks"
-        diary_dir = Path(output_dir) / "diary"
-    else:
-        tasks_dir = Path(settings.obsidian_tasks_path)
-        diary_dir = Path(settings.obsidian_diary_folder)
+    base_dir, tasks_dir, diary_dir = _resolve_output_dirs(output_dir)
 
-    classification = await classify_message_intent(text)
+    predictor, prediction = await _predict_tags(text)
+    if prediction is not None and _DURATION_PATTERN.search(text) and not _looks_like_multi_activity(text):
+        # A confident neighbour was a time log and the text has a duration: no need to ask the classifier.
+        classification = MessageClassification(
+            intent="time_log",
+            raw_text=text,
+            explanation=f"Tag predictor, confidence {prediction.confidence:.2f}",
+        )
+        METRICS.increment("tag_predictor.classifier_skipped")
+    else:
+        classification = await run_stage(
+            "classify",
+            classify_message_intent(text),
+            share=settings.deadline_classifier_share,
+            reserve=settings.deadline_write_reserve_seconds,
+        )
+    if classification.intent == "time_log" and _looks_like_multi_activity(text):
+        return await _process_time_log_batch(
+            text,
+            today_value=today_value,
+            base_dir=base_dir,
+            tz=tz,
+            classification=classification,
+            chat_id=chat_id,
+        )
     if classification.intent == "time_log":
         return await _process_time_log(
             text,
@@ -68,6 +167,9 @@ async def process_message_text(
             base_dir=base_dir,
             tz=tz,
             classification=classification,
+            chat_id=chat_id,
+            tags=prediction,
+            predictor=predictor,
         )
     if classification.intent == "task":
         return await _process_task(
@@ -76,6 +178,7 @@ async def process_message_text(
             tasks_dir=tasks_dir,
             timezone=tz,
             classification=classification,
+            chat_id=chat_id,
         )
     if classification.intent == "journal":
         return await _process_diary(
@@ -83,11 +186,232 @@ async def process_message_text(
             diary_dir=diary_dir,
             timezone=tz,
             classification=classification,
+            chat_id=chat_id,
         )
 
     raise UnsupportedIntentError(classification.intent)
 
 
+async def process_message_batch(
+    texts: Sequence[str],
+    *,
+    today: date | None = None,
+    output_dir: Path | None = None,
+    chat_id: int | None = None,
+) -> list[PipelineResult | Exception]:
+    """Classify and parse several messages with one model call.
+
+    Results are returned in input order. Messages the batched answer does not
+    cover (or covers inconsistently) fall back to `process_message_text`; a
+    failure for one message is returned in its slot instead of being raised.
+    The batch shares one MESSAGE_DEADLINE_SECONDS budget.
+    """
+
+    with get_profiler().profile("batch", chat_id=chat_id, messages=len(texts)):
+        with deadline_scope(get_settings().message_deadline_seconds), track_routes():
+            return await _process_message_batch(texts, today=today, output_dir=output_dir, chat_id=chat_id)
+
+
+async def _process_message_batch(
+    texts: Sequence[str],
+    *,
+    today: date | None,
+    output_dir: Path | None,
+    chat_id: int | None,
+) -> list[PipelineResult | Exception]:
+    settings = get_settings()
+    tz = get_timezone(settings.timezone)
+    today_value = today or get_today(tz)
+    base_dir, tasks_dir, diary_dir = _resolve_output_dirs(output_dir)
+
+    batchable = [index for index, text in enumerate(texts) if not _looks_like_multi_activity(text)]
+    items: dict[int, MessageBatchItem] = {}
+    if len(batchable) > 1:
+        try:
+            parsed = await run_stage(
+                "batch_parse",
+                parse_message_batch([texts[index] for index in batchable], today_value, TASK_TIMEZONE),
+                reserve=settings.deadline_write_reserve_seconds,
+            )
+        except (SGRParseError, DeadlineExceededError):
+            parsed = []
+        for item in parsed:
+            items.setdefault(batchable[item.index], item)
+
+    async def _run(index: int, text: str) -> PipelineResult:
+        item = items.get(index)
+        classification = MessageClassification(
+            intent=item.intent if item else "journal",
+            raw_text=text,
+            explanation="batched",
+        )
+        if item is not None and item.intent == "time_log" and item.time_entry is not None:
+            return _save_time_entry(
+                text, item.time_entry, base_dir=base_dir, tz=tz, classification=classification, chat_id=chat_id
+            )
+        if item is not None and item.intent == "task" and item.task_entry is not None:
+            return _save_task_entry(
+                text,
+                item.task_entry,
+                tasks_dir=tasks_dir,
+                timezone=tz,
+                classification=classification,
+                chat_id=chat_id,
+            )
+        if item is not None and item.intent == "journal":
+            return await _process_diary(
+                text, diary_dir=diary_dir, timezone=tz, classification=classification, chat_id=chat_id
+            )
+        return await process_message_text(text, today=today, output_dir=output_dir, chat_id=chat_id)
+
+    return list(
+        await asyncio.gather(*(_run(index, text) for index, text in enumerate(texts)), return_exceptions=True)
+    )
+
+
+async def rewrite_journaled_note(entry: JournalEntry, text: str, *, today: date | None = None) -> PipelineResult:
+    """Re-parse `text` as the same kind of note and overwrite the journaled file in place."""
+
+    with track_routes():
+        return await _rewrite_journaled_note(entry, text, today=today)
+
+
+async def _rewrite_journaled_note(entry: JournalEntry, text: str, *, today: date | None) -> PipelineResult:
+    settings = get_settings()
+    tz = get_timezone(settings.timezone)
+    today_value = today or get_today(tz)
+    intent = _INTENT_BY_NOTE_TYPE.get(entry.note_type)
+    if intent is None:
+        raise UnsupportedIntentError(entry.note_type)
+    classification = MessageClassification(intent=intent, raw_text=text, explanation="edit_last")
+    created_at = datetime.now(tz)
+    note_fields = {"note_id": entry.note_id, "file_name": entry.path.name, "file_path": str(entry.path)}
+
+    result_fields: dict = {}
+    if entry.note_type == "time_log":
+        time_entry = await parse_time_entry_with_sgr(text, today_value)
+        note = TimeNote(created_at=created_at, entry=time_entry, **note_fields)
+        result_fields["time_entry"] = time_entry
+    elif entry.note_type == "task":
+        task_entry = await parse_task_entry_with_sgr(text, today_value, TASK_TIMEZONE)
+        note = TaskNote(created_at=created_at, entry=task_entry, **note_fields)
+        result_fields["task_entry"] = task_entry
+    else:
+        diary_entry = _build_diary_entry(text, tz)
+        original_created_at = entry.payload.get("created_at")
+        if original_created_at:
+            diary_entry.created_at = datetime.fromisoformat(original_created_at)
+        note = DiaryNote(created_at=diary_entry.created_at, entry=diary_entry, **note_fields)
+        result_fields["diary_entry"] = diary_entry
+
+    if is_daily_note(entry.path):
+        previous_content = get_block(entry.path, entry.note_id) or ""
+        markdown = render_time_block(note) if isinstance(note, TimeNote) else render_diary_block(note)
+        if not replace_block(entry.path, entry.note_id, markdown):
+            append_block(entry.path, markdown)
+        note_path = entry.path
+    else:
+        try:
+            previous_content = entry.path.read_text(encoding="utf-8")
+        except OSError:
+            previous_content = ""
+        markdown = render_markdown(note)
+        note_path = write_note_file(entry.path, markdown)
+    note_written(entry.note_type, note_path)
+    get_note_journal().record_edit(
+        entry.id,
+        payload=note.entry.model_dump(mode="json"),
+        raw_text=text,
+        previous_content=previous_content,
+    )
+    event = {
+        "status": "success",
+        "kind": entry.note_type,
+        "action": "edit",
+        "raw_text": text,
+        "previous_raw_text": entry.raw_text,
+        "intent": intent,
+        "file_name": note.file_name,
+        "file_path": str(note_path),
+    }
+    if isinstance(note, TimeNote):
+        event.update(maintag=note.entry.maintag, subtag=note.entry.subtag)
+    log_event(event)
+    learn_correction(event)
+    return PipelineResult(
+        note_path=note_path,
+        markdown=markdown,
+        file_name=note.file_name,
+        classification=classification,
+        note_type=entry.note_type,
+        journal_id=entry.id,
+        **result_fields,
+    )
+
+
+def _resolve_output_dirs(output_dir: Path | None) -> tuple[Path, Path, Path]:
+    settings = get_settings()
+    if output_dir is not None:
+        return Path(output_dir), Path(output_dir) / "tasks", Path(output_dir) / "diary"
+    return (
+        Path(settings.obsidian_vault_dir),
+        Path(settings.obsidian_tasks_path),
+        Path(settings.obsidian_diary_folder),
+    )
+
+
+def _resolve_inbox_dir(output_dir: Path | None) -> Path:
+    settings = get_settings()
+    if output_dir is not None:
+        return Path(output_dir) / "inbox"
+    return Path(settings.obsidian_inbox_folder or Path(settings.obsidian_vault_dir) / "Inbox")
+
+
+def _write_reserve() -> float:
+    return get_settings().deadline_write_reserve_seconds
+
+
+def _save_unparsed(
+    text: str,
+    *,
+    reason: str,
+    output_dir: Path | None = None,
+    chat_id: int | None = None,
+) -> PipelineResult:
+    """Keep the raw message as an inbox note and queue it for another attempt."""
+
+    settings = get_settings()
+    note = build_inbox_note(text, _resolve_inbox_dir(output_dir), get_timezone(settings.timezone), reason=reason)
+    markdown = render_markdown(note)
+    note_path: Path | None = None
+    journal_id: int | None = None
+    try:
+        note_path, journal_id = _write_note(note, markdown, note_type="unparsed", text=text, chat_id=chat_id)
+    except OSError:
+        # The queue row still holds the text, so the message is not lost.
+        LOGGER.exception("Failed to write unparsed inbox note | text=%s", text)
+    get_reprocess_queue().enqueue(text, chat_id=chat_id, reason=reason, inbox_path=note_path)
+
+    log_event(
+        {
+            "status": "unparsed",
+            "kind": "unparsed",
+            "raw_text": text,
+            "error": reason,
+            "file_name": note.file_name,
+            "file_path": str(note_path) if note_path else None,
+        }
+    )
+    return PipelineResult(
+        note_path=note_path or Path(note.file_path),
+        markdown=markdown,
+        file_name=note.file_name,
+        classification=MessageClassification(intent="journal", raw_text=text, explanation=reason),
+        note_type="unparsed",
+        journal_id=journal_id,
+    )
+
+
 async def process_message(message: Message, **kwargs) -> PipelineResult:
     text = message.text or message.caption or ""
     text = text.strip()
@@ -103,11 +427,86 @@ async def _process_time_log(
     base_dir: Path,
     tz,
     classification: MessageClassification,
+    chat_id: int | None = None,
+    tags: TagPrediction | None = None,
+    predictor: TagPredictor | None = None,
 ) -> PipelineResult:
-    entry = await parse_time_entry_with_sgr(text, today_value)
-    note = build_note(entry, base_dir, tz)
-    markdown = render_markdown(note)
-    note_path = write_note_file(note.file_path, markdown)
+    if tags is not None:
+        parse = parse_time_entry_with_sgr(text, today_value, tags=(tags.maintag, tags.subtag))
+    else:
+        parse = parse_time_entry_with_sgr(text, today_value)
+    entry = await run_stage("parse", parse, reserve=_write_reserve())
+    result = _save_time_entry(
+        text,
+        entry,
+        base_dir=base_dir,
+        tz=tz,
+        classification=classification,
+        chat_id=chat_id,
+        tag_source="predictor" if tags is not None else "llm",
+    )
+    if predictor is not None:
+        # The note is saved: a failure to learn from it must not fail (and re-queue) the message.
+        try:
+            predictor.learn(text, entry.maintag, entry.subtag)
+        except Exception:
+            LOGGER.exception("Tag predictor failed to learn | text=%s", text)
+    return result
+
+
+def learn_correction(event: dict) -> None:
+    """Feed a logged `/edit_last` or `/undo` event to the tag predictor, if it is loaded."""
+
+    # The note is already changed: a predictor failure must not fail the command.
+    try:
+        learn_from_event(event)
+    except Exception:
+        LOGGER.exception("Tag predictor failed to learn a correction | text=%s", event.get("raw_text"))
+
+
+async def _predict_tags(text: str) -> tuple[TagPredictor | None, TagPrediction | None]:
+    """The loaded predictor and its confident maintag/subtag guess.
+
+    Both are None when TAG_PREDICTOR_ENABLED is off or the predictor failed to
+    load; the guess alone is None when the predictor is unsure.
+    """
+
+    if not get_settings().tag_predictor_enabled:
+        return None, None
+    try:
+        return await asyncio.to_thread(_predict_tags_sync, text)
+    except Exception:
+        LOGGER.exception("Tag predictor failed | text=%s", text)
+        return None, None
+
+
+def _predict_tags_sync(text: str) -> tuple[TagPredictor | None, TagPrediction | None]:
+    predictor = get_tag_predictor()
+    if predictor is None:
+        return None, None
+    started = time.perf_counter()
+    prediction = predictor.predict(text)
+    METRICS.observe("tag_predictor.predict_ms", (time.perf_counter() - started) * 1000)
+    if prediction is None or prediction.confidence < get_settings().tag_predictor_min_confidence:
+        METRICS.increment("tag_predictor.unsure")
+        return predictor, None
+    METRICS.increment("tag_predictor.confident")
+    return predictor, prediction
+
+
+def _save_time_entry(
+    text: str,
+    entry: TimeEntry,
+    *,
+    base_dir: Path,
+    tz,
+    classification: MessageClassification,
+    chat_id: int | None = None,
+    tag_source: str = "llm",
+) -> PipelineResult:
+    note = build_note(entry, base_dir, tz, partition_format=get_settings().vault_partition_format)
+    markdown = _render_note(note)
+    note_path, journal_id = _write_note(note, markdown, note_type="time_log", text=text, chat_id=chat_id)
 
     log_event(
         {
@@ -118,6 +517,7 @@ async def _process_time_log(
             "minutes": entry.minutes,
             "maintag": entry.maintag,
             "subtag": entry.subtag,
+            "tag_source": tag_source,
             "date": entry.date.isoformat(),
             "file_name": note.file_name,
             "file_path": str(note_path),
@@ -131,9 +531,140 @@ async def _process_time_log(
         classification=classification,
         note_type="time_log",
         time_entry=entry,
+        journal_id=journal_id,
     )
 
 
+async def _process_time_log_batch(
+    text: str,
+    *,
+    today_value: date,
+    base_dir: Path,
+    tz,
+    classification: MessageClassification,
+    chat_id: int | None = None,
+) -> PipelineResult:
+    entries = await run_stage("parse", parse_time_entries_with_sgr(text, today_value), reserve=_write_reserve())
+    partition_format = get_settings().vault_partition_format
+    notes = [build_note(entry, base_dir, tz, partition_format=partition_format) for entry in entries]
+    _ensure_unique_file_names(notes)
+    markdowns = [_render_note(note) for note in notes]
+    written = await asyncio.gather(
+        *(
+            asyncio.to_thread(_write_note, note, markdown, note_type="time_log", text=text, chat_id=chat_id)
+            for note, markdown in zip(notes, markdowns)
+        )
+    )
+
+    items: list[PipelineResult] = []
+    for note, markdown, (note_path, journal_id) in zip(notes, markdowns, written):
+        entry = note.entry
+        log_event(
+            {
+                "status": "success",
+                "kind": "time_log",
+                "raw_text": text,
+                "intent": classification.intent,
+                "minutes": entry.minutes,
+                "maintag": entry.maintag,
+                "subtag": entry.subtag,
+                "date": entry.date.isoformat(),
+                "file_name": note.file_name,
+                "file_path": str(note_path),
+                "batch_size": len(notes),
+            }
+        )
+        items.append(
+            PipelineResult(
+                note_path=note_path,
+                markdown=markdown,
+                file_name=note.file_name,
+                classification=classification,
+                note_type="time_log",
+                time_entry=entry,
+                journal_id=journal_id,
+            )
+        )
+
+    if len(items) == 1:
+        return items[0]
+    return PipelineResult(
+        note_path=items[0].note_path,
+        markdown="\n".join(item.markdown for item in items),
+        file_name=", ".join(item.file_name for item in items),
+        classification=classification,
+        note_type="time_log_batch",
+        items=items,
+    )
+
+
+def _render_note(note: TimeNote | TaskNote | DiaryNote) -> str:
+    """Render a note; in daily storage mode time and diary notes become a block of the day's note."""
+
+    if get_settings().note_storage_mode == "daily" and isinstance(note, (TimeNote, DiaryNote)):
+        return to_daily_note(note)
+    return render_markdown(note)
+
+
+def _store_note(path: str | Path, markdown: str) -> Path:
+    if is_daily_note(path):
+        return append_block(Path(path), markdown)
+    return write_note_file(path, markdown)
+
+
+def _write_note(
+    note: TimeNote | TaskNote | DiaryNote | InboxNote,
+    markdown: str,
+    *,
+    note_type: str,
+    text: str,
+    chat_id: int | None,
+) -> tuple[Path, int | None]:
+    """Write the note file, journaling it first when the message came from a chat."""
+
+    if chat_id is None:
+        note_path = _store_note(note.file_path, markdown)
+        note_written(note_type, note_path)
+        return note_path, None
+    journal = get_note_journal()
+    journal_id = journal.begin(
+        chat_id,
+        note_id=note.note_id,
+        path=note.file_path,
+        note_type=note_type,
+        payload=note.entry.model_dump(mode="json"),
+        raw_text=text,
+    )
+    try:
+        note_path = _store_note(note.file_path, markdown)
+    except Exception:
+        journal.mark_failed(journal_id)
+        raise
+    journal.mark_written(journal_id)
+    note_written(note_type, note_path)
+    return note_path, journal_id
+
+
+def _looks_like_multi_activity(text: str) -> bool:
+    return len(_DURATION_PATTERN.findall(text)) >= 2
+
+
+def _ensure_unique_file_names(notes: list[TimeNote]) -> None:
+    """Entries of one recap share a timestamp, so equal titles would overwrite each other."""
+
+    seen: set[str] = set()
+    for note in notes:
+        file_name = note.file_name
+        counter = 2
+        while file_name in seen:
+            file_name = f"{note.file_name[:-3]} {counter}.md"
+            counter += 1
+        if file_name != note.file_name:
+            note.file_path = str(Path(note.file_path).with_name(file_name))
+            note.file_name = file_name
+        seen.add(file_name)
+
+
 async def _process_task(
     text: str,
     *,
@@ -141,11 +672,28 @@ async def _process_task(
     tasks_dir: Path,
     timezone,
     classification: MessageClassification,
+    chat_id: int | None = None,
 ) -> PipelineResult:
-    task_entry = await parse_task_entry_with_sgr(text, today_value, TASK_TIMEZONE)
-    note = build_task_note(task_entry, tasks_dir, timezone)
+    task_entry = await run_stage(
+        "parse", parse_task_entry_with_sgr(text, today_value, TASK_TIMEZONE), reserve=_write_reserve()
+    )
+    return _save_task_entry(
+        text, task_entry, tasks_dir=tasks_dir, timezone=timezone, classification=classification, chat_id=chat_id
+    )
+
+
+def _save_task_entry(
+    text: str,
+    task_entry: TaskEntry,
+    *,
+    tasks_dir: Path,
+    timezone,
+    classification: MessageClassification,
+    chat_id: int | None = None,
+) -> PipelineResult:
+    note = build_task_note(task_entry, tasks_dir, timezone, partition_format=get_settings().vault_partition_format)
     markdown = render_markdown(note)
-    note_path = write_note_file(note.file_path, markdown)
+    note_path, journal_id = _write_note(note, markdown, note_type="task", text=text, chat_id=chat_id)
 
     log_event(
         {
@@ -168,6 +716,7 @@ async def _process_task(
         classification=classification,
         note_type="task",
         task_entry=task_entry,
+        journal_id=journal_id,
     )
 
 
@@ -177,11 +726,12 @@ async def _process_diary(
     diary_dir: Path,
     timezone,
     classification: MessageClassification,
+    chat_id: int | None = None,
 ) -> PipelineResult:
     entry = _build_diary_entry(text, timezone)
-    note = build_diary_note(entry, diary_dir)
-    markdown = render_markdown(note)
-    note_path = write_note_file(note.file_path, markdown)
+    note = build_diary_note(entry, diary_dir, partition_format=get_settings().vault_partition_format)
+    markdown = _render_note(note)
+    note_path, journal_id = _write_note(note, markdown, note_type="diary", text=text, chat_id=chat_id)
 
     log_event(
         {
@@ -202,6 +752,7 @@ async def _process_diary(
         classification=classification,
         note_type="diary",
         diary_entry=entry,
+        journal_id=journal_id,
     )
 
 
@@ -214,4 +765,12 @@ def _build_diary_entry(text: str, timezone) -> DiaryEntry:
     return DiaryEntry(title=title, body=body, created_at=created_at)
 
 
-__all__ = ["process_message_text", "process_message", "PipelineResult", "UnsupportedIntentError"]
+__all__ = [
+    "process_message_text",
+    "process_message_batch",
+    "process_message",
+    "rewrite_journaled_note",
+    "learn_correction",
+    "PipelineResult",
+    "UnsupportedIntentError",
+]
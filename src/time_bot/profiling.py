@@ -0,0 +1,286 @@
+"""Opt-in profiles of real messages and vault scans, written to LOG_DIR/profiles.
+
+PROFILE_SAMPLE_EVERY=N profiles one message in N; PROFILE_VAULT_SCANS profiles
+every `get_daily_stats`/`read_tasks` call. At runtime SIGUSR2 (or `/profile`
+from an admin chat) arms the profiler for every message and scan until it is
+turned off again, and `/profile N` arms it for the next N messages.
+
+PROFILE_MODE=sample (default) polls the stacks of all threads every
+PROFILE_INTERVAL_MS and writes `<name>.collapsed`, one `frame;frame;... count`
+line per stack, ready for flamegraph.pl or speedscope. PROFILE_MODE=cprofile
+writes `<name>.pstats` instead. Both see every thread, so a profile of one
+message also contains whatever else the bot did meanwhile. Each profile gets a
+`<name>.json` with its trace id, the caller's tags (chat, note type, stage
+timings) and its duration. Only one profile runs at a time; a sampled message
+arriving while another profile runs is skipped.
+"""
+from __future__ import annotations
+
+import cProfile
+import math
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Iterator, Literal, TypeVar
+
+from time_bot.config import get_settings
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+from time_bot.serialization import dumps_bytes
+
+ProfileMode = Literal["sample", "cprofile"]
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _StackSampler:
+    """Background thread counting the stacks of all other threads."""
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._labels: Dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}".replace(";", ":").replace(" ", "_")
+            self._labels[code] = label
+        return label
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                current: FrameType | None = frame
+                while current is not None:
+                    stack.append(self._label(current))
+                    current = current.f_back
+                stack.append(names.get(thread_id, str(thread_id)).replace(" ", "_"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, base_path: Path) -> Path:
+        path = base_path.with_suffix(".collapsed")
+        with path.open("w", encoding="utf-8") as handle:
+            for stack, count in self.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        return path
+
+
+class _CProfileSession:
+    def __init__(self) -> None:
+        self.profile = cProfile.Profile()
+        self.samples = None
+
+    def start(self) -> None:
+        self.profile.enable()
+
+    def stop(self) -> None:
+        self.profile.disable()
+
+    def write(self, base_path: Path) -> Path:
+        path = base_path.with_suffix(".pstats")
+        self.profile.dump_stats(path)
+        return path
+
+
+class Profiler:
+    """Decides which messages and scans to profile and writes their profiles."""
+
+    def __init__(
+        self,
+        output_dir: Path,
+        *,
+        sample_every: int = 0,
+        scans: bool = False,
+        mode: ProfileMode = "sample",
+        interval_ms: float = 5.0,
+    ) -> None:
+        self.output_dir = Path(output_dir)
+        self.sample_every = sample_every
+        self.scans = scans
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._messages_seen = 0
+        self._armed: float = 0
+        self._active = False
+
+    def arm(self, messages: float = math.inf) -> None:
+        """Profile the next `messages` messages (all of them by default) and every scan meanwhile."""
+
+        with self._lock:
+            self._armed = messages
+
+    def disarm(self) -> None:
+        with self._lock:
+            self._armed = 0
+
+    def toggle(self) -> bool:
+        """Arm indefinitely, or disarm when armed; returns whether it is armed now."""
+
+        with self._lock:
+            self._armed = 0 if self._armed else math.inf
+            return bool(self._armed)
+
+    @property
+    def armed(self) -> float:
+        return self._armed
+
+    def _claim(self, scan: bool) -> bool:
+        with self._lock:
+            if scan:
+                wanted = self.scans or self._armed > 0
+            else:
+                self._messages_seen += 1
+                sampled = bool(self.sample_every) and self._messages_seen % self.sample_every == 0
+                wanted = sampled or self._armed > 0
+            if not wanted:
+                return False
+            if self._active:
+                METRICS.increment("profiler.skipped")
+                return False
+            if not scan and self._armed > 0:
+                self._armed -= 1
+            self._active = True
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active = False
+
+    @contextmanager
+    def profile(self, kind: str, *, scan: bool = False, **tags: Any) -> Iterator[Dict[str, Any]]:
+        """Profile the block when it is picked; yields a dict the caller can add tags to."""
+
+        if not self._claim(scan):
+            yield tags
+            return
+        session = _StackSampler(self.interval_ms / 1000) if self.mode == "sample" else _CProfileSession()
+        try:
+            session.start()
+        except ValueError as exc:  # another cProfile (or debugger) already holds the profiling hook
+            LOGGER.warning("Profiler could not start: %s", exc)
+            self._release()
+            yield tags
+            return
+        started_at = datetime.now().astimezone()
+        started = time.perf_counter()
+        try:
+            yield tags
+        except BaseException as exc:
+            tags["error"] = type(exc).__name__
+            raise
+        finally:
+            session.stop()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            try:
+                self._write(session, kind, started_at, elapsed_ms, tags)
+            except OSError as exc:
+                LOGGER.warning("Could not write %s profile: %s", kind, exc)
+            finally:
+                self._release()
+
+    def _write(self, session, kind: str, started_at: datetime, elapsed_ms: float, tags: Dict[str, Any]) -> None:
+        trace = uuid.uuid4().hex[:12]
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base_path = self.output_dir / f"{started_at:%Y%m%d-%H%M%S}-{kind}-{trace}"
+        profile_path = session.write(base_path)
+        meta = {
+            "trace": trace,
+            "kind": kind,
+            "mode": self.mode,
+            "started_at": started_at,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "samples": session.samples,
+            "profile": profile_path.name,
+            "tags": tags,
+        }
+        base_path.with_suffix(".json").write_bytes(dumps_bytes(meta))
+        METRICS.increment("profiler.profiles")
+        LOGGER.info("Wrote %s profile %s (%.0f ms) to %s", kind, trace, elapsed_ms, profile_path)
+
+    def describe(self) -> str:
+        """One-line state for `/profile` and the signal handler log."""
+
+        if self._armed == math.inf:
+            state = "armed for every message and scan"
+        elif self._armed:
+            state = f"armed for the next {int(self._armed)} messages"
+        else:
+            state = "not armed"
+        sampling = f"1 in {self.sample_every} messages" if self.sample_every else "no message sampling"
+        scans = "all scans" if self.scans else "scans only when armed"
+        return f"{state}; {sampling}; {scans}; mode {self.mode}; files in {self.output_dir}"
+
+
+def profiled(kind: str) -> Callable[[F], F]:
+    """Profile calls of a synchronous vault scan when PROFILE_VAULT_SCANS is set or the profiler is armed."""
+
+    def decorator(func: F) -> F:
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with get_profiler().profile(kind, scan=True):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+_PROFILER: Profiler | None = None
+
+
+def get_profiler() -> Profiler:
+    global _PROFILER
+    if _PROFILER is None:
+        settings = get_settings()
+        _PROFILER = Profiler(
+            Path(settings.log_dir) / "profiles",
+            sample_every=settings.profile_sample_every,
+            scans=settings.profile_vault_scans,
+            mode=settings.profile_mode,
+            interval_ms=settings.profile_interval_ms,
+        )
+    return _PROFILER
+
+
+def install_signal_toggle(loop) -> None:
+    """Toggle the profiler on SIGUSR2 (where the platform has it)."""
+
+    signum = getattr(signal, "SIGUSR2", None)
+    if signum is None:
+        return
+
+    def _toggle() -> None:
+        profiler = get_profiler()
+        profiler.toggle()
+        LOGGER.info("Profiler %s", profiler.describe())
+
+    loop.add_signal_handler(signum, _toggle)
+
+
+__all__ = ["Profiler", "get_profiler", "install_signal_toggle", "profiled"]
@@ -0,0 +1,193 @@
+"""Durable queue of messages that still have to be turned into notes."""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Literal
+
+from time_bot.config import get_settings
+
+QUEUE_FILE_NAME = "reprocess_queue.sqlite3"
+
+QueueStatus = Literal["pending", "done", "abandoned"]
+
+
+@dataclass(slots=True)
+class QueueItem:
+    id: int
+    chat_id: int | None
+    raw_text: str
+    reason: str
+    inbox_path: Path | None
+    status: QueueStatus
+    attempts: int
+    next_attempt_at: float
+    created_at: float
+    last_error: str | None = None
+
+
+_COLUMNS = "id, chat_id, raw_text, reason, inbox_path, status, attempts, next_attempt_at, created_at, last_error"
+
+
+def _row_to_item(row: tuple) -> QueueItem:
+    item_id, chat_id, raw_text, reason, inbox_path, status, attempts, next_attempt_at, created_at, last_error = row
+    return QueueItem(
+        id=item_id,
+        chat_id=chat_id,
+        raw_text=raw_text,
+        reason=reason,
+        inbox_path=Path(inbox_path) if inbox_path else None,
+        status=status,
+        attempts=attempts,
+        next_attempt_at=next_attempt_at,
+        created_at=created_at,
+        last_error=last_error,
+    )
+
+
+class ReprocessQueue:
+    """SQLite-backed queue; `source_key` makes enqueueing the same message twice a no-op."""
+
+    def __init__(self, path: Path, *, clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_key TEXT UNIQUE,
+                chat_id INTEGER,
+                raw_text TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                inbox_path TEXT,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS queue_due_idx ON queue (status, next_attempt_at);
+            CREATE TABLE IF NOT EXISTS harvest_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_day TEXT NOT NULL
+            );
+            """
+        )
+
+    def enqueue(
+        self,
+        raw_text: str,
+        *,
+        chat_id: int | None,
+        reason: str,
+        inbox_path: Path | str | None = None,
+        source_key: str | None = None,
+    ) -> int | None:
+        """Add a message; returns its id, or None when `source_key` is already queued."""
+
+        now = self._clock()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO queue"
+                " (source_key, chat_id, raw_text, reason, inbox_path, status, next_attempt_at, created_at)"
+                " VALUES (?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (source_key, chat_id, raw_text, reason, str(inbox_path) if inbox_path else None, now, now),
+            )
+            return int(cursor.lastrowid) if cursor.rowcount == 1 else None
+
+    def get(self, item_id: int) -> QueueItem | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {_COLUMNS} FROM queue WHERE id = ?", (item_id,)).fetchone()
+        return _row_to_item(row) if row else None
+
+    def pending(self, limit: int = 100) -> List[QueueItem]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM queue WHERE status = 'pending' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def due(self, limit: int = 100) -> List[QueueItem]:
+        """Pending items whose backoff has elapsed, oldest first."""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM queue WHERE status = 'pending' AND next_attempt_at <= ?"
+                " ORDER BY next_attempt_at, id LIMIT ?",
+                (self._clock(), limit),
+            ).fetchall()
+        return [_row_to_item(row) for row in rows]
+
+    def mark_done(self, item_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue SET status = 'done', attempts = attempts + 1, last_error = NULL WHERE id = ?",
+                (item_id,),
+            )
+
+    def mark_retry(self, item_id: int, error: str, *, delay_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue SET attempts = attempts + 1, last_error = ?, next_attempt_at = ? WHERE id = ?",
+                (error, self._clock() + delay_seconds, item_id),
+            )
+
+    def abandon(self, item_id: int, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue SET status = 'abandoned', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, item_id),
+            )
+
+    def abandon_inbox_note(self, inbox_path: Path | str, error: str) -> int:
+        """Give up on the pending items behind an inbox note (e.g. the user undid it); returns how many."""
+
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE queue SET status = 'abandoned', last_error = ? WHERE inbox_path = ? AND status = 'pending'",
+                (error, str(inbox_path)),
+            )
+        return cursor.rowcount
+
+    def harvest_watermark(self) -> str | None:
+        """UTC day (YYYY-MM-DD) of the newest event log entry already harvested."""
+
+        with self._lock:
+            row = self._conn.execute("SELECT last_day FROM harvest_state WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def set_harvest_watermark(self, day: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO harvest_state (id, last_day) VALUES (1, ?)"
+                " ON CONFLICT (id) DO UPDATE SET last_day = MAX(last_day, excluded.last_day)",
+                (day,),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM queue GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_QUEUE: ReprocessQueue | None = None
+
+
+def get_reprocess_queue() -> ReprocessQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        _QUEUE = ReprocessQueue(Path(get_settings().cache_dir) / QUEUE_FILE_NAME)
+    return _QUEUE
+
+
+__all__ = ["QueueItem", "QueueStatus", "ReprocessQueue", "get_reprocess_queue"]
@@ -0,0 +1,231 @@
+"""Retry messages that failed or were saved unparsed, once the bot is idle."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable
+
+from time_bot.bot.throttling import TokenBucket
+from time_bot.config import get_settings
+from time_bot.event_log import get_event_log
+from time_bot.journal import get_note_journal
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+from time_bot.pipeline import PipelineResult, process_message_text
+from time_bot.reprocess_queue import QueueItem, ReprocessQueue, get_reprocess_queue
+from time_bot.vault_events import note_written
+
+MAX_BACKOFF_SECONDS = 6 * 3600
+
+Notify = Callable[[int, PipelineResult], Awaitable[None]]
+
+_LAST_ACTIVITY = 0.0
+
+
+def note_activity() -> None:
+    """Called for every incoming message; the reprocessor waits for a quiet period."""
+
+    global _LAST_ACTIVITY
+    _LAST_ACTIVITY = time.monotonic()
+
+
+def seconds_since_activity() -> float:
+    return time.monotonic() - _LAST_ACTIVITY
+
+
+def _event_time(event: dict) -> float:
+    try:
+        return datetime.fromisoformat(event["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def harvest_failed_messages(queue: ReprocessQueue, events: Iterable[dict] | None = None) -> int:
+    """Stream the event log and queue errors that were never followed by a success.
+
+    Queued items whose text was later processed successfully (the user sent it
+    again) are closed instead of being retried. Returns the number of new items.
+    Without `events` only the days from the queue's harvest watermark on are
+    read (the watermark day itself again, as it may have grown since); errors
+    seen twice are deduplicated by their source key.
+    """
+
+    open_items = {item.raw_text: item for item in queue.pending(limit=10_000)}
+    failures: Dict[str, dict] = {}
+    newest_day = ""
+    if events is None:
+        watermark = queue.harvest_watermark()
+        events = get_event_log().iter_events(date.fromisoformat(watermark) if watermark else None)
+        track_watermark = True
+    else:
+        track_watermark = False
+    for event in events:
+        newest_day = max(newest_day, str(event.get("timestamp") or "")[:10])
+        text = event.get("raw_text")
+        if not text:
+            continue
+        status = event.get("status")
+        if status == "success":
+            failures.pop(text, None)
+            item = open_items.get(text)
+            if item is not None and _event_time(event) > item.created_at:
+                queue.mark_done(item.id)
+                del open_items[text]
+        elif status == "error" and event.get("retryable", True):
+            failures[text] = event
+
+    added = 0
+    for text, event in failures.items():
+        if text in open_items:
+            continue
+        digest = hashlib.sha1(f"{event.get('timestamp')}\n{text}".encode("utf-8")).hexdigest()
+        item_id = queue.enqueue(
+            text,
+            chat_id=event.get("chat_id"),
+            reason=str(event.get("error") or "error"),
+            source_key=f"log:{digest}",
+        )
+        if item_id is not None:
+            added += 1
+    if track_watermark and newest_day:
+        queue.set_harvest_watermark(newest_day)
+    METRICS.increment("reprocess.harvested", added)
+    return added
+
+
+@dataclass(slots=True)
+class ReprocessReport:
+    succeeded: int = 0
+    retried: int = 0
+    abandoned: int = 0
+
+
+class Reprocessor:
+    """Run due queue items through the pipeline with bounded concurrency and a rate limit.
+
+    Successful items remove their inbox note and are reported through
+    `notify`; failures back off exponentially until `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        queue: ReprocessQueue,
+        *,
+        notify: Notify | None = None,
+        concurrency: int = 2,
+        rate_per_minute: float = 20.0,
+        max_attempts: int = 5,
+        backoff_seconds: float = 120.0,
+    ):
+        self.queue = queue
+        self.notify = notify
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._bucket = TokenBucket(rate_per_minute / 60, capacity=1)
+
+    async def run_once(self, limit: int = 50) -> ReprocessReport:
+        report = ReprocessReport()
+        items = await asyncio.to_thread(self.queue.due, limit)
+        if not items:
+            return report
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _run(item: QueueItem) -> None:
+            async with semaphore:
+                wait = self._bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self._attempt(item, report)
+
+        await asyncio.gather(*(_run(item) for item in items))
+        return report
+
+    async def _attempt(self, item: QueueItem, report: ReprocessReport) -> None:
+        try:
+            # No deadline: nobody is waiting for this reply.
+            result = await process_message_text(item.raw_text, chat_id=item.chat_id, deadline_seconds=0)
+        except Exception as exc:
+            await self._failed(item, str(exc), report)
+            return
+
+        await asyncio.to_thread(self.queue.mark_done, item.id)
+        report.succeeded += 1
+        METRICS.increment("reprocess.succeeded")
+        if item.inbox_path is not None:
+            await asyncio.to_thread(_remove_inbox_note, item.inbox_path)
+        if self.notify is not None and item.chat_id is not None:
+            try:
+                await self.notify(item.chat_id, result)
+            except Exception as exc:
+                LOGGER.warning("Could not notify chat %s about reprocessed message: %s", item.chat_id, exc)
+
+    async def _failed(self, item: QueueItem, error: str, report: ReprocessReport) -> None:
+        attempts = item.attempts + 1
+        if attempts >= self.max_attempts:
+            await asyncio.to_thread(self.queue.abandon, item.id, error)
+            report.abandoned += 1
+            METRICS.increment("reprocess.abandoned")
+            LOGGER.warning("Gave up on message after %s attempts: %s | text=%s", attempts, error, item.raw_text)
+            return
+        delay = min(self.backoff_seconds * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS)
+        await asyncio.to_thread(self.queue.mark_retry, item.id, error, delay_seconds=delay)
+        report.retried += 1
+        METRICS.increment("reprocess.retried")
+
+    async def run_forever(self, *, interval_seconds: float, idle_seconds: float) -> None:
+        """Harvest and drain the queue every `interval_seconds` while no message arrived for `idle_seconds`."""
+
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if seconds_since_activity() < idle_seconds:
+                METRICS.increment("reprocess.skipped_busy")
+                continue
+            try:
+                await asyncio.to_thread(harvest_failed_messages, self.queue)
+                report = await self.run_once()
+            except Exception:
+                LOGGER.exception("Reprocessing pass failed")
+                continue
+            if report.succeeded or report.retried or report.abandoned:
+                LOGGER.info(
+                    "Reprocessed messages | succeeded=%s retried=%s abandoned=%s",
+                    report.succeeded,
+                    report.retried,
+                    report.abandoned,
+                )
+
+
+def _remove_inbox_note(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    get_note_journal().retire(path)
+    note_written("unparsed", path)
+
+
+def build_reprocessor(*, notify: Notify | None = None) -> Reprocessor:
+    settings = get_settings()
+    return Reprocessor(
+        get_reprocess_queue(),
+        notify=notify,
+        concurrency=settings.reprocess_concurrency,
+        rate_per_minute=settings.reprocess_rate_per_minute,
+        max_attempts=settings.reprocess_max_attempts,
+        backoff_seconds=settings.reprocess_backoff_seconds,
+    )
+
+
+__all__ = [
+    "ReprocessReport",
+    "Reprocessor",
+    "build_reprocessor",
+    "harvest_failed_messages",
+    "note_activity",
+    "seconds_since_activity",
+]
@@ -0,0 +1,296 @@
+"""Incremental full-text index over vault notes backed by SQLite FTS5."""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from time_bot.config import Settings, get_settings
+from time_bot.daily_notes import is_daily_note, iter_blocks
+from time_bot.task_reader import extract_frontmatter
+from time_bot.vault_layout import iter_note_files
+
+INDEX_FILE_NAME = "search_index.sqlite3"
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC_PATTERN = re.compile(r"[а-я]")
+# Longest suffixes first; a light Russian stemmer is enough to match inflected forms.
+_RU_SUFFIXES = tuple(
+    sorted(
+        {
+            "иями", "ями", "ами", "ией", "ием", "иях", "ях", "ах", "ов", "ев", "ей", "ий", "ый",
+            "ой", "ая", "яя", "ое", "ее", "ие", "ые", "ого", "его", "ому", "ему", "ыми", "ими", "ую",
+            "юю", "ом", "ем", "ам", "ям", "ал", "ял", "ил", "ыл", "ла", "ли", "ло", "ать", "ять",
+            "ить", "еть", "ться", "тся", "ешь", "ет", "ют", "ут", "ат", "ят", "ишь", "ит", "ия", "ию",
+            "ью", "ья", "ье", "ьи", "а", "я", "о", "е", "и", "ы", "у", "ю", "ь", "й",
+        },
+        key=len,
+        reverse=True,
+    )
+)
+_EN_SUFFIXES = ("ing", "ed", "es", "s")
+_BODY_LABELS = {"Исходный текст:", "Описание задачи:"}
+_TYPE_BY_TAG = {
+    "time_system": "time_log",
+    "time_system_daily": "time_log",
+    "task": "task",
+    "diary": "diary",
+    "diary_daily": "diary",
+}
+
+
+@dataclass(slots=True, frozen=True)
+class NoteRoot:
+    path: Path
+    note_type: str
+    recursive: bool = False
+    partition_format: str = ""
+
+
+@dataclass(slots=True)
+class SearchHit:
+    file_path: Path
+    title: str
+    note_type: str
+    note_date: str | None
+    score: float
+
+    @property
+    def file_name(self) -> str:
+        return self.file_path.name
+
+
+def normalize_token(token: str) -> str:
+    """Lowercase and strip common inflection endings from a single word."""
+
+    word = token.lower().replace("ё", "е")
+    if _CYRILLIC_PATTERN.search(word):
+        if word.endswith(("ся", "сь")) and len(word) > 5:
+            word = word[:-2]
+        for suffix in _RU_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[: -len(suffix)]
+        return word
+    for suffix in _EN_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(normalize_token(token) for token in _TOKEN_PATTERN.findall(text))
+
+
+def default_roots(settings: Settings | None = None) -> List[NoteRoot]:
+    settings = settings or get_settings()
+    return [
+        NoteRoot(Path(settings.obsidian_vault_dir), "time_log", partition_format=settings.vault_partition_format),
+        NoteRoot(Path(settings.obsidian_tasks_path), "task", recursive=True),
+        NoteRoot(Path(settings.obsidian_diary_folder), "diary", partition_format=settings.vault_partition_format),
+    ]
+
+
+class SearchIndex:
+    """Inverted index that re-reads only notes whose size or mtime changed."""
+
+    def __init__(self, db_path: Path, roots: Sequence[NoteRoot]):
+        self.db_path = Path(db_path)
+        self.roots = list(roots)
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                note_type TEXT NOT NULL,
+                note_date TEXT,
+                title TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+                title, body, tokenize = 'unicode61 remove_diacritics 2'
+            );
+            """
+        )
+        return conn
+
+    def refresh(self) -> int:
+        """Synchronise the index with the filesystem and return the number of changed notes."""
+
+        current = dict(self._scan())
+        conn = self._connect()
+        try:
+            with conn:
+                # Take the write lock before reading what is stored, so concurrent refreshes
+                # (parallel /search calls, the CLI) run one after another instead of racing.
+                conn.execute("BEGIN IMMEDIATE")
+                stored: Dict[str, Tuple[int, int, int]] = {
+                    path: (doc_id, mtime_ns, size)
+                    for doc_id, path, mtime_ns, size in conn.execute(
+                        "SELECT id, path, mtime_ns, size FROM documents"
+                    )
+                }
+                changes = 0
+                for path, (doc_id, _, _) in stored.items():
+                    if path not in current:
+                        conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+                        conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                        changes += 1
+                for path, (mtime_ns, size, note_type) in current.items():
+                    previous = stored.get(path)
+                    if previous is not None and previous[1:] == (mtime_ns, size):
+                        continue
+                    parsed = _read_note(Path(path), note_type)
+                    if parsed is None:
+                        continue
+                    title, body, resolved_type, note_date = parsed
+                    (doc_id,) = conn.execute(
+                        "INSERT INTO documents (path, mtime_ns, size, note_type, note_date, title)"
+                        " VALUES (?, ?, ?, ?, ?, ?)"
+                        " ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size,"
+                        " note_type = excluded.note_type, note_date = excluded.note_date, title = excluded.title"
+                        " RETURNING id",
+                        (path, mtime_ns, size, resolved_type, note_date, title),
+                    ).fetchone()
+                    conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+                    conn.execute(
+                        "INSERT INTO documents_fts (rowid, title, body) VALUES (?, ?, ?)",
+                        (doc_id, normalize_text(title), normalize_text(body)),
+                    )
+                    changes += 1
+            return changes
+        finally:
+            conn.close()
+
+    def search(self, query: str, *, limit: int = 10, refresh: bool = True) -> List[SearchHit]:
+        """Return notes matching every word of the query, best matches first."""
+
+        match = _build_match_query(query)
+        if not match:
+            return []
+        if refresh:
+            self.refresh()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                """
+                SELECT d.path, d.title, d.note_type, d.note_date, bm25(documents_fts, 5.0, 1.0) AS rank
+                FROM documents_fts
+                JOIN documents AS d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            SearchHit(file_path=Path(path), title=title, note_type=note_type, note_date=note_date, score=-rank)
+            for path, title, note_type, note_date, rank in rows
+        ]
+
+    def _scan(self) -> Iterator[Tuple[str, Tuple[int, int, str]]]:
+        for root in self.roots:
+            entries: Iterable[os.DirEntry | Path]
+            if root.partition_format and not root.recursive:
+                entries = iter_note_files(root.path, root.partition_format)
+            else:
+                entries = _iter_markdown_entries(root.path, root.recursive)
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield os.fspath(entry), (stat.st_mtime_ns, stat.st_size, root.note_type)
+
+
+def _iter_markdown_entries(base_dir: Path, recursive: bool) -> Iterable[os.DirEntry]:
+    try:
+        with os.scandir(base_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.startswith("."):
+                        yield from _iter_markdown_entries(Path(entry.path), recursive)
+                    continue
+                if entry.name.endswith(".md"):
+                    yield entry
+    except OSError:
+        return
+
+
+def _read_note(path: Path, default_type: str) -> Tuple[str, str, str, str | None] | None:
+    try:
+        content = path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return None
+    frontmatter, body_lines = extract_frontmatter(content.splitlines())
+    note_type = default_type
+    tags = frontmatter.get("tags")
+    if isinstance(tags, list):
+        for tag in tags:
+            if tag in _TYPE_BY_TAG:
+                note_type = _TYPE_BY_TAG[tag]
+                break
+
+    if is_daily_note(path):
+        # One document per day: the entry headings and texts, without the metadata fences.
+        body_lines = []
+        for block in iter_blocks(path):
+            body_lines.extend([block.heading, *block.body.splitlines()])
+        body_lines.insert(0, path.stem)
+
+    title = ""
+    rest: List[str] = []
+    for line in body_lines:
+        stripped = line.strip()
+        if not stripped or stripped in _BODY_LABELS:
+            continue
+        if stripped.startswith(">"):
+            stripped = stripped[1:].strip()
+        if not title:
+            title = stripped
+        else:
+            rest.append(stripped)
+    title = title or path.stem
+    note_date = frontmatter.get("date") or frontmatter.get("due") or None
+    if isinstance(note_date, str):
+        note_date = note_date[:10] or None
+    else:
+        note_date = None
+    return title, "\n".join(rest), note_type, note_date
+
+
+def _build_match_query(query: str) -> str:
+    terms = [normalize_token(token) for token in _TOKEN_PATTERN.findall(query)]
+    return " AND ".join(f'"{term}"*' for term in terms if term)
+
+
+def get_search_index(settings: Settings | None = None) -> SearchIndex:
+    settings = settings or get_settings()
+    return SearchIndex(Path(settings.cache_dir) / INDEX_FILE_NAME, default_roots(settings))
+
+
+def search_notes(query: str, *, limit: int = 10) -> List[SearchHit]:
+    """Refresh the default index and run a query against it."""
+
+    return get_search_index().search(query, limit=limit)
+
+
+__all__ = [
+    "NoteRoot",
+    "SearchHit",
+    "SearchIndex",
+    "default_roots",
+    "get_search_index",
+    "normalize_text",
+    "normalize_token",
+    "search_notes",
+]
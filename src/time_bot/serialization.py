@@ -0,0 +1,139 @@
+"""JSON encoding for logs, caches and LLM payloads with the fastest installed backend.
+
+orjson is preferred, then msgspec, then the standard library. All backends
+write compact UTF-8 (non-ASCII text is kept as is), encode `date`, `time`
+and `datetime` as ISO strings and pydantic models as their JSON dump, and
+raise `json.JSONDecodeError` on bad input. One difference remains: msgspec
+writes a UTC offset as `Z` instead of `+00:00`, so values that are compared
+as strings (event timestamps) are formatted with `isoformat()` before they
+get here.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@dataclass(slots=True, frozen=True)
+class Backend:
+    name: str
+    dumps_bytes: Callable[..., bytes]
+    loads: Callable[[str | bytes], Any]
+
+
+def _stdlib_backend() -> Backend:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+    sorted_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default, sort_keys=True)
+
+    def _dumps_bytes(value: Any, *, sort_keys: bool = False) -> bytes:
+        return (sorted_encoder if sort_keys else encoder).encode(value).encode("utf-8")
+
+    return Backend("json", _dumps_bytes, json.loads)
+
+
+def _orjson_backend() -> Backend | None:
+    try:
+        import orjson
+    except ImportError:
+        return None
+
+    def _dumps_bytes(value: Any, *, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+
+    # orjson.JSONDecodeError already subclasses json.JSONDecodeError.
+    return Backend("orjson", _dumps_bytes, orjson.loads)
+
+
+def _msgspec_backend() -> Backend | None:
+    try:
+        import msgspec
+    except ImportError:
+        return None
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    sorted_encoder = msgspec.json.Encoder(enc_hook=_default, order="sorted")
+    decoder = msgspec.json.Decoder()
+
+    def _dumps_bytes(value: Any, *, sort_keys: bool = False) -> bytes:
+        return (sorted_encoder if sort_keys else encoder).encode(value)
+
+    def _loads(data: str | bytes) -> Any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as exc:
+            text = data.decode("utf-8", "replace") if isinstance(data, bytes) else data
+            raise json.JSONDecodeError(str(exc), text, 0) from None
+
+    return Backend("msgspec", _dumps_bytes, _loads)
+
+
+_FACTORIES: Dict[str, Callable[[], Backend | None]] = {
+    "orjson": _orjson_backend,
+    "msgspec": _msgspec_backend,
+    "json": _stdlib_backend,
+}
+
+
+def available_backends() -> List[str]:
+    return [name for name, factory in _FACTORIES.items() if factory() is not None]
+
+
+def get_backend(name: str) -> Backend:
+    factory = _FACTORIES.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    backend = factory()
+    if backend is None:
+        raise RuntimeError(f"JSON backend {name} is not installed (pip install {name})")
+    return backend
+
+
+_BACKEND: Backend = next(backend for backend in (factory() for factory in _FACTORIES.values()) if backend)
+
+
+def use_backend(name: str) -> Backend:
+    """Switch the process-wide backend (benchmarks, tests); returns the previous one."""
+
+    global _BACKEND
+    previous, _BACKEND = _BACKEND, get_backend(name)
+    return previous
+
+
+def backend_name() -> str:
+    return _BACKEND.name
+
+
+def dumps_bytes(value: Any, *, sort_keys: bool = False) -> bytes:
+    return _BACKEND.dumps_bytes(value, sort_keys=sort_keys)
+
+
+def dumps(value: Any, *, sort_keys: bool = False) -> str:
+    return _BACKEND.dumps_bytes(value, sort_keys=sort_keys).decode("utf-8")
+
+
+def loads(data: str | bytes) -> Any:
+    return _BACKEND.loads(data)
+
+
+__all__ = [
+    "Backend",
+    "available_backends",
+    "backend_name",
+    "dumps",
+    "dumps_bytes",
+    "get_backend",
+    "loads",
+    "use_backend",
+]
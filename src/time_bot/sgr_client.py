@@ -1,24 +1,44 @@
 """Structured parsing client powered by an OpenAI-compatible endpoint."""
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 from datetime import date
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, TypedDict
+from typing import Any, Dict, List, Sequence, Tuple, TypedDict
 
 from openai import AsyncOpenAI
 from openai import APIError
+from openai import APIStatusError
+from openai import APITimeoutError
 from openai import OpenAIError
+from openai import RateLimitError
 
+from time_bot.cassette import get_cassette
 from time_bot.config import get_settings
-from time_bot.models import MessageClassification, TaskEntry, TimeEntry
+from time_bot.deadline import DeadlineExceededError, current_deadline, stage_budget
+from time_bot.llm_limiter import Signal, get_llm_limiter
+from time_bot.model_router import RouteDecision, Stage, get_model_router
+from time_bot.models import (
+    MessageBatch,
+    MessageBatchItem,
+    MessageClassification,
+    TaskEntry,
+    TimeEntry,
+    TimeEntryBatch,
+)
+from time_bot.serialization import loads
 
 
 class SGRParseError(RuntimeError):
     """Raised when SGR cannot parse a message."""
 
 
+OVERLOAD_STATUS_CODES = frozenset({429, 503, 529})
+
+
 TIME_ENTRY_SYSTEM_PROMPT = """Ты — парсер временных записей.
 На входе сообщение пользователя о том, чем он занимался и сколько времени потратил.
 Нужно извлечь структуру TimeEntry:
@@ -63,6 +83,41 @@ raw_text обязан точно совпадать с сообщением вы
 Верни только JSON без пояснений.
 """
 
+TIME_ENTRY_TAGGED_SYSTEM_PROMPT = """Ты — парсер временных записей.
+На входе сообщение пользователя о том, чем он занимался и сколько времени потратил.
+Нужно извлечь структуру TimeEntry:
+- title — короткое описание занятия.
+- minutes — длительность в минутах (часы переводи в минуты).
+- date — дата события (YYYY-MM-DD); если дата не указана, используй предоставленное значение.
+- start_time — время начала (HH:MM), если явно указано.
+- maintag и subtag — уже определены, скопируй их из контекста без изменений.
+- comment — произвольный комментарий, если есть дополнительные детали.
+- raw_text — полный оригинальный текст сообщения.
+Не выдумывай факты, не переводи текст, minutes > 0 и <= 720. Ответ — строго JSON по схеме.
+"""
+
+TIME_ENTRY_BATCH_SYSTEM_PROMPT = TIME_ENTRY_SYSTEM_PROMPT.replace(
+    "- raw_text — полный оригинальный текст сообщения.",
+    "- raw_text — фрагмент исходного сообщения, относящийся к этому занятию (дословно).",
+) + """Сообщение может описывать несколько занятий подряд (например «30 мин обед, 1 час кодинг, 15 мин дорога»).
+Верни объект {"entries": [...]}, где каждый элемент — отдельный TimeEntry, в порядке упоминания.
+Не объединяй разные занятия в одну запись и не дроби одно занятие на несколько.
+"""
+
+TIME_ENTRY_BATCH_USER_PROMPT_TEMPLATE = """Тебе передан текст сообщения пользователя, в котором перечислено несколько занятий.
+
+Контекст:
+{context_json}
+
+Сообщение:
+<<<
+{message}
+>>>
+
+Если в тексте нет даты, используй date из контекста.
+Верни только JSON с полем entries без пояснений.
+"""
+
 CLASSIFIER_SYSTEM_PROMPT = """Ты — классификатор входящих сообщений для личного бота.
 Нужно определить, к какой из трёх категорий относится текст:
 - time_log — пользователь явно логирует, сколько минут потратил на активность (например «30 минут чтения книги»). Если сообщение начинается с числа минут, часов или содержит шаблон «N минут», «час», «за 25 мин» и т.д., почти всегда это time_log.
@@ -117,27 +172,87 @@ TASK_USER_PROMPT_TEMPLATE = """Разбери задачу по схеме TaskE
 Верни только JSON. raw_text обязан совпадать с текстом выше.
 """
 
+MESSAGE_BATCH_SYSTEM_PROMPT = (
+    """Ты обрабатываешь пачку сообщений пользователя за один раз.
+Для каждого сообщения верни элемент items с полями:
+- index — номер сообщения из входа;
+- intent — task, journal или time_log по правилам классификатора ниже;
+- time_entry — заполнен только для time_log, по правилам TimeEntry ниже (raw_text — текст этого сообщения);
+- task_entry — заполнен только для task, по правилам TaskEntry ниже (raw_text — текст этого сообщения);
+для journal оба поля null. Каждое сообщение обрабатывай независимо от остальных.
+
+## Классификатор
+"""
+    + CLASSIFIER_SYSTEM_PROMPT
+    + "\n## TimeEntry\n"
+    + TIME_ENTRY_SYSTEM_PROMPT
+    + "\n## TaskEntry\n"
+    + TASK_SYSTEM_PROMPT
+)
+
+MESSAGE_BATCH_USER_PROMPT_TEMPLATE = """Разбери каждое сообщение из списка. Контекст содержит текущую дату и таймзону задач (Москва).
+
+Контекст:
+{context_json}
+
+Сообщения:
+{messages}
+
+Верни только JSON с полем items, по одному элементу на каждое сообщение.
+"""
+
 
 class _Message(TypedDict):
     role: str
     content: str
 
 
-def _build_context_json(message_text: str, today: date, timezone: str | None = None) -> str:
+def _build_context_json(message_text: str, today: date, timezone: str | None = None, **extra: Any) -> str:
+    # Prompt text is part of the cassette key, so it keeps the stdlib layout whatever JSON backend is installed.
     context = {
         "raw_text": message_text,
         "date": today.isoformat(),
     }
     if timezone:
         context["timezone"] = timezone
+    context.update(extra)
     return json.dumps(context, ensure_ascii=False)
 
 
-def _build_time_entry_messages(message_text: str, today: date, timezone: str) -> List[_Message]:
-    context_json = _build_context_json(message_text, today, timezone)
+def _build_time_entry_messages(
+    message_text: str,
+    today: date,
+    timezone: str,
+    tags: Tuple[str, str | None] | None = None,
+) -> List[_Message]:
+    system_prompt = TIME_ENTRY_SYSTEM_PROMPT
+    if tags is None:
+        context_json = _build_context_json(message_text, today, timezone)
+    else:
+        context_json = _build_context_json(message_text, today, timezone, maintag=tags[0], subtag=tags[1])
+        system_prompt = TIME_ENTRY_TAGGED_SYSTEM_PROMPT
     user_prompt = TIME_ENTRY_USER_PROMPT_TEMPLATE.format(context_json=context_json, message=message_text)
     return [
-        {"role": "system", "content": TIME_ENTRY_SYSTEM_PROMPT},
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _build_time_entry_batch_messages(message_text: str, today: date, timezone: str) -> List[_Message]:
+    context_json = _build_context_json(message_text, today, timezone)
+    user_prompt = TIME_ENTRY_BATCH_USER_PROMPT_TEMPLATE.format(context_json=context_json, message=message_text)
+    return [
+        {"role": "system", "content": TIME_ENTRY_BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _build_message_batch_messages(texts: Sequence[str], today: date, timezone: str) -> List[_Message]:
+    context_json = json.dumps({"date": today.isoformat(), "timezone": timezone}, ensure_ascii=False)
+    numbered = "\n".join(f"[{index}]\n<<<\n{text}\n>>>" for index, text in enumerate(texts))
+    user_prompt = MESSAGE_BATCH_USER_PROMPT_TEMPLATE.format(context_json=context_json, messages=numbered)
+    return [
+        {"role": "system", "content": MESSAGE_BATCH_SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt},
     ]
 
@@ -157,7 +272,7 @@ def _load_schema(schema_name: str) -> Dict[str, Any]:
     schema_path = root_dir / "schemas" / f"{schema_name}.json"
     if not schema_path.exists():
         raise FileNotFoundError(f"Schema file not found: {schema_path}")
-    return json.loads(schema_path.read_text(encoding="utf-8"))
+    return loads(schema_path.read_bytes())
 
 
 _CLIENT: AsyncOpenAI | None = None
@@ -195,25 +310,85 @@ def _extract_json_text(content: str) -> str:
     return text
 
 
-async def parse_time_entry_with_sgr(message_text: str, today: date) -> TimeEntry:
-    """Call the structured parsing model and validate the result."""
+class _EndpointError(SGRParseError):
+    """The endpoint itself failed (network/API error), as opposed to a bad answer."""
+
+
+def _deadline_error() -> DeadlineExceededError:
+    deadline = current_deadline()
+    return DeadlineExceededError(deadline.stage if deadline else None)
 
+
+async def _request_structured(messages: List[_Message], schema_name: str, stage: Stage) -> str:
+    """Send a structured-output request for a pipeline stage and return the raw response text."""
+
+    router = get_model_router()
+    decision = router.choose(stage)
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        try:
+            async with asyncio.timeout(stage_budget()):
+                return await cassette.replay(messages, schema_name, decision.model)
+        except TimeoutError:
+            raise _deadline_error() from None
+
+    try:
+        return await _call_model(messages, schema_name, decision)
+    except _EndpointError:
+        retry = router.fallback_after_error(decision)
+        if retry is None:
+            raise
+        return await _call_model(messages, schema_name, retry)
+
+
+def _is_overload(exc: Exception) -> bool:
+    """429s, provider overload statuses and client timeouts mean the endpoint wants fewer calls."""
+
+    if isinstance(exc, (RateLimitError, APITimeoutError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code in OVERLOAD_STATUS_CODES
+
+
+async def _call_model(messages: List[_Message], schema_name: str, decision: RouteDecision) -> str:
+    model = decision.model
     client = _get_client()
-    settings = get_settings()
-    messages = _build_time_entry_messages(message_text, today, settings.timezone)
-    schema = _load_schema("time_entry")
+    router = get_model_router()
+    cassette = get_cassette()
+    schema = _load_schema(schema_name)
+    budget = stage_budget()
+    endpoint = get_settings().openai_base_url
+    permit = None
+    signal: Signal = "error"
+    # Waiting for a permit spends the stage budget, but only time after it counts as model latency.
+    started = time.perf_counter()
     try:
-        response = await client.chat.completions.create(
-            model=settings.model_name,
-            messages=messages,
-            temperature=0,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {"name": "time_entry", "schema": schema},
-            },
-        )
+        async with asyncio.timeout(budget):
+            permit = await get_llm_limiter().acquire(endpoint, model)
+            started = time.perf_counter()
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0,
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {"name": schema_name, "schema": schema},
+                },
+            )
+        signal = "ok"
     except (APIError, OpenAIError, ConnectionError) as exc:
-        raise SGRParseError(f"Failed to call SGR endpoint: {exc}") from exc
+        signal = "overload" if _is_overload(exc) else "error"
+        router.report(decision, (time.perf_counter() - started) * 1000, ok=False)
+        raise _EndpointError(f"Failed to call SGR endpoint: {exc}") from exc
+    except TimeoutError:
+        # The stage budget is ours, not the provider's: running out of it says nothing about load.
+        if permit is not None:
+            router.report(decision, (time.perf_counter() - started) * 1000, ok=False)
+        raise _deadline_error() from None
+    finally:
+        if permit is not None:
+            permit.release(signal)
+    latency_ms = (time.perf_counter() - started) * 1000
+    router.report(decision, latency_ms, ok=True)
 
     if not response.choices:
         raise SGRParseError("LLM returned no choices")
@@ -228,13 +403,45 @@ async def parse_time_entry_with_sgr(message_text: str, today: date) -> TimeEntry
     else:
         content_str = content
 
+    if cassette is not None and cassette.mode == "record":
+        cassette.record(messages, schema_name, model, content_str, latency_ms=latency_ms)
+    return content_str
+
+
+def _load_payload(content_str: str) -> Dict[str, Any]:
     try:
-        payload = json.loads(_extract_json_text(content_str))
+        # Structured output is normally a clean object; only scan for an embedded one when it isn't.
+        payload = loads(content_str)
+    except json.JSONDecodeError:
+        payload = None
+    if isinstance(payload, dict):
+        return payload
+    try:
+        return loads(_extract_json_text(content_str))
     except json.JSONDecodeError as exc:
         raise SGRParseError(f"LLM returned invalid JSON: {exc}\nContent: {content_str}") from exc
 
+
+async def parse_time_entry_with_sgr(
+    message_text: str,
+    today: date,
+    *,
+    tags: Tuple[str, str | None] | None = None,
+) -> TimeEntry:
+    """Call the structured parsing model and validate the result.
+
+    With `tags` (maintag, subtag) already known, a shorter prompt without the
+    tagging rules is sent and the given tags win over whatever the model returns.
+    """
+
+    settings = get_settings()
+    messages = _build_time_entry_messages(message_text, today, settings.timezone, tags)
+    payload = _load_payload(await _request_structured(messages, "time_entry", "time_entry"))
+
     payload.setdefault("raw_text", message_text)
     payload.setdefault("date", today.isoformat())
+    if tags is not None:
+        payload["maintag"], payload["subtag"] = tags
 
     try:
         entry = TimeEntry.model_validate(payload)
@@ -244,42 +451,33 @@ async def parse_time_entry_with_sgr(message_text: str, today: date) -> TimeEntry
     return entry
 
 
-async def parse_task_entry_with_sgr(message_text: str, today: date, timezone: str) -> TaskEntry:
-    """Call the structured parsing model for tasks."""
+async def parse_time_entries_with_sgr(message_text: str, today: date) -> List[TimeEntry]:
+    """Extract every activity mentioned in a recap message with a single model call."""
 
-    client = _get_client()
     settings = get_settings()
-    messages = _build_task_messages(message_text, today, timezone)
-    schema = _load_schema("task_entry")
+    messages = _build_time_entry_batch_messages(message_text, today, settings.timezone)
+    payload = _load_payload(await _request_structured(messages, "time_entry_batch", "time_entry"))
+
+    entries = payload.get("entries")
+    if isinstance(entries, list):
+        for item in entries:
+            if isinstance(item, dict):
+                item.setdefault("raw_text", message_text)
+                item.setdefault("date", today.isoformat())
+
     try:
-        response = await client.chat.completions.create(
-            model=settings.model_name,
-            messages=messages,
-            temperature=0,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {"name": "task_entry", "schema": schema},
-            },
-        )
-    except (APIError, OpenAIError, ConnectionError) as exc:
-        raise SGRParseError(f"Failed to call SGR endpoint: {exc}") from exc
+        batch = TimeEntryBatch.model_validate(payload)
+    except Exception as exc:
+        raise SGRParseError(f"Response does not match schema: {exc}\nPayload: {payload}") from exc
 
-    if not response.choices:
-        raise SGRParseError("LLM returned no choices")
+    return batch.entries
 
-    content = response.choices[0].message.content
-    if not content:
-        raise SGRParseError("LLM response content is empty")
 
-    if isinstance(content, list):
-        content_str = "".join(part.get("text", "") for part in content if isinstance(part, dict))
-    else:
-        content_str = content
+async def parse_task_entry_with_sgr(message_text: str, today: date, timezone: str) -> TaskEntry:
+    """Call the structured parsing model for tasks."""
 
-    try:
-        payload = json.loads(_extract_json_text(content_str))
-    except json.JSONDecodeError as exc:
-        raise SGRParseError(f"LLM returned invalid JSON: {exc}\nContent: {content_str}") from exc
+    messages = _build_task_messages(message_text, today, timezone)
+    payload = _load_payload(await _request_structured(messages, "task_entry", "task_entry"))
 
     payload.setdefault("raw_text", message_text)
     payload.setdefault("project", ["routine"])
@@ -292,6 +490,37 @@ async def parse_task_entry_with_sgr(message_text: str, today: date, timezone: st
     return entry
 
 
+async def parse_message_batch(texts: Sequence[str], today: date, timezone: str) -> List[MessageBatchItem]:
+    """Classify and parse several messages with one model call; items are matched back by index."""
+
+    messages = _build_message_batch_messages(texts, today, timezone)
+    payload = _load_payload(await _request_structured(messages, "message_batch", "message_batch"))
+
+    items = payload.get("items")
+    if isinstance(items, list):
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index")
+            if not isinstance(index, int) or not 0 <= index < len(texts):
+                continue
+            time_entry = item.get("time_entry")
+            if isinstance(time_entry, dict):
+                time_entry.setdefault("raw_text", texts[index])
+                time_entry.setdefault("date", today.isoformat())
+            task_entry = item.get("task_entry")
+            if isinstance(task_entry, dict):
+                task_entry.setdefault("raw_text", texts[index])
+                task_entry.setdefault("project", ["routine"])
+
+    try:
+        batch = MessageBatch.model_validate(payload)
+    except Exception as exc:
+        raise SGRParseError(f"Response does not match schema: {exc}\nPayload: {payload}") from exc
+
+    return [item for item in batch.items if item.index < len(texts)]
+
+
 def _build_classification_messages(message_text: str) -> List[_Message]:
     user_prompt = CLASSIFIER_USER_PROMPT_TEMPLATE.format(message=message_text)
     return [
@@ -303,39 +532,8 @@ def _build_classification_messages(message_text: str) -> List[_Message]:
 async def classify_message_intent(message_text: str) -> MessageClassification:
     """Determine whether the text is a task, journal entry, or time log."""
 
-    client = _get_client()
-    settings = get_settings()
     messages = _build_classification_messages(message_text)
-    schema = _load_schema("message_classification")
-    try:
-        response = await client.chat.completions.create(
-            model=settings.model_name,
-            messages=messages,
-            temperature=0,
-            response_format={
-                "type": "json_schema",
-                "json_schema": {"name": "message_classification", "schema": schema},
-            },
-        )
-    except (APIError, OpenAIError, ConnectionError) as exc:
-        raise SGRParseError(f"Failed to call SGR endpoint: {exc}") from exc
-
-    if not response.choices:
-        raise SGRParseError("LLM returned no choices")
-
-    content = response.choices[0].message.content
-    if not content:
-        raise SGRParseError("LLM response content is empty")
-
-    if isinstance(content, list):
-        content_str = "".join(part.get("text", "") for part in content if isinstance(part, dict))
-    else:
-        content_str = content
-
-    try:
-        payload = json.loads(_extract_json_text(content_str))
-    except json.JSONDecodeError as exc:
-        raise SGRParseError(f"LLM returned invalid JSON: {exc}\nContent: {content_str}") from exc
+    payload = _load_payload(await _request_structured(messages, "message_classification", "classifier"))
 
     payload.setdefault("raw_text", message_text)
 
@@ -345,4 +543,11 @@ async def classify_message_intent(message_text: str) -> MessageClassification:
         raise SGRParseError(f"Response does not match schema: {exc}\nPayload: {payload}") from exc
 
 
-__all__ = ["SGRParseError", "parse_time_entry_with_sgr", "parse_task_entry_with_sgr", "classify_message_intent"]
+__all__ = [
+    "SGRParseError",
+    "parse_time_entry_with_sgr",
+    "parse_time_entries_with_sgr",
+    "parse_task_entry_with_sgr",
+    "parse_message_batch",
+    "classify_message_intent",
+]
@@ -3,8 +3,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date
+from functools import partial
 from pathlib import Path
-from typing import Iterable
+from typing import Iterator
+
+from time_bot.daily_notes import DAILY_TIME_PREFIX, TIME_BLOCK_TYPE, is_daily_note, iter_blocks
+from time_bot.profiling import profiled
+from time_bot.vault_layout import iter_note_files
+from time_bot.vault_scan import scan_notes
+
+_FRONTMATTER_KEYS = {"time", "date", "maintag", "subtag"}
 
 
 @dataclass(slots=True)
@@ -17,13 +25,17 @@ class DailyStats:
         return sum(self.minutes_by_maintag.values())
 
 
-def _iter_markdown_files(base_dir: Path) -> Iterable[Path]:
-    if not base_dir.exists():
-        return []
-    return base_dir.glob("*.md")
+@dataclass(slots=True)
+class TimeRecord:
+    date: date
+    minutes: int
+    maintag: str
+    subtag: str | None
+    title: str
+    file_path: Path
 
 
-def _parse_frontmatter(path: Path) -> dict[str, str]:
+def _parse_frontmatter(path: Path, *, with_title: bool = False) -> dict[str, str]:
     frontmatter: dict[str, str] = {}
     try:
         with path.open("r", encoding="utf-8") as handle:
@@ -39,31 +51,109 @@ def _parse_frontmatter(path: Path) -> dict[str, str]:
                 key, value = stripped.split(":", 1)
                 key = key.strip().lower()
                 value = value.strip()
-                if key in {"time", "date", "maintag"}:
+                if key in _FRONTMATTER_KEYS:
                     frontmatter[key] = value
+            if with_title:
+                for line in handle:
+                    stripped = line.strip()
+                    if stripped:
+                        frontmatter["title"] = stripped
+                        break
     except OSError:
         return {}
     return frontmatter
 
 
-def get_daily_stats(base_dir: Path, target_date: date) -> DailyStats:
-    minutes_by_maintag: dict[str, int] = {}
-    for note_path in _iter_markdown_files(base_dir):
-        frontmatter = _parse_frontmatter(note_path)
-        if not frontmatter:
-            continue
-        entry_date = frontmatter.get("date")
-        if entry_date != target_date.isoformat():
-            continue
-        maintag = frontmatter.get("maintag")
-        if not maintag:
+def is_time_note(path: Path) -> bool:
+    """Per-entry time note or daily time rollup, as opposed to other notes in the vault folder."""
+
+    if is_daily_note(path):
+        return path.name.startswith(DAILY_TIME_PREFIX)
+    return "maintag" in _parse_frontmatter(path)
+
+
+def _record_from_frontmatter(frontmatter: dict[str, str], path: Path) -> TimeRecord | None:
+    maintag = frontmatter.get("maintag")
+    if not maintag:
+        return None
+    try:
+        entry_date = date.fromisoformat(frontmatter.get("date", ""))
+        minutes = int(frontmatter.get("time", "0"))
+    except ValueError:
+        return None
+    return TimeRecord(
+        date=entry_date,
+        minutes=minutes,
+        maintag=maintag,
+        subtag=frontmatter.get("subtag") or None,
+        title=frontmatter.get("title") or path.stem,
+        file_path=path,
+    )
+
+
+def _iter_daily_records(path: Path) -> Iterator[TimeRecord]:
+    for block in iter_blocks(path):
+        if block.kind != TIME_BLOCK_TYPE:
             continue
-        try:
-            minutes = int(frontmatter.get("time", "0"))
-        except ValueError:
+        record = _record_from_frontmatter({**block.fields, "title": block.heading}, path)
+        if record is not None:
+            yield record
+
+
+def _records_from_note(path: Path, *, with_titles: bool = False) -> list[TimeRecord]:
+    if is_daily_note(path):
+        return list(_iter_daily_records(path))
+    frontmatter = _parse_frontmatter(path, with_title=with_titles)
+    if not frontmatter:
+        return []
+    record = _record_from_frontmatter(frontmatter, path)
+    return [record] if record is not None else []
+
+
+def iter_time_entries(
+    base_dir: Path,
+    *,
+    with_titles: bool = False,
+    partition_format: str = "",
+    date_from: date | None = None,
+    date_to: date | None = None,
+    workers: int = 1,
+) -> Iterator[TimeRecord]:
+    """Yield time entries one note at a time; titles need an extra read past the frontmatter.
+
+    Per-entry notes and daily rollup notes (one block per entry) can be mixed.
+    With a partitioned vault and both dates given only the matching folders are
+    listed; records are not filtered by date here. With `workers > 1` notes are
+    read on a thread pool and records arrive in completion order.
+    """
+
+    notes = iter_note_files(Path(base_dir), partition_format, date_from=date_from, date_to=date_to)
+    parse = partial(_records_from_note, with_titles=with_titles)
+    for records in scan_notes(notes, parse, workers=workers):
+        yield from records
+
+
+@profiled("daily_stats")
+def get_daily_stats(
+    base_dir: Path,
+    target_date: date,
+    *,
+    partition_format: str = "",
+    workers: int = 1,
+) -> DailyStats:
+    minutes_by_maintag: dict[str, int] = {}
+    records = iter_time_entries(
+        base_dir,
+        partition_format=partition_format,
+        date_from=target_date,
+        date_to=target_date,
+        workers=workers,
+    )
+    for record in records:
+        if record.date != target_date:
             continue
-        minutes_by_maintag[maintag] = minutes_by_maintag.get(maintag, 0) + minutes
+        minutes_by_maintag[record.maintag] = minutes_by_maintag.get(record.maintag, 0) + record.minutes
     return DailyStats(date=target_date, minutes_by_maintag=minutes_by_maintag)
 
 
-__all__ = ["DailyStats", "get_daily_stats"]
+__all__ = ["DailyStats", "TimeRecord", "get_daily_stats", "is_time_note", "iter_time_entries"]
@@ -0,0 +1,367 @@
+"""Local maintag/subtag predictor: character n-gram TF-IDF with cosine kNN.
+
+Training pairs are accepted time logs from the event log (raw_text ->
+maintag, subtag); `/edit_last` corrections replace the pair they edit and
+`/undo` withdraws it. Vectors are stored sparsely as parallel NumPy arrays
+(row, column, term frequency), so a query costs one pass over the non-zero
+entries and no dense document matrix is ever built. The model is persisted
+in cache_dir and extended with events newer than the last one it saw.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from time_bot.config import get_settings
+from time_bot.event_log import get_event_log
+from time_bot.logging_utils import LOGGER
+
+MODEL_FILE_NAME = "tag_predictor.npz"
+NGRAM_SIZES = (2, 3, 4)
+
+_DIGITS = re.compile(r"\d+(?:[.,]\d+)?")
+_SPACES = re.compile(r"\s+")
+
+Label = Tuple[str, str | None]
+
+# Saved as an empty maintag, which no accepted time log has.
+_FORGOTTEN: Label = ("", None)
+
+
+@dataclass(slots=True)
+class TagPrediction:
+    maintag: str
+    subtag: str | None
+    confidence: float
+    similarity: float
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, fold numbers into '#' (durations vary, activities don't) and collapse spaces."""
+
+    text = _DIGITS.sub("#", text.lower())
+    return " " + _SPACES.sub(" ", text).strip() + " "
+
+
+def char_ngrams(text: str) -> Counter:
+    normalized = normalize_text(text)
+    grams: Counter = Counter()
+    for size in NGRAM_SIZES:
+        for start in range(len(normalized) - size + 1):
+            grams[normalized[start : start + size]] += 1
+    return grams
+
+
+def is_training_event(event: dict) -> bool:
+    """Saved single-entry time logs and their `/edit_last` and `/undo` corrections (recaps carry no clean pair)."""
+
+    return (
+        event.get("status") == "success"
+        and event.get("kind") == "time_log"
+        and event.get("action") in (None, "edit", "undo")
+        and not event.get("batch_size")
+        and bool(event.get("raw_text") or event.get("previous_raw_text"))
+    )
+
+
+def training_update(event: dict) -> Tuple[str | None, Tuple[str, str, str | None] | None]:
+    """Text whose pair is withdrawn and the (text, maintag, subtag) pair to learn from one event.
+
+    An edit withdraws the text it replaced and teaches the corrected pair; an
+    undo withdraws the undone text and, when it restores an earlier version,
+    teaches that one again.
+    """
+
+    if not is_training_event(event):
+        return None, None
+    text = event.get("raw_text")
+    previous = event.get("previous_raw_text")
+    forget = previous if previous and previous != text else None
+    learn = (text, event["maintag"], event.get("subtag")) if text and event.get("maintag") else None
+    return forget, learn
+
+
+class TagPredictor:
+    """kNN over TF-IDF vectors; relearning an identical text only replaces its label."""
+
+    def __init__(self, *, k: int = 5):
+        if np is None:
+            raise RuntimeError("The tag predictor requires numpy (pip install 'time-system-bot[knn]')")
+        self.k = k
+        self.trained_until = ""
+        self._lock = threading.Lock()
+        self._vocabulary: Dict[str, int] = {}
+        self._df = np.zeros(0, dtype=np.int32)
+        self._rows = np.zeros(0, dtype=np.int32)
+        self._cols = np.zeros(0, dtype=np.int32)
+        self._tf = np.zeros(0, dtype=np.float32)
+        self._pending: List[Tuple[int, Dict[int, float]]] = []
+        self._texts: List[str] = []
+        self._row_by_text: Dict[str, int] = {}
+        self._labels: List[Label] = []
+        self._norms = None
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def learn(self, text: str, maintag: str, subtag: str | None) -> None:
+        key = normalize_text(text)
+        with self._lock:
+            row = self._row_by_text.get(key)
+            if row is not None:
+                self._labels[row] = (maintag, subtag)
+                return
+            features: Dict[int, float] = {}
+            for gram, count in char_ngrams(text).items():
+                column = self._vocabulary.setdefault(gram, len(self._vocabulary))
+                features[column] = 1.0 + math.log(count)
+            row = len(self._texts)
+            self._texts.append(key)
+            self._row_by_text[key] = row
+            self._labels.append((maintag, subtag))
+            self._pending.append((row, features))
+            self._norms = None
+
+    def forget(self, text: str) -> bool:
+        """Withdraw the label of `text` (e.g. an undone note); its row stays but never votes again."""
+
+        with self._lock:
+            row = self._row_by_text.get(normalize_text(text))
+            if row is None or not self._labels[row][0]:
+                return False
+            self._labels[row] = _FORGOTTEN
+            return True
+
+    def apply(self, event: dict) -> bool:
+        """Apply `training_update` of one event; returns whether it changed anything."""
+
+        forget, learn = training_update(event)
+        changed = self.forget(forget) if forget else False
+        if learn is not None:
+            self.learn(*learn)
+            changed = True
+        return changed
+
+    def _flush(self) -> None:
+        """Append pending rows to the sparse arrays (caller holds the lock)."""
+
+        if not self._pending:
+            return
+        rows = np.fromiter((row for row, features in self._pending for _ in features), dtype=np.int32)
+        cols = np.fromiter((col for _, features in self._pending for col in features), dtype=np.int32)
+        tf = np.fromiter((value for _, features in self._pending for value in features.values()), dtype=np.float32)
+        self._pending.clear()
+        self._rows = np.concatenate([self._rows, rows])
+        self._cols = np.concatenate([self._cols, cols])
+        self._tf = np.concatenate([self._tf, tf])
+        self._df = np.bincount(self._cols, minlength=len(self._vocabulary)).astype(np.int32)
+
+    def _idf(self) -> "np.ndarray":
+        return (np.log((1.0 + len(self._texts)) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def predict(self, text: str) -> TagPrediction | None:
+        with self._lock:
+            if not self._texts:
+                return None
+            self._flush()
+            idf = self._idf()
+            if self._norms is None:
+                weights = self._tf * idf[self._cols]
+                self._norms = np.sqrt(np.bincount(self._rows, weights=weights * weights, minlength=len(self._texts)))
+            query = np.zeros(len(self._vocabulary), dtype=np.float32)
+            unseen_idf = math.log(1.0 + len(self._texts)) + 1.0
+            query_norm_sq = 0.0
+            for gram, count in char_ngrams(text).items():
+                tf = 1.0 + math.log(count)
+                column = self._vocabulary.get(gram)
+                if column is None:
+                    query_norm_sq += (tf * unseen_idf) ** 2
+                    continue
+                query[column] = tf * idf[column]
+                query_norm_sq += float(query[column]) ** 2
+            if query_norm_sq == 0:
+                return None
+            dots = np.bincount(
+                self._rows, weights=self._tf * idf[self._cols] * query[self._cols], minlength=len(self._texts)
+            )
+            similarity = dots / (np.maximum(self._norms, 1e-12) * math.sqrt(query_norm_sq))
+            k = min(self.k, len(similarity))
+            nearest = np.argpartition(-similarity, k - 1)[:k]
+            votes: Dict[Label, float] = {}
+            best: Dict[Label, float] = {}
+            for row in nearest:
+                score = float(similarity[row])
+                if score <= 0:
+                    continue
+                label = self._labels[row]
+                if not label[0]:  # forgotten
+                    continue
+                votes[label] = votes.get(label, 0.0) + score
+                best[label] = max(best.get(label, 0.0), score)
+        if not votes:
+            return None
+        label = max(votes, key=votes.get)
+        share = votes[label] / sum(votes.values())
+        # A unanimous vote of distant neighbours is still a guess, so scale by the closest match.
+        return TagPrediction(label[0], label[1], confidence=share * best[label], similarity=best[label])
+
+    def update_from_events(self, events: Iterable[dict]) -> int:
+        """Apply time logs, edits and undos newer than `trained_until`; returns how many were read."""
+
+        learned = 0
+        for event in events:
+            timestamp = str(event.get("timestamp") or "")
+            if timestamp <= self.trained_until or not is_training_event(event):
+                continue
+            self.apply(event)
+            self.trained_until = timestamp
+            learned += 1
+        return learned
+
+    def save(self, path: Path) -> None:
+        with self._lock:
+            self._flush()
+            vocabulary = sorted(self._vocabulary, key=self._vocabulary.get)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp.npz")
+            np.savez(
+                tmp_path,
+                vocabulary=np.array(vocabulary, dtype=str),
+                rows=self._rows,
+                cols=self._cols,
+                tf=self._tf,
+                texts=np.array(self._texts, dtype=str),
+                maintags=np.array([label[0] for label in self._labels], dtype=str),
+                subtags=np.array([label[1] or "" for label in self._labels], dtype=str),
+                trained_until=np.array(self.trained_until),
+                k=np.array(self.k),
+            )
+            tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "TagPredictor":
+        with np.load(path, allow_pickle=False) as data:
+            predictor = cls(k=int(data["k"]))
+            predictor._vocabulary = {gram: index for index, gram in enumerate(data["vocabulary"].tolist())}
+            predictor._rows = data["rows"]
+            predictor._cols = data["cols"]
+            predictor._tf = data["tf"]
+            predictor._texts = data["texts"].tolist()
+            subtags = [subtag or None for subtag in data["subtags"].tolist()]
+            predictor._labels = list(zip(data["maintags"].tolist(), subtags))
+            predictor.trained_until = str(data["trained_until"])
+        predictor._row_by_text = {text: row for row, text in enumerate(predictor._texts)}
+        predictor._df = np.bincount(predictor._cols, minlength=len(predictor._vocabulary)).astype(np.int32)
+        return predictor
+
+
+@dataclass(slots=True)
+class EvaluationReport:
+    evaluated: int = 0
+    maintag_agree: int = 0
+    pair_agree: int = 0
+    confident: int = 0
+    confident_agree: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+
+
+def evaluate(events: Iterable[dict], *, k: int = 5, min_confidence: float = 0.8) -> EvaluationReport:
+    """Replay history in order, predicting each new LLM-tagged entry before learning it."""
+
+    predictor = TagPredictor(k=k)
+    report = EvaluationReport()
+    for event in events:
+        _, learn = training_update(event)
+        if learn is None or event.get("action"):
+            predictor.apply(event)
+            continue
+        expected = learn[1:]
+        if event.get("tag_source", "llm") == "llm" and len(predictor):
+            started = time.perf_counter()
+            prediction = predictor.predict(event["raw_text"])
+            report.latencies_ms.append((time.perf_counter() - started) * 1000)
+            report.evaluated += 1
+            if prediction is not None:
+                pair_agrees = (prediction.maintag, prediction.subtag) == expected
+                report.maintag_agree += prediction.maintag == expected[0]
+                report.pair_agree += pair_agrees
+                if prediction.confidence >= min_confidence:
+                    report.confident += 1
+                    report.confident_agree += pair_agrees
+        predictor.learn(*learn)
+    return report
+
+
+_PREDICTOR: TagPredictor | None = None
+_PREDICTOR_LOCK = threading.Lock()
+_WARNED_MISSING_NUMPY = False
+
+
+def model_path() -> Path:
+    return Path(get_settings().cache_dir) / MODEL_FILE_NAME
+
+
+def load_or_train(path: Path | None = None, *, k: int = 5) -> TagPredictor:
+    """Load the saved model, learn events logged since, and save it again if anything changed."""
+
+    path = path or model_path()
+    predictor = TagPredictor.load(path) if path.exists() else TagPredictor(k=k)
+    predictor.k = k
+    date_from = date.fromisoformat(predictor.trained_until[:10]) if predictor.trained_until else None
+    if predictor.update_from_events(get_event_log().iter_events(date_from=date_from)):
+        predictor.save(path)
+    return predictor
+
+
+def learn_from_event(event: dict) -> None:
+    """Apply an edit or undo to the shared predictor if it is loaded (otherwise the log replay will)."""
+
+    predictor = _PREDICTOR
+    if predictor is not None:
+        predictor.apply(event)
+
+
+def get_tag_predictor() -> TagPredictor | None:
+    """Shared predictor, or None when TAG_PREDICTOR_ENABLED is off or numpy is missing."""
+
+    global _PREDICTOR, _WARNED_MISSING_NUMPY
+    settings = get_settings()
+    if not settings.tag_predictor_enabled:
+        return None
+    with _PREDICTOR_LOCK:
+        if np is None:
+            if not _WARNED_MISSING_NUMPY:
+                LOGGER.warning("TAG_PREDICTOR_ENABLED is set but numpy is not installed")
+                _WARNED_MISSING_NUMPY = True
+            return None
+        if _PREDICTOR is None:
+            _PREDICTOR = load_or_train(k=settings.tag_predictor_k)
+        return _PREDICTOR
+
+
+__all__ = [
+    "EvaluationReport",
+    "TagPrediction",
+    "TagPredictor",
+    "char_ngrams",
+    "evaluate",
+    "get_tag_predictor",
+    "is_training_event",
+    "learn_from_event",
+    "load_or_train",
+    "model_path",
+    "normalize_text",
+    "training_update",
+]
@@ -6,6 +6,10 @@ from datetime import date
 from pathlib import Path
 from typing import Iterable, List, Tuple
 
+from time_bot.profiling import profiled
+from time_bot.vault_layout import iter_note_files
+from time_bot.vault_scan import iter_markdown_tree, scan_notes
+
 
 @dataclass(slots=True)
 class TaskRecord:
@@ -15,16 +19,31 @@ class TaskRecord:
     file_path: Path
 
 
-def read_tasks(tasks_dir: Path) -> List[TaskRecord]:
-    """Scan the tasks directory and return parsed task metadata."""
+@profiled("read_tasks")
+def read_tasks(
+    tasks_dir: Path,
+    *,
+    partition_format: str = "",
+    created_from: date | None = None,
+    created_to: date | None = None,
+    workers: int = 1,
+) -> List[TaskRecord]:
+    """Scan the tasks directory and return parsed task metadata.
+
+    Tasks are partitioned by creation date, so with a partition format and a
+    creation range only the matching folders (plus flat notes) are read; open
+    tasks of any age still need the full recursive scan. `workers > 1` reads
+    the notes on a thread pool; the result is sorted by path either way.
+    """
 
-    records: List[TaskRecord] = []
     if not tasks_dir.exists():
-        return records
-    for path in sorted(tasks_dir.rglob("*.md")):
-        record = _parse_task_file(path)
-        if record is not None:
-            records.append(record)
+        return []
+    if partition_format and created_from is not None and created_to is not None:
+        paths = iter_note_files(tasks_dir, partition_format, date_from=created_from, date_to=created_to)
+    else:
+        paths = iter_markdown_tree(tasks_dir)
+    records = [record for record in scan_notes(paths, _parse_task_file, workers=workers) if record is not None]
+    records.sort(key=lambda record: record.file_path)
     return records
 
 
@@ -34,7 +53,7 @@ def _parse_task_file(path: Path) -> TaskRecord | None:
     except OSError:
         return None
 
-    frontmatter, body_lines = _extract_frontmatter(content.splitlines())
+    frontmatter, body_lines = extract_frontmatter(content.splitlines())
     title = _extract_title(body_lines) or path.stem
 
     done_value = str(frontmatter.get("done", "")).strip().lower()
@@ -51,7 +70,9 @@ def _parse_task_file(path: Path) -> TaskRecord | None:
     return TaskRecord(title=title, due=due_date, done=done, file_path=path)
 
 
-def _extract_frontmatter(lines: List[str]) -> Tuple[dict, List[str]]:
+def extract_frontmatter(lines: List[str]) -> Tuple[dict, List[str]]:
+    """Split note lines into the parsed YAML-ish frontmatter and the body lines."""
+
     if not lines or lines[0].strip() != "---":
         return {}, lines
 
@@ -107,4 +128,4 @@ def _extract_title(body_lines: List[str]) -> str | None:
     return None
 
 
-__all__ = ["TaskRecord", "read_tasks"]
+__all__ = ["TaskRecord", "extract_frontmatter", "read_tasks"]
@@ -0,0 +1,38 @@
+"""In-process notifications about notes the bot writes to the vault."""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, List
+
+from time_bot.logging_utils import LOGGER
+
+NoteWriteListener = Callable[[str, Path], None]
+
+_LISTENERS: List[NoteWriteListener] = []
+
+
+def add_listener(listener: NoteWriteListener) -> None:
+    if listener not in _LISTENERS:
+        _LISTENERS.append(listener)
+
+
+def remove_listener(listener: NoteWriteListener) -> None:
+    if listener in _LISTENERS:
+        _LISTENERS.remove(listener)
+
+
+def note_written(note_type: str, path: Path | str) -> None:
+    """Tell listeners a note of `note_type` was created, rewritten or removed.
+
+    Called from worker threads as well as the event loop, so listeners must be
+    cheap and thread-safe; their errors are logged and never reach the writer.
+    """
+
+    for listener in list(_LISTENERS):
+        try:
+            listener(note_type, Path(path))
+        except Exception:
+            LOGGER.exception("Vault write listener failed | note_type=%s path=%s", note_type, path)
+
+
+__all__ = ["NoteWriteListener", "add_listener", "note_written", "remove_listener"]
@@ -0,0 +1,278 @@
+"""Date-partitioned note folders (e.g. `2024/01/`) and scans limited to them."""
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Pattern, Sequence, Tuple
+
+# strftime directives that may appear in a partition format, and what they render to.
+_DIRECTIVE_PATTERNS = {
+    "Y": r"\d{4}",
+    "G": r"\d{4}",
+    "y": r"\d{2}",
+    "m": r"\d{2}",
+    "d": r"\d{2}",
+    "V": r"\d{2}",
+    "W": r"\d{2}",
+    "j": r"\d{3}",
+}
+_DIRECTIVE = re.compile(r"%(.)")
+_NAME_DATE_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2})(?: \d{2}-\d{2})?(?: \d+)?$")
+_FRONTMATTER_DATE_PATTERN = re.compile(r"^date:\s*(\d{4}-\d{2}-\d{2})", re.MULTILINE)
+_SKIPPED_DIRS = {".obsidian", ".trash", ".git"}
+
+
+@dataclass(slots=True, frozen=True)
+class NoteMove:
+    source: Path
+    target: Path
+
+
+@lru_cache(maxsize=16)
+def _component_patterns(partition_format: str) -> Tuple[Pattern[str], ...]:
+    """One regex per folder level of the format; raises ValueError for unsupported directives."""
+
+    patterns = []
+    for component in partition_format.strip("/").split("/"):
+        if not component:
+            raise ValueError(f"Empty folder level in partition format {partition_format!r}")
+        parts: List[str] = []
+        position = 0
+        for match in _DIRECTIVE.finditer(component):
+            parts.append(re.escape(component[position : match.start()]))
+            directive = match.group(1)
+            if directive == "%":
+                parts.append("%")
+            elif directive in _DIRECTIVE_PATTERNS:
+                parts.append(_DIRECTIVE_PATTERNS[directive])
+            else:
+                raise ValueError(f"Unsupported directive %{directive} in partition format {partition_format!r}")
+            position = match.end()
+        parts.append(re.escape(component[position:]))
+        patterns.append(re.compile("".join(parts) + "$"))
+    return tuple(patterns)
+
+
+def validate_partition_format(partition_format: str) -> str:
+    if partition_format:
+        _component_patterns(partition_format)
+    return partition_format
+
+
+def partition_dir(base_dir: Path, day: date, partition_format: str = "") -> Path:
+    """Folder for notes of `day`; the base folder itself when partitioning is off."""
+
+    if not partition_format:
+        return Path(base_dir)
+    return Path(base_dir) / day.strftime(partition_format.strip("/"))
+
+
+def partition_dirs_between(base_dir: Path, start: date, end: date, partition_format: str) -> List[Path]:
+    """Distinct partition folders covering `start`..`end`, oldest first."""
+
+    seen: Dict[Path, None] = {}
+    day = start
+    while day <= end:
+        seen.setdefault(partition_dir(base_dir, day, partition_format))
+        day += timedelta(days=1)
+    return list(seen)
+
+
+def iter_partition_dirs(base_dir: Path, partition_format: str) -> Iterator[Path]:
+    """Every existing folder whose path under `base_dir` matches the format, level by level."""
+
+    patterns = _component_patterns(partition_format)
+
+    def _walk(directory: Path, level: int) -> Iterator[Path]:
+        if level == len(patterns):
+            yield directory
+            return
+        try:
+            with os.scandir(directory) as entries:
+                names = sorted(
+                    entry.name
+                    for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and patterns[level].match(entry.name)
+                )
+        except OSError:
+            return
+        for name in names:
+            yield from _walk(directory / name, level + 1)
+
+    yield from _walk(Path(base_dir), 0)
+
+
+def _iter_markdown_in(directory: Path) -> Iterator[Path]:
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".md") and entry.is_file():
+                    yield Path(entry.path)
+    except OSError:
+        return
+
+
+def iter_note_files(
+    base_dir: Path,
+    partition_format: str = "",
+    *,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> Iterator[Path]:
+    """Markdown notes of a note folder: flat files first, then the partitions.
+
+    With both bounds only the partitions covering the range are listed; notes
+    left flat (written before partitioning was enabled) are always included.
+    Callers still filter records by date themselves.
+    """
+
+    base_dir = Path(base_dir)
+    yield from _iter_markdown_in(base_dir)
+    if not partition_format:
+        return
+    if date_from is not None and date_to is not None:
+        directories: Iterable[Path] = partition_dirs_between(base_dir, date_from, date_to, partition_format)
+    else:
+        directories = iter_partition_dirs(base_dir, partition_format)
+    for directory in directories:
+        if directory != base_dir:
+            yield from _iter_markdown_in(directory)
+
+
+def note_date(path: Path) -> date | None:
+    """Date a note belongs to: the stamp in its file name, else the frontmatter `date`."""
+
+    match = _NAME_DATE_PATTERN.search(path.stem)
+    candidates = [match.group(1)] if match else []
+    if not candidates:
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                head = handle.read(2048)
+        except (OSError, UnicodeDecodeError):
+            return None
+        frontmatter_match = _FRONTMATTER_DATE_PATTERN.search(head)
+        if frontmatter_match:
+            candidates.append(frontmatter_match.group(1))
+    for candidate in candidates:
+        try:
+            return date.fromisoformat(candidate)
+        except ValueError:
+            continue
+    return None
+
+
+def plan_partition_moves(
+    base_dir: Path,
+    partition_format: str,
+    *,
+    include: Callable[[Path], bool] | None = None,
+) -> Tuple[List[NoteMove], List[Path]]:
+    """Moves for the flat notes of `base_dir`; also returns notes that cannot be moved.
+
+    Notes rejected by `include` are left alone. A note is skipped when it has
+    no date or a file of the same name already exists in its partition.
+    """
+
+    validate_partition_format(partition_format)
+    moves: List[NoteMove] = []
+    skipped: List[Path] = []
+    for path in sorted(_iter_markdown_in(Path(base_dir))):
+        if include is not None and not include(path):
+            continue
+        day = note_date(path)
+        if day is None:
+            skipped.append(path)
+            continue
+        target = partition_dir(base_dir, day, partition_format) / path.name
+        if target.exists():
+            skipped.append(path)
+            continue
+        moves.append(NoteMove(source=path, target=target))
+    return moves, skipped
+
+
+def apply_moves(moves: Sequence[NoteMove]) -> None:
+    for move in moves:
+        move.target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(move.source, move.target)
+
+
+def _link_variants(path: Path, vault_root: Path) -> List[str] | None:
+    try:
+        relative = path.relative_to(vault_root).as_posix()
+    except ValueError:
+        return None
+    return [relative, relative[: -len(".md")]]
+
+
+def _encode(link: str) -> str:
+    # Obsidian only percent-encodes spaces in Markdown links.
+    return link.replace(" ", "%20")
+
+
+def rewrite_links(vault_root: Path, moves: Sequence[NoteMove]) -> int:
+    """Point vault-relative links at the moved notes; return the number of notes changed.
+
+    Obsidian resolves bare `[[Name]]` links by file name, and names are kept,
+    so only wikilinks spelling out a folder need rewriting (`[[dir/Name]]`,
+    `[[dir/Name|alias]]`, `[[dir/Name#heading]]`), plus Markdown links
+    `[text](Name.md)` with spaces either raw or `%20`-encoded.
+    """
+
+    vault_root = Path(vault_root)
+    replacements: List[Tuple[str, str]] = []
+    for move in moves:
+        old_variants = _link_variants(move.source, vault_root)
+        new_variants = _link_variants(move.target, vault_root)
+        if old_variants is None or new_variants is None:
+            continue
+        for old, new in zip(old_variants, new_variants):
+            # A bare wikilink to a root note is a name link and keeps resolving.
+            if "/" in old:
+                for closer in ("]]", "|", "#"):
+                    replacements.append((f"[[{old}{closer}", f"[[{new}{closer}"))
+            for closer in (")", "#"):
+                replacements.append((f"]({old}{closer}", f"]({new}{closer}"))
+                replacements.append((f"]({_encode(old)}{closer}", f"]({_encode(new)}{closer}"))
+    if not replacements:
+        return 0
+
+    changed = 0
+    for directory, dir_names, file_names in os.walk(vault_root):
+        dir_names[:] = [name for name in dir_names if name not in _SKIPPED_DIRS]
+        for file_name in file_names:
+            if not file_name.endswith(".md"):
+                continue
+            path = Path(directory) / file_name
+            try:
+                content = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            if "[[" not in content and "](" not in content:
+                continue
+            updated = content
+            for old, new in replacements:
+                if old in updated:
+                    updated = updated.replace(old, new)
+            if updated != content:
+                path.write_text(updated, encoding="utf-8")
+                changed += 1
+    return changed
+
+
+__all__ = [
+    "NoteMove",
+    "apply_moves",
+    "iter_note_files",
+    "iter_partition_dirs",
+    "note_date",
+    "partition_dir",
+    "partition_dirs_between",
+    "plan_partition_moves",
+    "rewrite_links",
+    "validate_partition_format",
+]
@@ -0,0 +1,227 @@
+"""Batched git/rsync/command sync after the bot writes notes.
+
+Note writes are collected from `vault_events` and, once no new write arrived
+for `window_seconds` (or `max_batch` paths piled up), handed to one sync
+action in a background thread. A failed sync keeps its paths for the next
+attempt and waits with exponential backoff.
+"""
+from __future__ import annotations
+
+import os
+import shlex
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence
+
+from time_bot import vault_events
+from time_bot.config import get_settings
+from time_bot.logging_utils import LOGGER
+from time_bot.metrics import METRICS
+
+SyncAction = Callable[[Sequence[Path]], None]
+
+MAX_BACKOFF_SECONDS = 30 * 60
+PATHS_ENV_VAR = "TIME_BOT_SYNC_PATHS"
+
+
+def _run(args: Sequence[str], *, cwd: Path, timeout: float, env: dict | None = None) -> str:
+    completed = subprocess.run(
+        list(args), cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout, check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{args[0]} exited with {completed.returncode}: {completed.stderr.strip()}")
+    return completed.stdout
+
+
+def git_action(repo_dir: Path, *, push: bool = False, timeout: float = 120.0) -> SyncAction:
+    """Commit exactly the written paths (new, changed or deleted) and optionally push."""
+
+    repo_dir = Path(repo_dir)
+
+    def _sync(paths: Sequence[Path]) -> None:
+        inside = []
+        for path in paths:
+            try:
+                inside.append(str(Path(path).resolve().relative_to(repo_dir.resolve())))
+            except ValueError:
+                LOGGER.warning("Vault sync skips a path outside the git repo: %s", path)
+        existing = [path for path in inside if (repo_dir / path).exists()]
+        missing = [path for path in inside if not (repo_dir / path).exists()]
+        # Note names contain spaces, brackets and Cyrillic: no pathspec magic, NUL-separated output.
+        git = ["git", "--literal-pathspecs"]
+        if existing:
+            _run([*git, "add", "--", *existing], cwd=repo_dir, timeout=timeout)
+        if missing:
+            _run([*git, "rm", "-q", "--cached", "--ignore-unmatch", "--", *missing], cwd=repo_dir, timeout=timeout)
+        staged = _run([*git, "diff", "--cached", "--name-only", "-z", "--", *inside], cwd=repo_dir, timeout=timeout)
+        changed = [name for name in staged.split("\0") if name]
+        if not changed:
+            return
+        message = f"time_bot: {len(changed)} note{'s' if len(changed) != 1 else ''}"
+        _run([*git, "commit", "-q", "-m", message, "--", *changed], cwd=repo_dir, timeout=timeout)
+        if push:
+            _run(["git", "push", "-q"], cwd=repo_dir, timeout=timeout)
+
+    return _sync
+
+
+def rsync_action(source_dir: Path, target: str, *, timeout: float = 120.0) -> SyncAction:
+    """Mirror the whole vault; rsync itself only transfers what changed."""
+
+    def _sync(paths: Sequence[Path]) -> None:
+        _run(["rsync", "-a", f"{Path(source_dir)}/", target], cwd=Path(source_dir), timeout=timeout)
+
+    return _sync
+
+
+def command_action(command: str, cwd: Path, *, timeout: float = 120.0) -> SyncAction:
+    """Run a user command in the vault; written paths are passed newline-separated in TIME_BOT_SYNC_PATHS."""
+
+    args = shlex.split(command)
+
+    def _sync(paths: Sequence[Path]) -> None:
+        env = {**os.environ, PATHS_ENV_VAR: "\n".join(str(path) for path in paths)}
+        _run(args, cwd=Path(cwd), timeout=timeout, env=env)
+
+    return _sync
+
+
+class VaultSync:
+    """Coalesce note writes and run `action` once per quiet window in a daemon thread."""
+
+    def __init__(
+        self,
+        action: SyncAction,
+        *,
+        window_seconds: float = 10.0,
+        max_batch: int = 100,
+        backoff_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.action = action
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.backoff_seconds = backoff_seconds
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._pending: dict[Path, None] = {}
+        self._last_write = 0.0
+        self._failures = 0
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def note_written(self, note_type: str, path: Path) -> None:
+        """`vault_events` listener: only records the path, the thread does the work."""
+
+        with self._condition:
+            self._pending[Path(path)] = None
+            self._last_write = self._clock()
+            METRICS.set_gauge("vault_sync.pending", len(self._pending))
+            self._condition.notify()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping = False
+        vault_events.add_listener(self.note_written)
+        self._thread = threading.Thread(target=self._loop, name="vault-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop listening and run a final sync for anything still pending."""
+
+        vault_events.remove_listener(self.note_written)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _next_batch(self) -> List[Path] | None:
+        """Block until a batch is due; None once stopped with nothing left."""
+
+        with self._condition:
+            while True:
+                if self._pending:
+                    if self._stopping or len(self._pending) >= self.max_batch:
+                        break
+                    quiet_for = self._clock() - self._last_write
+                    if quiet_for >= self.window_seconds:
+                        break
+                    self._condition.wait(self.window_seconds - quiet_for)
+                elif self._stopping:
+                    return None
+                else:
+                    self._condition.wait()
+            batch = list(self._pending)
+            self._pending.clear()
+            METRICS.set_gauge("vault_sync.pending", 0)
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if self.sync(batch):
+                continue
+            if self._stopping:
+                LOGGER.warning("Vault sync stopped with %s paths unsynced", len(self._pending))
+                return
+            delay = min(self.backoff_seconds * 2 ** (self._failures - 1), MAX_BACKOFF_SECONDS)
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopping, timeout=delay)
+
+    def sync(self, batch: List[Path]) -> bool:
+        started = time.perf_counter()
+        try:
+            self.action(batch)
+        except Exception as exc:
+            self._failures += 1
+            METRICS.increment("vault_sync.failures")
+            METRICS.set_gauge("vault_sync.consecutive_failures", self._failures)
+            LOGGER.warning("Vault sync of %s paths failed (attempt %s): %s", len(batch), self._failures, exc)
+            with self._condition:
+                for path in batch:
+                    self._pending.setdefault(path, None)
+                METRICS.set_gauge("vault_sync.pending", len(self._pending))
+            return False
+        self._failures = 0
+        METRICS.increment("vault_sync.runs")
+        METRICS.observe("vault_sync.batch_size", len(batch))
+        METRICS.observe("vault_sync.duration_ms", (time.perf_counter() - started) * 1000)
+        METRICS.set_gauge("vault_sync.consecutive_failures", 0)
+        METRICS.set_gauge("vault_sync.last_success", time.time())
+        return True
+
+
+def build_vault_sync() -> VaultSync | None:
+    """VaultSync for VAULT_SYNC_MODE, or None when it is off."""
+
+    settings = get_settings()
+    vault_dir = Path(settings.obsidian_vault_dir)
+    timeout = settings.vault_sync_timeout_seconds
+    if settings.vault_sync_mode == "off":
+        return None
+    if settings.vault_sync_mode == "git":
+        action = git_action(vault_dir, push=settings.vault_sync_git_push, timeout=timeout)
+    elif settings.vault_sync_mode == "rsync":
+        if not settings.vault_sync_target:
+            raise ValueError("VAULT_SYNC_MODE=rsync needs VAULT_SYNC_TARGET")
+        action = rsync_action(vault_dir, settings.vault_sync_target, timeout=timeout)
+    else:
+        if not settings.vault_sync_command:
+            raise ValueError("VAULT_SYNC_MODE=command needs VAULT_SYNC_COMMAND")
+        action = command_action(settings.vault_sync_command, vault_dir, timeout=timeout)
+    return VaultSync(
+        action,
+        window_seconds=settings.vault_sync_window_seconds,
+        max_batch=settings.vault_sync_max_batch,
+        backoff_seconds=settings.vault_sync_backoff_seconds,
+    )
+
+
+__all__ = ["SyncAction", "VaultSync", "build_vault_sync", "command_action", "git_action", "rsync_action"]
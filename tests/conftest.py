@@ -0,0 +1,52 @@
+import pytest
+from pydantic import ValidationError
+
+from time_bot import config, event_log, journal, profiling, reprocess_queue, tag_predictor
+from time_bot.bot import dedupe
+
+
+class FakeClock:
+    """Stands in for `time.monotonic`/`time.time`; tests move `now` by hand."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def isolated_state_dirs(tmp_path, monkeypatch):
+    """Keep the journal, queue, event log and other stores of every test under its tmp_path.
+
+    Without this, code paths using the process-wide stores write to the
+    default `cache/` and `logs/` directories of the working tree.
+    """
+
+    try:
+        settings = config.get_settings()
+    except ValidationError:  # no environment configured; tests needing settings fail on their own
+        yield
+        return
+    overrides = {"cache_dir": tmp_path / "cache", "log_dir": tmp_path / "logs"}
+    monkeypatch.setattr(config, "_SETTINGS", settings.model_copy(update=overrides))
+    for module, name in (
+        (journal, "_JOURNAL"),
+        (reprocess_queue, "_QUEUE"),
+        (event_log, "_EVENT_LOG"),
+        (tag_predictor, "_PREDICTOR"),
+        (dedupe, "_STORE"),
+        (profiling, "_PROFILER"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    yield
+    if event_log._EVENT_LOG is not None:
+        event_log._EVENT_LOG.wait_for_compaction()
+    for store in (journal._JOURNAL, reprocess_queue._QUEUE, dedupe._STORE):
+        if store is not None:
+            store.close()
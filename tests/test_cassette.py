@@ -0,0 +1,74 @@
+import json
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from time_bot import sgr_client
+from time_bot.cassette import Cassette, CassetteMissError, set_cassette
+from time_bot.pipeline import process_message_text
+
+SAMPLES_PATH = Path("tests/data/time_messages_samples.jsonl")
+TODAY = date(2025, 7, 30)
+
+
+def _load_samples():
+    return [json.loads(line) for line in SAMPLES_PATH.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+class _FakeCompletions:
+    def __init__(self, samples):
+        self.expected = {sample["input"]: sample["expected"] for sample in samples}
+        self.calls = 0
+
+    async def create(self, *, model, messages, temperature, response_format):
+        self.calls += 1
+        schema_name = response_format["json_schema"]["name"]
+        text = messages[-1]["content"].split("<<<\n", 1)[1].split("\n>>>", 1)[0]
+        if schema_name == "message_classification":
+            payload = {"intent": "time_log", "raw_text": text}
+        else:
+            payload = {"title": text[:20], "raw_text": text, "date": TODAY.isoformat(), **self.expected[text]}
+        message = SimpleNamespace(content=json.dumps(payload, ensure_ascii=False))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture(autouse=True)
+def _reset_cassette():
+    yield
+    set_cassette(None)
+
+
+@pytest.mark.anyio
+async def test_recorded_samples_replay_through_pipeline_offline(tmp_path, monkeypatch):
+    samples = _load_samples()
+    cassette_path = tmp_path / "cassette.jsonl"
+    completions = _FakeCompletions(samples)
+    monkeypatch.setattr(sgr_client, "_CLIENT", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    set_cassette(Cassette(cassette_path, "record"))
+    for sample in samples:
+        await process_message_text(sample["input"], today=TODAY, output_dir=tmp_path / "recorded")
+    assert completions.calls == 2 * len(samples)
+
+    def _no_network():
+        raise AssertionError("Replay must not touch the client")
+
+    monkeypatch.setattr(sgr_client, "_get_client", _no_network)
+    replay = Cassette(cassette_path, "replay")
+    assert len(replay) == 2 * len(samples)
+    set_cassette(replay)
+    for sample in samples:
+        result = await process_message_text(sample["input"], today=TODAY, output_dir=tmp_path / "replayed")
+        for field, expected_value in sample["expected"].items():
+            assert getattr(result.time_entry, field) == expected_value
+
+
+@pytest.mark.anyio
+async def test_replay_miss_raises(tmp_path):
+    cassette_path = tmp_path / "cassette.jsonl"
+    Cassette(cassette_path, "record").record([{"role": "user", "content": "a"}], "time_entry", "m", "{}")
+    replay = Cassette(cassette_path, "replay")
+    with pytest.raises(CassetteMissError):
+        await replay.replay([{"role": "user", "content": "b"}], "time_entry", "m")
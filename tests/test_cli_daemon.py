@@ -0,0 +1,65 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from time_bot import cli_daemon, pipeline
+
+
+async def _start(monkeypatch, socket_path: Path, process):
+    monkeypatch.setattr(cli_daemon, "_warm_up", lambda: None)
+    monkeypatch.setattr(pipeline, "process_message_text", process)
+    server = asyncio.create_task(cli_daemon.serve(socket_path))
+    for _ in range(200):
+        if socket_path.exists():
+            return server
+        await asyncio.sleep(0.01)
+    raise AssertionError("daemon did not start")
+
+
+@pytest.mark.anyio
+async def test_send_round_trip_and_socket_cleanup(monkeypatch, tmp_path):
+    calls = []
+
+    async def _process(text, *, output_dir=None):
+        calls.append((text, output_dir))
+        note = SimpleNamespace(note_path=Path("/vault/Обед.md"), markdown="# Обед")
+        return SimpleNamespace(markdown=note.markdown, results=[note])
+
+    socket_path = tmp_path / "d.sock"
+    server = await _start(monkeypatch, socket_path, _process)
+    assert socket_path.stat().st_mode & 0o777 == 0o600
+
+    lines = await asyncio.to_thread(cli_daemon.send, "30 минут обед", output_dir=tmp_path, socket_path=socket_path)
+    assert lines == ["Saved note to /vault/Обед.md"]
+    assert calls == [("30 минут обед", tmp_path)]
+    dry = await asyncio.to_thread(cli_daemon.send, "30 минут обед", dry_run=True, socket_path=socket_path)
+    assert dry == ["# Обед"]
+    pong = await asyncio.to_thread(cli_daemon.request, {"op": "ping"}, socket_path)
+    assert pong["ok"] and "elapsed_ms" in pong
+
+    server.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await server
+    assert not socket_path.exists()
+
+
+@pytest.mark.anyio
+async def test_pipeline_errors_reach_the_client_and_daemon_keeps_serving(monkeypatch, tmp_path):
+    async def _process(text, *, output_dir=None):
+        raise ValueError("bad message")
+
+    socket_path = tmp_path / "d.sock"
+    server = await _start(monkeypatch, socket_path, _process)
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="ValueError: bad message"):
+            await asyncio.to_thread(cli_daemon.send, "???", socket_path=socket_path)
+    server.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await server
+
+
+def test_client_reports_missing_daemon(tmp_path):
+    with pytest.raises(cli_daemon.DaemonUnavailableError):
+        cli_daemon.send("text", socket_path=tmp_path / "missing.sock")
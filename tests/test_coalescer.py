@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from time_bot.bot.coalescer import MessageCoalescer
+from time_bot.models import DiaryEntry, MessageClassification
+from time_bot.pipeline import PipelineResult
+
+
+class _FakeMessage:
+    def __init__(self, chat_id: int, text: str):
+        self.chat = SimpleNamespace(id=chat_id)
+        self.text = text
+        self.answers: list[str] = []
+        self.replies: list[str] = []
+
+    async def answer(self, text, **kwargs):
+        self.answers.append(text)
+
+    async def reply(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def _result(text: str) -> PipelineResult:
+    return PipelineResult(
+        note_path=Path(f"{text}.md"),
+        markdown=text,
+        file_name=f"{text}.md",
+        classification=MessageClassification(intent="journal", raw_text=text),
+        note_type="diary",
+        diary_entry=DiaryEntry(title=text, body=text, created_at=datetime(2025, 7, 30, 10, 0)),
+    )
+
+
+@pytest.mark.anyio
+async def test_burst_in_one_chat_becomes_one_batch(monkeypatch):
+    monkeypatch.setattr("time_bot.bot.utils.log_event", lambda data: None)
+    monkeypatch.setattr("time_bot.bot.coalescer.acknowledge_result", lambda result: None)
+    batches: list[list[str]] = []
+    singles: list[str] = []
+
+    async def _batch(texts, chat_id=None):
+        batches.append(list(texts))
+        return [_result(text) if text != "bad" else ValueError("boom") for text in texts]
+
+    async def _single(text, chat_id=None):
+        singles.append(text)
+        return _result(text)
+
+    coalescer = MessageCoalescer(0.05, process_batch=_batch, process_single=_single)
+    first, second, bad = _FakeMessage(1, "a"), _FakeMessage(1, "b"), _FakeMessage(1, "bad")
+    lone = _FakeMessage(2, "c")
+
+    await asyncio.gather(
+        coalescer.submit(first, "a"),
+        coalescer.submit(second, "b"),
+        coalescer.submit(bad, "bad"),
+        coalescer.submit(lone, "c"),
+    )
+
+    assert batches == [["a", "b", "bad"]]
+    assert singles == ["c"]
+    assert "a" in first.replies[0] and "b" in second.replies[0]
+    assert bad.replies == ["Произошла ошибка при обработке сообщения."]
+    assert lone.answers and not lone.replies
+
+
+@pytest.mark.anyio
+async def test_max_batch_flushes_without_waiting(monkeypatch):
+    monkeypatch.setattr("time_bot.bot.coalescer.acknowledge_result", lambda result: None)
+    calls: list[list[str]] = []
+
+    async def _batch(texts, chat_id=None):
+        calls.append(list(texts))
+        return [_result(text) for text in texts]
+
+    coalescer = MessageCoalescer(60, max_batch=2, process_batch=_batch)
+    replies = await asyncio.wait_for(
+        asyncio.gather(coalescer.submit(_FakeMessage(1, "x"), "x"), coalescer.submit(_FakeMessage(1, "y"), "y")),
+        timeout=1,
+    )
+    assert calls == [["x", "y"]]
+    assert len(replies) == 2
+
+
+@pytest.mark.anyio
+async def test_short_batch_answer_fails_the_uncovered_messages(monkeypatch):
+    monkeypatch.setattr("time_bot.bot.coalescer.acknowledge_result", lambda result: None)
+
+    async def _batch(texts, chat_id=None):
+        return [_result(texts[0])]
+
+    coalescer = MessageCoalescer(60, max_batch=2, process_batch=_batch)
+    first, second = await asyncio.wait_for(
+        asyncio.gather(
+            coalescer.submit(_FakeMessage(1, "x"), "x"),
+            coalescer.submit(_FakeMessage(1, "y"), "y"),
+            return_exceptions=True,
+        ),
+        timeout=1,
+    )
+    assert isinstance(first, str)
+    assert isinstance(second, RuntimeError)
+    assert not coalescer._flushes
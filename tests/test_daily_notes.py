@@ -0,0 +1,165 @@
+import argparse
+import subprocess
+import sys
+from datetime import date
+
+import pytest
+
+from time_bot import cli
+from time_bot import journal as journal_module
+from time_bot.config import get_settings
+from time_bot.daily_notes import get_block, is_daily_note, iter_blocks, migrate_to_daily
+from time_bot.export import export_time_entries
+from time_bot.journal import NoteJournal
+from time_bot.models import MessageClassification, TimeEntry
+from time_bot.pipeline import process_message_text, rewrite_journaled_note
+from time_bot.search_index import NoteRoot, SearchIndex
+from time_bot.stats import get_daily_stats, iter_time_entries
+
+DAY = date(2024, 1, 1)
+
+
+@pytest.fixture()
+def daily_mode(monkeypatch):
+    settings = get_settings().model_copy(update={"note_storage_mode": "daily"})
+    monkeypatch.setattr("time_bot.pipeline.get_settings", lambda: settings)
+
+
+@pytest.fixture()
+def note_journal(tmp_path, monkeypatch):
+    journal = NoteJournal(tmp_path / "journal.sqlite3")
+    monkeypatch.setattr(journal_module, "_JOURNAL", journal)
+    yield journal
+    journal.close()
+
+
+def _patch_llm(monkeypatch, title: str = "Обед", minutes: int = 30):
+    async def _fake_classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _fake_parse(message_text: str, today: date):
+        return TimeEntry(title=title, raw_text=message_text, minutes=minutes, date=today, maintag="rt", subtag="rest")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fake_parse)
+
+
+def _write_per_entry_note(directory, name: str, minutes: int, maintag: str = "w1") -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_text(
+        "---\ntags:\n  - time_system\n"
+        f"time: {minutes}\ndate: {DAY.isoformat()}\nmaintag: {maintag}\n---\n\n"
+        "Код\n\nИсходный текст:\n> код\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.anyio
+async def test_daily_mode_appends_blocks_to_one_note(tmp_path, monkeypatch, daily_mode):
+    _patch_llm(monkeypatch)
+    first = await process_message_text("30 минут обед", today=DAY, output_dir=tmp_path)
+    _patch_llm(monkeypatch, title="Прогулка", minutes=45)
+    second = await process_message_text("45 минут прогулка", today=DAY, output_dir=tmp_path)
+
+    assert first.note_path == second.note_path == tmp_path / "Time Log 2024-01-01.md"
+    assert is_daily_note(first.note_path)
+    assert [path.name for path in tmp_path.glob("*.md")] == ["Time Log 2024-01-01.md"]
+    blocks = list(iter_blocks(first.note_path))
+    assert [(block.heading, block.fields["time"]) for block in blocks] == [("Обед", "30"), ("Прогулка", "45")]
+
+    _write_per_entry_note(tmp_path, "Код 2024-01-01 09-00.md", 60)
+    assert get_daily_stats(tmp_path, DAY).minutes_by_maintag == {"rt": 75, "w1": 60}
+    titles = sorted(record.title for record in iter_time_entries(tmp_path, with_titles=True))
+    assert titles == ["Код", "Обед", "Прогулка"]
+
+
+@pytest.mark.anyio
+async def test_daily_mode_edit_and_undo_touch_only_their_block(tmp_path, monkeypatch, daily_mode, note_journal):
+    _patch_llm(monkeypatch)
+    await process_message_text("30 минут обед", today=DAY, output_dir=tmp_path, chat_id=1)
+    _patch_llm(monkeypatch, title="Прогулка", minutes=45)
+    result = await process_message_text("45 минут прогулка", today=DAY, output_dir=tmp_path, chat_id=1)
+    entry = note_journal.last(1)[0]
+    original_block = get_block(result.note_path, entry.note_id)
+
+    _patch_llm(monkeypatch, title="Прогулка", minutes=50)
+    await rewrite_journaled_note(entry, "50 минут прогулка", today=DAY)
+    assert [block.fields["time"] for block in iter_blocks(result.note_path)] == ["30", "50"]
+
+    note_journal.undo_last(1)
+    assert get_block(result.note_path, entry.note_id) == original_block
+    note_journal.undo_last(1)
+    assert [block.heading for block in iter_blocks(result.note_path)] == ["Обед"]
+    assert note_journal.reconcile() == [note_journal.last(1)[0]]
+
+
+def test_migrate_folds_per_entry_notes(tmp_path):
+    _write_per_entry_note(tmp_path, "Код 2024-01-01 11-00.md", 30)
+    _write_per_entry_note(tmp_path, "Код 2024-01-01 09-00.md", 60, maintag="w2")
+    before = get_daily_stats(tmp_path, DAY)
+
+    plan = migrate_to_daily(tmp_path, "time", dry_run=True)
+    assert list(plan) == [tmp_path / "Time Log 2024-01-01.md"]
+    assert len(list(tmp_path.glob("*.md"))) == 2
+
+    migrate_to_daily(tmp_path, "time")
+    assert [path.name for path in tmp_path.glob("*.md")] == ["Time Log 2024-01-01.md"]
+    assert get_daily_stats(tmp_path, DAY) == before
+    assert [block.fields["time"] for block in iter_blocks(tmp_path / "Time Log 2024-01-01.md")] == ["60", "30"]
+
+    index = SearchIndex(tmp_path / "index.sqlite3", [NoteRoot(tmp_path, "time_log")])
+    hits = index.search("код")
+    assert [(hit.title, hit.note_type) for hit in hits] == [("Time Log 2024-01-01", "time_log")]
+
+    output = tmp_path / "entries.csv"
+    assert export_time_entries(tmp_path, "csv", output=output) == 2
+
+
+def test_interrupted_migration_can_be_repeated(tmp_path):
+    _write_per_entry_note(tmp_path, "Код 2024-01-01 09-00.md", 60)
+    _write_per_entry_note(tmp_path, "Код 2024-01-01 11-00.md", 30)
+    leftover = (tmp_path / "Код 2024-01-01 11-00.md").read_text(encoding="utf-8")
+    migrate_to_daily(tmp_path, "time")
+    # As if the run died after writing the daily note but before deleting this original.
+    (tmp_path / "Код 2024-01-01 11-00.md").write_text(leftover, encoding="utf-8")
+
+    migrate_to_daily(tmp_path, "time")
+    assert [path.name for path in tmp_path.glob("*.md")] == ["Time Log 2024-01-01.md"]
+    assert [block.fields["time"] for block in iter_blocks(tmp_path / "Time Log 2024-01-01.md")] == ["60", "30"]
+
+
+@pytest.mark.anyio
+async def test_migrated_notes_keep_their_journal_entries(tmp_path, monkeypatch, note_journal):
+    _patch_llm(monkeypatch)
+    result = await process_message_text("30 минут обед", today=DAY, output_dir=tmp_path, chat_id=1)
+    [before] = note_journal.last(1)
+
+    cli._cmd_migrate_daily(argparse.Namespace(vault_dir=tmp_path, diary_dir=tmp_path / "diary", dry_run=False))
+    assert not result.note_path.exists()
+    [entry] = note_journal.last(1)
+    assert entry.path == result.note_path.with_name("Time Log 2024-01-01.md")
+    assert get_block(entry.path, before.note_id) is not None
+
+    assert note_journal.undo_last(1).status == "undone"
+    assert list(iter_blocks(entry.path)) == []
+
+
+_APPEND_MANY = """
+import sys
+from pathlib import Path
+from time_bot.daily_notes import append_block, format_block
+
+path, worker = Path(sys.argv[1]), int(sys.argv[2])
+for index in range(25):
+    append_block(path, format_block(f"{worker:02x}{index:04x}", "time-entry", "Entry", {"time": 5}, ""))
+"""
+
+
+def test_appends_from_several_processes_keep_every_block(tmp_path):
+    path = tmp_path / "Time Log 2024-01-01.md"
+    workers = [
+        subprocess.Popen([sys.executable, "-c", _APPEND_MANY, str(path), str(worker)]) for worker in range(4)
+    ]
+    assert [process.wait(timeout=60) for process in workers] == [0] * 4
+
+    assert len(list(iter_blocks(path))) == 100
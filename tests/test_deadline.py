@@ -0,0 +1,87 @@
+import asyncio
+import time
+from datetime import date
+
+import pytest
+
+from time_bot.config import get_settings
+from time_bot.deadline import Deadline, DeadlineExceededError, deadline_scope, run_stage
+from time_bot.models import MessageClassification, TimeEntry
+from time_bot.pipeline import process_message_text
+from time_bot.reprocess_queue import ReprocessQueue
+
+
+def test_stage_budget_respects_share_and_reserve(clock):
+    deadline = Deadline.after(10, clock=clock)
+
+    assert deadline.for_stage("classify", share=0.4).budget() == pytest.approx(4)
+    assert deadline.for_stage("parse", reserve=2).budget() == pytest.approx(8)
+
+    clock.now = 9
+    parse = deadline.for_stage("parse", reserve=2)
+    assert parse.budget() == 0
+    with pytest.raises(DeadlineExceededError) as info:
+        parse.check()
+    assert info.value.stage == "parse"
+
+
+@pytest.mark.anyio
+async def test_run_stage_cancels_slow_work_and_records_timing():
+    with deadline_scope(0.05) as deadline:
+        with pytest.raises(DeadlineExceededError):
+            await run_stage("classify", asyncio.sleep(5))
+    assert "classify" in deadline.timings_ms
+
+
+@pytest.fixture()
+def queue(tmp_path, monkeypatch):
+    reprocess_queue = ReprocessQueue(tmp_path / "queue.sqlite3")
+    monkeypatch.setattr("time_bot.pipeline.get_reprocess_queue", lambda: reprocess_queue)
+    yield reprocess_queue
+    reprocess_queue.close()
+
+
+def _use_settings(monkeypatch, **overrides):
+    settings = get_settings().model_copy(update=overrides)
+    monkeypatch.setattr("time_bot.pipeline.get_settings", lambda: settings)
+
+
+@pytest.mark.anyio
+async def test_slow_classifier_falls_back_to_inbox(tmp_path, monkeypatch, queue):
+    _use_settings(monkeypatch, message_deadline_seconds=0.2, deadline_write_reserve_seconds=0.0)
+
+    async def _slow_classify(message_text: str):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _slow_classify)
+
+    started = time.monotonic()
+    result = await process_message_text("30 минут чтения", output_dir=tmp_path, chat_id=None)
+    assert time.monotonic() - started < 1
+
+    assert result.note_type == "unparsed"
+    assert result.note_path.parent == tmp_path / "inbox"
+    assert "30 минут чтения" in result.note_path.read_text(encoding="utf-8")
+    assert "classify" in result.stage_timings
+    [item] = queue.pending()
+    assert item.raw_text == "30 минут чтения"
+    assert item.inbox_path == result.note_path
+
+
+@pytest.mark.anyio
+async def test_fast_message_records_stage_timings(tmp_path, monkeypatch, queue):
+    _use_settings(monkeypatch, message_deadline_seconds=5.0)
+
+    async def _fake_classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _fake_parse(message_text: str, today: date):
+        return TimeEntry(title="Чтение", raw_text=message_text, minutes=30, date=today, maintag="w1")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fake_parse)
+
+    result = await process_message_text("30 минут чтения", today=date(2024, 1, 1), output_dir=tmp_path)
+    assert result.note_type == "time_log"
+    assert set(result.stage_timings) == {"classify", "parse"}
+    assert queue.pending() == []
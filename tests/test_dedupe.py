@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+
+from time_bot.bot.dedupe import DedupeMiddleware, DedupeStore
+from time_bot.bot.utils import mark_update_processed
+
+
+def _message(message_id: int = 7):
+    return SimpleNamespace(chat=SimpleNamespace(id=1), message_id=message_id)
+
+
+def test_claim_survives_restart_and_expires(tmp_path, clock):
+    path = tmp_path / "dedupe.sqlite3"
+    store = DedupeStore(path, ttl_seconds=60, clock=clock)
+    assert store.claim("1:7").status == "claimed"
+    assert store.claim("1:7").status == "in_flight"
+    store.complete("1:7", "Запись создана")
+    store.close()
+
+    restarted = DedupeStore(path, ttl_seconds=60, clock=clock)
+    record = restarted.claim("1:7")
+    assert (record.status, record.reply) == ("done", "Запись создана")
+
+    clock.now += 61
+    assert restarted.claim("1:7").status == "claimed"
+
+
+def test_stale_pending_claim_is_taken_over(tmp_path, clock):
+    store = DedupeStore(tmp_path / "dedupe.sqlite3", stale_seconds=30, clock=clock)
+    assert store.claim("1:8").status == "claimed"
+    clock.now += 31
+    assert store.claim("1:8").status == "claimed"
+
+
+@pytest.mark.anyio
+async def test_middleware_runs_handler_once_and_replays_reply(tmp_path):
+    replayed: list[str] = []
+
+    async def _replay(message, reply):
+        replayed.append(reply)
+
+    middleware = DedupeMiddleware(DedupeStore(tmp_path / "dedupe.sqlite3"), replay=_replay)
+    calls = []
+
+    async def _handler(event, data):
+        calls.append(event.message_id)
+        return "Запись создана"
+
+    assert await middleware(_handler, _message(), {}) == "Запись создана"
+    assert await middleware(_handler, _message(), {}) is None
+    assert calls == [7]
+    assert replayed == ["Запись создана"]
+
+
+@pytest.mark.anyio
+async def test_failed_handler_releases_claim(tmp_path):
+    middleware = DedupeMiddleware(DedupeStore(tmp_path / "dedupe.sqlite3"))
+
+    async def _failing(event, data):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await middleware(_failing, _message(9), {})
+    assert middleware.store.claim("1:9").status == "claimed"
+
+
+@pytest.mark.anyio
+async def test_failed_reply_after_a_written_note_keeps_the_key_done(tmp_path):
+    middleware = DedupeMiddleware(DedupeStore(tmp_path / "dedupe.sqlite3"), replay=None)
+
+    async def _reply_fails(event, data):
+        mark_update_processed()
+        raise RuntimeError("Telegram is down")
+
+    with pytest.raises(RuntimeError):
+        await middleware(_reply_fails, _message(10), {})
+    assert middleware.store.claim("1:10").status == "done"
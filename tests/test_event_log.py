@@ -0,0 +1,106 @@
+import gzip
+import json
+import threading
+from datetime import date
+
+from time_bot.event_log import EventLog
+from time_bot.log_stats import compute_log_stats, format_log_stats
+
+
+def _event(day: str, status: str = "success", **fields):
+    return {"timestamp": f"{day}T12:00:00+00:00", "status": status, "raw_text": f"{day} {status}", **fields}
+
+
+def _fill(event_log: EventLog) -> None:
+    event_log.append(_event("2024-01-30", kind="time_log", minutes=30, maintag="w1", elapsed_ms=120))
+    event_log.append(_event("2024-01-31", "error", elapsed_ms=900))
+    event_log.append(_event("2024-01-31", kind="task"))
+    event_log.append(_event("2024-02-01", kind="time_log", minutes=90, maintag="w1", elapsed_ms=300))
+
+
+def test_segments_index_days_and_compress_closed_months(tmp_path):
+    event_log = EventLog(tmp_path / "events")
+    _fill(event_log)
+    event_log.wait_for_compaction()
+
+    assert event_log.months() == ["2024-01", "2024-02"]
+    assert not (tmp_path / "events" / "2024-01.jsonl").exists()
+    compressed = tmp_path / "events" / "2024-01.jsonl.gz"
+    with gzip.open(compressed, "rt", encoding="utf-8") as handle:
+        assert len(handle.readlines()) == 3
+    assert (tmp_path / "events" / "2024-02.jsonl.idx").read_text() == "2024-02-01 0\n"
+
+    days = [event["timestamp"][:10] for event in event_log.iter_events(date(2024, 1, 31), date(2024, 2, 1))]
+    assert days == ["2024-01-31", "2024-01-31", "2024-02-01"]
+    assert len(list(event_log.iter_events())) == 4
+
+
+def test_legacy_file_is_read_and_imported(tmp_path):
+    legacy = tmp_path / "processed_messages.jsonl"
+    legacy.write_text(json.dumps(_event("2023-12-31", "error")) + "\n", encoding="utf-8")
+    event_log = EventLog(tmp_path / "events", legacy_path=legacy)
+
+    assert [event["status"] for event in event_log.iter_events()] == ["error"]
+    assert event_log.import_legacy() == 1
+    assert not legacy.exists()
+    assert [event["status"] for event in event_log.iter_events(date(2023, 12, 31))] == ["error"]
+
+
+def test_log_stats_report(tmp_path):
+    event_log = EventLog(tmp_path / "events")
+    _fill(event_log)
+    event_log.wait_for_compaction()
+    stats = compute_log_stats(event_log.iter_events())
+
+    assert stats.messages == 4
+    assert stats.error_rate == 0.25
+    assert stats.kinds == {"time_log": 2, "task": 1}
+    report = format_log_stats(stats)
+    assert "Error rate: 25.0%" in report
+    assert "w1: 30 / 120" in report
+    assert "p50 300 ms" in report
+
+
+def test_month_rollover_compacts_in_the_background_without_losing_events(tmp_path, monkeypatch):
+    event_log = EventLog(tmp_path / "events")
+    event_log.append(_event("2024-01-31"))
+    release = threading.Event()
+    original = EventLog.compress
+
+    def _slow_failing_compress(self, month):
+        release.wait(5)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(EventLog, "compress", _slow_failing_compress)
+    event_log.append(_event("2024-02-01"))
+    event_log.append(_event("2024-02-02"))
+    assert len(list(event_log.iter_events())) == 3
+    release.set()
+    event_log.wait_for_compaction()
+    assert (tmp_path / "events" / "2024-01.jsonl").exists()
+
+    monkeypatch.setattr(EventLog, "compress", original)
+    assert [path.name for path in event_log.compact(before="2024-02")] == ["2024-01.jsonl.gz"]
+    assert len(list(event_log.iter_events())) == 3
+
+
+def test_events_written_into_a_compressed_month_are_read_and_merged(tmp_path):
+    event_log = EventLog(tmp_path / "events")
+    _fill(event_log)
+    event_log.wait_for_compaction()
+    other_process = EventLog(tmp_path / "events")
+    other_process.append(_event("2024-01-20", kind="diary"))
+    event_log.compact(before="2024-02")
+
+    event_log.append(_event("2024-01-15", kind="late"))
+    event_log.wait_for_compaction()
+    other_process.append(_event("2024-01-20", "error"))
+    late = {"2024-01-15 success", "2024-01-20 success", "2024-01-20 error"}
+    january = [event["raw_text"] for event in event_log.iter_events(date(2024, 1, 1), date(2024, 1, 31))]
+    assert len(january) == 6 and late <= set(january)
+
+    event_log.compact(before="2024-02")
+    assert not (tmp_path / "events" / "2024-01.jsonl").exists()
+    merged = [event["raw_text"] for event in event_log.iter_events(date(2024, 1, 1), date(2024, 1, 31))]
+    assert sorted(merged) == sorted(january)
+    assert len(list(event_log.iter_events())) == 7
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from time_bot.export import ExportFilter, export_time_entries
+from time_bot.stats import get_daily_stats
+
+
+def _write_time_note(base_dir: Path, name: str, day: str, minutes: int, maintag: str, subtag: str) -> None:
+    base_dir.mkdir(parents=True, exist_ok=True)
+    (base_dir / name).write_text(
+        "\n".join(
+            [
+                "---",
+                "tags:",
+                "  - time_system",
+                f"time: {minutes}",
+                f"date: {day}",
+                f"maintag: {maintag}",
+                f"subtag: {subtag}",
+                "---",
+                "",
+                name.split(" ")[0],
+                "",
+                "Исходный текст:",
+                f"> {minutes} минут",
+                "",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture()
+def vault(tmp_path):
+    _write_time_note(tmp_path, "Обед 2025-07-30 13-00.md", "2025-07-30", 30, "rt", "rest")
+    _write_time_note(tmp_path, "Кодинг 2025-07-30 15-00.md", "2025-07-30", 90, "w1", "coding")
+    _write_time_note(tmp_path, "Кодинг 2025-07-31 10-00.md", "2025-07-31", 45, "w1", "coding")
+    (tmp_path / "Random.md").write_text("no frontmatter", encoding="utf-8")
+    return tmp_path
+
+
+def test_csv_export_matches_stats_totals(vault):
+    stream = io.StringIO()
+    count = export_time_entries(
+        vault,
+        "csv",
+        stream=stream,
+        export_filter=ExportFilter(date_from=date(2025, 7, 30), date_to=date(2025, 7, 30)),
+    )
+    rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+    assert count == len(rows) == 2
+    stats = get_daily_stats(vault, date(2025, 7, 30))
+    assert sum(int(row["minutes"]) for row in rows) == stats.total_minutes
+    assert {row["title"] for row in rows} == {"Обед", "Кодинг"}
+
+
+def test_ndjson_export_filters_by_tag(vault):
+    stream = io.StringIO()
+    export_time_entries(vault, "ndjson", stream=stream, export_filter=ExportFilter(maintags=frozenset({"w1"})))
+    rows = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert sorted(row["date"] for row in rows) == ["2025-07-30", "2025-07-31"]
+    assert all(row["subtag"] == "coding" for row in rows)
+
+
+def test_parquet_export_writes_row_groups(vault, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output = tmp_path / "entries.parquet"
+    count = export_time_entries(vault, "parquet", output=output, row_group_size=2)
+    parquet_file = pq.ParquetFile(output)
+    assert count == parquet_file.metadata.num_rows == 3
+    assert parquet_file.num_row_groups == 2
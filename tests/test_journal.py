@@ -0,0 +1,82 @@
+from datetime import date
+
+import pytest
+
+from time_bot import journal as journal_module
+from time_bot.journal import NoteJournal
+from time_bot.models import MessageClassification, TimeEntry
+from time_bot.pipeline import process_message_text, rewrite_journaled_note
+
+
+@pytest.fixture()
+def note_journal(tmp_path, monkeypatch):
+    journal = NoteJournal(tmp_path / "journal.sqlite3")
+    monkeypatch.setattr(journal_module, "_JOURNAL", journal)
+    yield journal
+    journal.close()
+
+
+def _patch_llm(monkeypatch, minutes: int = 30):
+    async def _fake_classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _fake_parse(message_text: str, today: date):
+        return TimeEntry(title="Обед", raw_text=message_text, minutes=minutes, date=today, maintag="rt", subtag="rest")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fake_parse)
+
+
+@pytest.mark.anyio
+async def test_pipeline_journals_note_per_chat(tmp_path, monkeypatch, note_journal):
+    _patch_llm(monkeypatch)
+    result = await process_message_text("30 минут обед", today=date(2024, 1, 1), output_dir=tmp_path, chat_id=42)
+
+    assert result.journal_id is not None
+    entries = note_journal.last(42, 5)
+    assert [entry.path for entry in entries] == [result.note_path]
+    assert entries[0].status == "written"
+    assert entries[0].payload["minutes"] == 30
+    assert note_journal.last(7, 5) == []
+
+    assert [entry.id for entry in note_journal.reconcile()] == [result.journal_id]
+    note_journal.acknowledge([result.journal_id])
+    assert note_journal.reconcile() == []
+
+
+@pytest.mark.anyio
+async def test_edit_then_undo_restores_then_deletes(tmp_path, monkeypatch, note_journal):
+    _patch_llm(monkeypatch)
+    result = await process_message_text("30 минут обед", today=date(2024, 1, 1), output_dir=tmp_path, chat_id=1)
+    original = result.note_path.read_text(encoding="utf-8")
+
+    _patch_llm(monkeypatch, minutes=45)
+    edited = await rewrite_journaled_note(note_journal.last(1)[0], "45 минут обед", today=date(2024, 1, 1))
+    assert edited.note_path == result.note_path
+    assert "time: 45" in result.note_path.read_text(encoding="utf-8")
+
+    assert note_journal.last(1)[0].raw_text == "45 минут обед"
+
+    restored = note_journal.undo_last(1)
+    assert restored.status == "written"
+    assert result.note_path.read_text(encoding="utf-8") == original
+    [entry] = note_journal.last(1)
+    assert (entry.raw_text, entry.payload["minutes"]) == ("30 минут обед", 30)
+    assert (restored.raw_text, restored.payload) == (entry.raw_text, entry.payload)
+    assert entry.previous_content is None and entry.previous_payload is None
+
+    assert note_journal.undo_last(1).status == "undone"
+    assert not result.note_path.exists()
+    assert note_journal.last(1) == []
+
+
+def test_reconcile_settles_pending_entries(tmp_path):
+    journal = NoteJournal(tmp_path / "journal.sqlite3")
+    existing = tmp_path / "written.md"
+    existing.write_text("note", encoding="utf-8")
+    written_id = journal.begin(1, note_id="a", path=existing, note_type="diary", payload={}, raw_text="a")
+    missing_id = journal.begin(1, note_id="b", path=tmp_path / "missing.md", note_type="diary", payload={}, raw_text="b")
+
+    assert [entry.id for entry in journal.reconcile()] == [written_id]
+    assert journal.get(missing_id).status == "failed"
+
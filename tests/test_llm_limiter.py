@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from time_bot import sgr_client
+from time_bot.deadline import DeadlineExceededError, deadline_scope
+from time_bot.llm_limiter import AdaptiveLimiter
+from time_bot.model_router import RouteDecision
+from time_bot.metrics import METRICS
+
+ENDPOINT = "https://llm.example/v1"
+
+
+async def _saturate(limiter: AdaptiveLimiter, model: str, signal: str):
+    slots = int(limiter.limit(ENDPOINT, model))
+    permits = [await limiter.acquire(ENDPOINT, model) for _ in range(slots)]
+    for permit in permits:
+        permit.release(signal)
+
+
+@pytest.mark.anyio
+async def test_limit_grows_on_saturated_successes_and_halves_once_per_overload():
+    limiter = AdaptiveLimiter(initial=2, max_limit=8)
+    for _ in range(6):
+        await _saturate(limiter, "small", "ok")
+    grown = limiter.limit(ENDPOINT, "small")
+    assert 4 <= grown <= 8
+
+    permits = [await limiter.acquire(ENDPOINT, "small") for _ in range(3)]
+    for permit in permits:
+        permit.release("overload")
+    assert limiter.limit(ENDPOINT, "small") == pytest.approx(grown / 2)
+    assert limiter.limit(ENDPOINT, "big") == 2
+    gauges = METRICS.snapshot()["gauges"]
+    assert gauges["llm_limiter.llm.example/small.limit"] == pytest.approx(grown / 2, abs=0.01)
+
+
+@pytest.mark.anyio
+async def test_unused_capacity_does_not_grow_the_limit():
+    limiter = AdaptiveLimiter(initial=4)
+    for _ in range(20):
+        (await limiter.acquire(ENDPOINT, "m")).release("ok")
+    assert limiter.limit(ENDPOINT, "m") == 4
+
+
+@pytest.mark.anyio
+async def test_calls_over_the_limit_wait_and_cancelled_waiters_free_their_place():
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    running = 0
+    peak = 0
+
+    async def _call():
+        nonlocal running, peak
+        permit = await limiter.acquire(ENDPOINT, "m")
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        permit.release("ok")
+
+    blocker = await limiter.acquire(ENDPOINT, "m")
+    blocker_2 = await limiter.acquire(ENDPOINT, "m")
+    cancelled = asyncio.create_task(limiter.acquire(ENDPOINT, "m"))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    calls = [asyncio.create_task(_call()) for _ in range(6)]
+    await asyncio.sleep(0)
+    blocker.release()
+    blocker_2.release()
+    await asyncio.gather(*calls)
+    assert cancelled.cancelled()
+    assert peak == 2
+    for _ in range(2):
+        await asyncio.wait_for(limiter.acquire(ENDPOINT, "m"), timeout=1)
+
+
+@pytest.mark.anyio
+async def test_running_out_of_stage_budget_does_not_cut_the_limit(monkeypatch):
+    async def _slow_create(**kwargs):
+        await asyncio.sleep(5)
+
+    limiter = AdaptiveLimiter(initial=4)
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=_slow_create)))
+    monkeypatch.setattr(sgr_client, "_get_client", lambda: client)
+    monkeypatch.setattr(sgr_client, "_load_schema", lambda name: {})
+    monkeypatch.setattr(sgr_client, "get_llm_limiter", lambda: limiter)
+    endpoint = sgr_client.get_settings().openai_base_url
+
+    with deadline_scope(0.05):
+        with pytest.raises(DeadlineExceededError):
+            await sgr_client._call_model([], "classification", RouteDecision("classifier", "m", "primary"))
+    assert limiter.limit(endpoint, "m") == 4
+    await asyncio.wait_for(limiter.acquire(endpoint, "m"), timeout=1)
@@ -0,0 +1,82 @@
+from tests.conftest import FakeClock
+from time_bot.event_log import get_event_log
+from time_bot.logging_utils import log_event
+from time_bot.model_router import ModelRouter, RouteDecision, StageModels, track_routes
+
+
+def _router(clock: FakeClock) -> ModelRouter:
+    return ModelRouter(
+        {
+            "classifier": StageModels("small", "big"),
+            "time_entry": StageModels("big"),
+            "task_entry": StageModels("big"),
+        },
+        latency_threshold_ms=500,
+        error_rate_threshold=0.5,
+        window=10,
+        cooldown_seconds=30,
+        clock=clock,
+    )
+
+
+def test_stage_without_fallback_always_uses_primary(clock):
+    router = _router(clock)
+    for _ in range(10):
+        router.report(RouteDecision("time_entry", "big", "primary"), 5000, ok=False)
+    assert router.choose("time_entry").model == "big"
+
+
+def test_slow_primary_trips_to_fallback_and_probes_after_cooldown(clock):
+    router = _router(clock)
+    assert router.choose("classifier").model == "small"
+    for _ in range(5):
+        router.report(RouteDecision("classifier", "small", "primary"), 900, ok=True)
+
+    decision = router.choose("classifier")
+    assert (decision.model, decision.reason) == ("big", "fallback:latency")
+    clock.now = 10
+    assert router.choose("classifier").model == "big"
+
+    clock.now = 31
+    probe = router.choose("classifier")
+    assert (probe.model, probe.reason) == ("small", "probe")
+    assert router.choose("classifier").reason == "primary"
+
+
+def test_error_rate_trips_and_failed_call_retries_on_fallback(clock):
+    router = _router(clock)
+    primary = router.choose("classifier")
+    retry = router.fallback_after_error(primary)
+    assert retry is not None and retry.model == "big"
+    assert router.fallback_after_error(retry) is None
+
+    for ok in (False, False, False, True, True):
+        router.report(primary, 100, ok=ok)
+    assert router.choose("classifier").reason == "fallback:errors"
+
+
+def test_batch_calls_keep_their_own_health(clock):
+    router = ModelRouter(
+        {"time_entry": StageModels("big", "small"), "message_batch": StageModels("big", "small")},
+        latency_threshold_ms=500,
+        clock=clock,
+    )
+    for _ in range(5):
+        router.report(RouteDecision("message_batch", "big", "primary"), 2000, ok=True)
+    assert router.choose("message_batch").reason == "fallback:latency"
+    assert router.choose("time_entry").reason == "primary"
+
+
+def test_routes_of_a_message_are_written_to_its_events(clock):
+    router = _router(clock)
+    with track_routes():
+        router.fallback_after_error(router.choose("classifier"))
+        log_event({"status": "success", "raw_text": "30 минут обед"})
+    log_event({"status": "success", "raw_text": "без маршрута"})
+
+    routed, plain = get_event_log().iter_events()
+    assert routed["routes"] == [
+        {"stage": "classifier", "model": "small", "reason": "primary"},
+        {"stage": "classifier", "model": "big", "reason": "fallback:retry"},
+    ]
+    assert "routes" not in plain
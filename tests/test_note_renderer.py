@@ -0,0 +1,37 @@
+from datetime import date, time
+from pathlib import Path
+
+from time_bot.models import TaskEntry, TimeEntry
+from time_bot.note_builder import build_note, build_task_note
+from time_bot.note_renderer import render_markdown
+from time_bot.time_utils import get_timezone
+
+TZ = get_timezone("Europe/Moscow")
+
+
+def test_time_note_markdown_and_path(tmp_path):
+    entry = TimeEntry(
+        title="кодинг {бота}",
+        raw_text="45 минут кодинг {бота}",
+        minutes=45,
+        date=date(2024, 3, 1),
+        start_time=time(9, 5),
+        maintag="w1",
+        subtag="coding",
+        comment="рефакторинг",
+    )
+    note = build_note(entry, tmp_path, TZ)
+    assert note.file_path == str(tmp_path / "Кодинг Бота 2024-03-01 09-05.md")
+    assert render_markdown(note) == (
+        "---\ntags:\n  - time_system\ntime: 45\ndate: 2024-03-01\nmaintag: w1\nsubtag: coding\n---\n\n"
+        "кодинг {бота}\n\nрефакторинг\n\nИсходный текст:\n> 45 минут кодинг {бота}\n"
+    )
+
+
+def test_task_note_lists_projects():
+    entry = TaskEntry(title="Купить хлеб", raw_text="купить хлеб", project=["routine", "coding"])
+    note = build_task_note(entry, Path("/vault/tasks"), TZ)
+    assert render_markdown(note) == (
+        "---\ntags:\n  - task\ndone: false\nstatus: not started\npriority: 1\ndue: \nproject:\n"
+        "  - routine\n  - coding\n---\n\nКупить хлеб\n\nОписание задачи:\n> купить хлеб\n"
+    )
@@ -3,8 +3,8 @@ from pathlib import Path
 
 import pytest
 
-from time_bot.models import MessageClassification, TaskEntry, TimeEntry
-from time_bot.pipeline import process_message_text
+from time_bot.models import MessageBatchItem, MessageClassification, TaskEntry, TimeEntry
+from time_bot.pipeline import process_message_batch, process_message_text
 
 
 @pytest.mark.anyio
@@ -105,3 +105,64 @@ async def test_process_message_handles_diary(tmp_path, monkeypatch):
     content = Path(result.note_path).read_text(encoding="utf-8")
     assert "tags:" in content and "diary" in content
     assert "мысли о дне".lower() in content.lower()
+
+
+@pytest.mark.anyio
+async def test_process_message_splits_recap_into_several_notes(tmp_path, monkeypatch):
+    sample_text = "30 мин обед, 1 час кодинг, 15 мин дорога"
+
+    async def _fake_classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _fake_parse_batch(message_text: str, today: date):
+        return [
+            TimeEntry(title="Обед", raw_text="30 мин обед", minutes=30, date=today, maintag="rt", subtag="rest"),
+            TimeEntry(title="Кодинг", raw_text="1 час кодинг", minutes=60, date=today, maintag="w1", subtag="coding"),
+            TimeEntry(title="Обед", raw_text="15 мин дорога", minutes=15, date=today, maintag="rt", subtag="walking"),
+        ]
+
+    async def _fail_parse(*args, **kwargs):
+        raise AssertionError("Single-entry parser should not be called for a recap")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entries_with_sgr", _fake_parse_batch)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fail_parse)
+
+    result = await process_message_text(sample_text, today=date(2024, 1, 1), output_dir=tmp_path)
+    assert result.note_type == "time_log_batch"
+    assert [item.time_entry.minutes for item in result.results] == [30, 60, 15]
+    paths = {item.note_path for item in result.results}
+    assert len(paths) == 3
+    assert all(path.exists() for path in paths)
+
+
+@pytest.mark.anyio
+async def test_process_message_batch_uses_one_call_and_falls_back(tmp_path, monkeypatch):
+    texts = ["30 минут обед", "Завтра купить хлеб", "непонятно"]
+    batch_calls = []
+
+    async def _fake_batch(batch_texts, today: date, timezone: str):
+        batch_calls.append(list(batch_texts))
+        return [
+            MessageBatchItem(
+                index=0,
+                intent="time_log",
+                time_entry=TimeEntry(title="Обед", raw_text=texts[0], minutes=30, date=today, maintag="rt"),
+            ),
+            MessageBatchItem(
+                index=1,
+                intent="task",
+                task_entry=TaskEntry(title="Купить хлеб", raw_text=texts[1], due=today, project=["routine"]),
+            ),
+        ]
+
+    async def _fake_classify(message_text: str):
+        assert message_text == "непонятно"
+        return MessageClassification(intent="journal", raw_text=message_text)
+
+    monkeypatch.setattr("time_bot.pipeline.parse_message_batch", _fake_batch)
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+
+    results = await process_message_batch(texts, today=date(2024, 1, 1), output_dir=tmp_path)
+    assert batch_calls == [texts]
+    assert [result.note_type for result in results] == ["time_log", "task", "diary"]
@@ -0,0 +1,63 @@
+import pstats
+import time
+
+from time_bot import profiling, serialization
+from time_bot.metrics import METRICS
+from time_bot.profiling import Profiler
+
+
+def _busy_work(seconds: float = 0.05) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def test_one_in_n_messages_writes_collapsed_stacks_with_tags(tmp_path):
+    profiler = Profiler(tmp_path, sample_every=2, interval_ms=1)
+    for index in range(4):
+        with profiler.profile("message", chat_id=7) as tags:
+            _busy_work()
+            tags.update(note_type="time_log", stage_timings={"classify": 12.5})
+
+    metas = sorted(tmp_path.glob("*.json"))
+    assert len(metas) == 2
+    meta = serialization.loads(metas[0].read_bytes())
+    assert meta["kind"] == "message" and meta["mode"] == "sample" and meta["samples"] > 0
+    assert meta["tags"] == {"chat_id": 7, "note_type": "time_log", "stage_timings": {"classify": 12.5}}
+    collapsed = (tmp_path / meta["profile"]).read_text(encoding="utf-8").splitlines()
+    assert any("MainThread;" in line and "test_profiling:_busy_work" in line for line in collapsed)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed)
+
+
+def test_arming_counts_down_and_overlapping_profiles_are_skipped(tmp_path):
+    profiler = Profiler(tmp_path)
+    with profiler.profile("message"):
+        pass
+    assert not list(tmp_path.iterdir())
+
+    profiler.arm(2)
+    skipped = METRICS.snapshot()["counters"].get("profiler.skipped", 0)
+    with profiler.profile("message"):
+        with profiler.profile("read_tasks", scan=True):
+            pass
+    for _ in range(2):
+        with profiler.profile("message"):
+            pass
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    assert METRICS.snapshot()["counters"]["profiler.skipped"] == skipped + 1
+    assert profiler.toggle() and not profiler.toggle()
+
+
+def test_vault_scans_write_pstats_in_cprofile_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "_PROFILER", Profiler(tmp_path, scans=True, mode="cprofile"))
+
+    @profiling.profiled("read_tasks")
+    def scan():
+        return _busy_work(0.01)
+
+    assert scan() > 0
+    (pstats_path,) = tmp_path.glob("*-read_tasks-*.pstats")
+    functions = {name for _, _, name in pstats.Stats(str(pstats_path)).stats}
+    assert "_busy_work" in functions
@@ -0,0 +1,147 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from time_bot import journal, reprocess_queue
+from time_bot.event_log import EventLog
+from time_bot.journal import NoteJournal
+from time_bot.models import MessageClassification
+from time_bot.pipeline import PipelineResult, _save_unparsed
+from time_bot.reprocess_queue import ReprocessQueue
+from time_bot.reprocessor import Reprocessor, harvest_failed_messages
+
+
+@pytest.fixture()
+def queue(tmp_path, clock, monkeypatch):
+    queue = ReprocessQueue(tmp_path / "queue.sqlite3", clock=clock)
+    monkeypatch.setattr(reprocess_queue, "_QUEUE", queue)
+    yield queue
+    queue.close()
+
+
+@pytest.fixture()
+def note_journal(tmp_path, monkeypatch):
+    note_journal = NoteJournal(tmp_path / "journal.sqlite3")
+    monkeypatch.setattr(journal, "_JOURNAL", note_journal)
+    yield note_journal
+    note_journal.close()
+
+
+def test_harvest_queues_only_unresolved_retryable_errors(queue):
+    events = [
+        {"timestamp": "2024-01-01T10:00:00+00:00", "status": "error", "raw_text": "30 минут бег", "chat_id": 7},
+        {"timestamp": "2024-01-01T10:01:00+00:00", "status": "error", "raw_text": "1 час чтение"},
+        {"timestamp": "2024-01-01T10:02:00+00:00", "status": "success", "raw_text": "1 час чтение"},
+        {"timestamp": "2024-01-01T10:03:00+00:00", "status": "error", "raw_text": "?", "retryable": False},
+    ]
+
+    assert harvest_failed_messages(queue, events) == 1
+    assert harvest_failed_messages(queue, events) == 0
+    [item] = queue.pending()
+    assert (item.raw_text, item.chat_id) == ("30 минут бег", 7)
+
+
+def test_harvest_reads_the_event_log_from_its_watermark(tmp_path, monkeypatch, queue):
+    event_log = EventLog(tmp_path / "events")
+    reads = []
+
+    def _iter_events(date_from=None, date_to=None):
+        reads.append(date_from)
+        return EventLog.iter_events(event_log, date_from, date_to)
+
+    monkeypatch.setattr(event_log, "iter_events", _iter_events)
+    monkeypatch.setattr("time_bot.reprocessor.get_event_log", lambda: event_log)
+    event_log.append({"timestamp": "2024-01-01T10:00:00+00:00", "status": "error", "raw_text": "30 минут бег"})
+    event_log.append({"timestamp": "2024-01-03T10:00:00+00:00", "status": "error", "raw_text": "1 час чтение"})
+
+    assert harvest_failed_messages(queue) == 2
+    assert queue.harvest_watermark() == "2024-01-03"
+    event_log.append({"timestamp": "2024-01-03T12:00:00+00:00", "status": "error", "raw_text": "уборка"})
+    assert harvest_failed_messages(queue) == 1
+    assert reads == [None, date(2024, 1, 3)]
+
+
+def _result(text: str) -> PipelineResult:
+    return PipelineResult(
+        note_path=Path("note.md"),
+        markdown="",
+        file_name="note.md",
+        classification=MessageClassification(intent="time_log", raw_text=text),
+        note_type="time_log",
+    )
+
+
+@pytest.mark.anyio
+async def test_retries_with_backoff_then_notifies_and_removes_inbox_note(
+    tmp_path, monkeypatch, queue, clock, note_journal
+):
+    inbox_note = tmp_path / "Unparsed.md"
+    inbox_note.write_text("raw", encoding="utf-8")
+    entry_id = note_journal.begin(
+        7, note_id="inbox", path=inbox_note, note_type="unparsed", payload={}, raw_text="30 минут бег"
+    )
+    note_journal.mark_written(entry_id)
+    queue.enqueue("30 минут бег", chat_id=7, reason="Deadline exceeded", inbox_path=inbox_note)
+    calls = []
+
+    async def _flaky_process(text, *, chat_id, deadline_seconds):
+        calls.append((text, chat_id, deadline_seconds))
+        if len(calls) == 1:
+            raise ConnectionError("provider down")
+        return _result(text)
+
+    notified = []
+
+    async def _notify(chat_id, result):
+        notified.append((chat_id, result.note_type))
+
+    monkeypatch.setattr("time_bot.reprocessor.process_message_text", _flaky_process)
+    reprocessor = Reprocessor(queue, notify=_notify, rate_per_minute=6000, backoff_seconds=60)
+
+    report = await reprocessor.run_once()
+    assert (report.succeeded, report.retried) == (0, 1)
+    assert (await reprocessor.run_once()).succeeded == 0
+
+    clock.now += 61
+    report = await reprocessor.run_once()
+    assert report.succeeded == 1
+    assert calls[-1] == ("30 минут бег", 7, 0)
+    assert notified == [(7, "time_log")]
+    assert not inbox_note.exists()
+    assert note_journal.get(entry_id).status == "undone"
+    assert queue.counts() == {"done": 1}
+
+
+@pytest.mark.anyio
+async def test_gives_up_after_max_attempts(monkeypatch, queue):
+    queue.enqueue("непонятно", chat_id=None, reason="error")
+
+    async def _failing_process(text, **kwargs):
+        raise ValueError("still broken")
+
+    monkeypatch.setattr("time_bot.reprocessor.process_message_text", _failing_process)
+    reprocessor = Reprocessor(queue, rate_per_minute=6000, max_attempts=2, backoff_seconds=0)
+
+    assert (await reprocessor.run_once()).retried == 1
+    assert (await reprocessor.run_once()).abandoned == 1
+    assert queue.counts() == {"abandoned": 1}
+
+
+@pytest.mark.anyio
+async def test_undone_inbox_note_is_not_reprocessed(tmp_path, monkeypatch, queue, note_journal):
+    result = _save_unparsed("30 минут бег", reason="Deadline exceeded", output_dir=tmp_path, chat_id=7)
+    assert result.note_path.exists()
+    assert note_journal.undo_last(7).status == "undone"
+
+    calls = []
+
+    async def _process(text, **kwargs):
+        calls.append(text)
+        return _result(text)
+
+    monkeypatch.setattr("time_bot.reprocessor.process_message_text", _process)
+    report = await Reprocessor(queue, rate_per_minute=6000).run_once()
+    assert (report.succeeded, calls) == (0, [])
+    assert queue.counts() == {"abandoned": 1}
+    assert not result.note_path.exists()
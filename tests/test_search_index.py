@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+
+from time_bot.search_index import NoteRoot, SearchIndex, normalize_text
+
+
+def _write_time_note(path: Path, title: str, raw_text: str, day: str = "2025-07-30") -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "\n".join(
+            [
+                "---",
+                "tags:",
+                "  - time_system",
+                "time: 30",
+                f"date: {day}",
+                "maintag: rt",
+                "---",
+                "",
+                title,
+                "",
+                "Исходный текст:",
+                f"> {raw_text}",
+                "",
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+
+def _build_index(tmp_path: Path) -> SearchIndex:
+    roots = [NoteRoot(tmp_path / "vault", "time_log"), NoteRoot(tmp_path / "vault" / "tasks", "task", True)]
+    return SearchIndex(tmp_path / "cache" / "index.sqlite3", roots)
+
+
+def test_normalize_text_folds_russian_inflections():
+    assert normalize_text("Обеда") == normalize_text("обед")
+    assert normalize_text("чтения книги") == normalize_text("Чтение книга")
+
+
+def test_search_matches_inflected_words_and_ranks_title(tmp_path):
+    vault = tmp_path / "vault"
+    _write_time_note(vault / "Обед 2025-07-30 13-00.md", "Обед", "30 минут обед с коллегами")
+    _write_time_note(vault / "Дорога 2025-07-30 09-00.md", "Дорога", "15 мин дорога, думал про обеды")
+    _write_time_note(vault / "Чтение 2025-07-30 20-00.md", "Чтение", "30 минут чтения")
+    index = _build_index(tmp_path)
+
+    hits = index.search("обеда")
+    assert [hit.file_name for hit in hits] == ["Обед 2025-07-30 13-00.md", "Дорога 2025-07-30 09-00.md"]
+    assert hits[0].note_type == "time_log"
+    assert hits[0].note_date == "2025-07-30"
+
+
+def test_refresh_only_reindexes_changed_files(tmp_path):
+    vault = tmp_path / "vault"
+    first = vault / "Обед 2025-07-30 13-00.md"
+    second = vault / "Чтение 2025-07-30 20-00.md"
+    _write_time_note(first, "Обед", "30 минут обед")
+    _write_time_note(second, "Чтение", "30 минут чтения")
+    index = _build_index(tmp_path)
+
+    assert index.refresh() == 2
+    assert index.refresh() == 0
+
+    _write_time_note(second, "Прогулка", "40 минут прогулка")
+    stat = second.stat()
+    os.utime(second, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    first.unlink()
+    assert index.refresh() == 2
+    assert index.search("чтение") == []
+    assert [hit.title for hit in index.search("прогулка")] == ["Прогулка"]
+
+
+def test_concurrent_refreshes_of_a_fresh_index_do_not_collide(tmp_path):
+    for number in range(300):
+        _write_time_note(tmp_path / "vault" / f"Заметка {number}.md", f"Заметка {number}", f"{number} минут чтения")
+    index = _build_index(tmp_path)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        changes = list(pool.map(lambda _: index.refresh(), range(4)))
+
+    assert sum(changes) == 300
+    assert len(index.search("чтение", limit=500, refresh=False)) == 300
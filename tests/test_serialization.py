@@ -0,0 +1,35 @@
+import json
+from datetime import date, datetime, time
+
+import pytest
+
+from time_bot import serialization
+from time_bot.models import TimeEntry
+
+
+@pytest.fixture(params=serialization.available_backends())
+def backend(request):
+    previous = serialization.use_backend(request.param)
+    yield request.param
+    serialization.use_backend(previous.name)
+
+
+def test_backends_agree_on_dates_models_and_unicode(backend):
+    entry = TimeEntry(title="Обед", raw_text="30 минут обед", minutes=30, date=date(2024, 1, 2), maintag="rt")
+    payload = {"b": 1, "a": [date(2024, 1, 2), time(9, 30), datetime(2024, 1, 2, 9, 30)], "entry": entry}
+
+    encoded = serialization.dumps(payload, sort_keys=True)
+    assert encoded.startswith('{"a":["2024-01-02","09:30:00","2024-01-02T09:30:00"]')
+    assert "Обед" in encoded
+    assert serialization.loads(encoded.encode("utf-8"))["entry"] == entry.model_dump(mode="json")
+    assert serialization.dumps_bytes({"x": 1}) == b'{"x":1}'
+
+
+def test_invalid_input_raises_stdlib_decode_error(backend):
+    with pytest.raises(json.JSONDecodeError):
+        serialization.loads('{"a": ')
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        serialization.get_backend("yaml")
@@ -1,11 +1,13 @@
 import json
 from pathlib import Path
 
-from time_bot.models import MessageClassification, TaskEntry, TimeEntry
+from time_bot.models import MessageBatch, MessageClassification, TaskEntry, TimeEntry, TimeEntryBatch
 
 SCHEMA_PATH = Path("schemas/time_entry.json")
 CLASSIFICATION_SCHEMA_PATH = Path("schemas/message_classification.json")
 TASK_SCHEMA_PATH = Path("schemas/task_entry.json")
+BATCH_SCHEMA_PATH = Path("schemas/time_entry_batch.json")
+MESSAGE_BATCH_SCHEMA_PATH = Path("schemas/message_batch.json")
 
 
 def test_schema_file_matches_model_schema() -> None:
@@ -77,3 +79,15 @@ def test_task_project_enum_values() -> None:
     schema = json.loads(TASK_SCHEMA_PATH.read_text(encoding="utf-8"))
     project_schema = schema["properties"]["project"]["items"]
     assert sorted(project_schema["enum"]) == ["coding", "routine"]
+
+
+def test_time_entry_batch_schema_matches_model() -> None:
+    assert BATCH_SCHEMA_PATH.exists(), "Time entry batch schema file missing"
+    file_schema = json.loads(BATCH_SCHEMA_PATH.read_text(encoding="utf-8"))
+    assert file_schema == TimeEntryBatch.model_json_schema()
+
+
+def test_message_batch_schema_matches_model() -> None:
+    assert MESSAGE_BATCH_SCHEMA_PATH.exists(), "Message batch schema file missing"
+    file_schema = json.loads(MESSAGE_BATCH_SCHEMA_PATH.read_text(encoding="utf-8"))
+    assert file_schema == MessageBatch.model_json_schema()
@@ -0,0 +1,190 @@
+from datetime import date
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from time_bot.config import get_settings
+from time_bot.tag_predictor import TagPredictor, evaluate
+
+HISTORY = [
+    ("30 минут спортзал", "rt", "gym"),
+    ("1 час спортзал, ноги", "rt", "gym"),
+    ("45 минут кодинг бота", "w1", "coding"),
+    ("2 часа кодинг", "w1", "coding"),
+    ("20 минут читал книгу", "rest", "reading"),
+]
+
+
+def _event(index: int, text: str, maintag: str, subtag: str, **extra):
+    return {
+        "timestamp": f"2024-01-01T10:{index:02d}:00+00:00",
+        "status": "success",
+        "kind": "time_log",
+        "raw_text": text,
+        "maintag": maintag,
+        "subtag": subtag,
+        **extra,
+    }
+
+
+def test_predicts_nearest_labels_and_survives_reload(tmp_path):
+    predictor = TagPredictor(k=3)
+    assert predictor.update_from_events(_event(i, *row) for i, row in enumerate(HISTORY)) == 5
+
+    prediction = predictor.predict("90 минут кодинг")
+    assert (prediction.maintag, prediction.subtag) == ("w1", "coding")
+    assert 0 < prediction.confidence <= 1
+
+    path = tmp_path / "model.npz"
+    predictor.save(path)
+    loaded = TagPredictor.load(path)
+    assert len(loaded) == 5
+    assert loaded.trained_until == "2024-01-01T10:04:00+00:00"
+    assert loaded.predict("40 минут спортзал").subtag == "gym"
+    assert loaded.update_from_events([_event(4, *HISTORY[4])]) == 0
+
+
+def test_relearning_same_text_replaces_label():
+    predictor = TagPredictor(k=1)
+    predictor.learn("30 минут прогулка", "rest", "walking")
+    predictor.learn("15 минут прогулка", "rt", "walking")
+    assert len(predictor) == 1
+    assert predictor.predict("60 минут прогулка").maintag == "rt"
+
+
+def test_evaluate_predicts_before_learning():
+    events = [_event(i, *row) for i, row in enumerate(HISTORY)]
+    events.append(_event(10, "50 минут кодинг", "w1", "coding"))
+    events.append(_event(11, "batch", "w1", "coding", batch_size=2))
+    report = evaluate(events, k=3, min_confidence=0.0)
+    assert report.evaluated == 5
+    assert report.pair_agree >= 2
+    assert len(report.latencies_ms) == 5
+
+
+def test_edits_relabel_and_undos_withdraw_pairs():
+    predictor = TagPredictor(k=1)
+    events = [_event(i, *row) for i, row in enumerate(HISTORY)]
+    events.append(
+        _event(5, "45 минут созвон по боту", "w2", "social", action="edit", previous_raw_text=HISTORY[2][0])
+    )
+    events.append(_event(6, "", "", "", action="undo", previous_raw_text=HISTORY[4][0]))
+    predictor.update_from_events(events)
+
+    assert predictor.predict("45 минут созвон по боту").maintag == "w2"
+    assert predictor.predict(HISTORY[2][0]) is None
+    assert predictor.predict(HISTORY[4][0]) is None
+
+    report = evaluate(events, k=1, min_confidence=0.0)
+    assert report.evaluated == 4
+
+
+@pytest.mark.anyio
+async def test_corrections_reach_loaded_and_rebuilt_predictor(tmp_path, monkeypatch):
+    from time_bot import tag_predictor
+    from time_bot.bot.utils import build_undo_message
+    from time_bot.event_log import get_event_log
+    from time_bot.journal import get_note_journal
+    from time_bot.models import MessageClassification, TimeEntry
+    from time_bot.pipeline import process_message_text, rewrite_journaled_note
+
+    labels = {"30 минут обед": ("rt", "rest"), "30 минут обед с командой": ("w2", "social")}
+
+    async def _classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _parse(message_text: str, today: date, *, tags=None):
+        maintag, subtag = labels[message_text]
+        return TimeEntry(title="Обед", raw_text=message_text, minutes=30, date=today, maintag=maintag, subtag=subtag)
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _parse)
+
+    await process_message_text("30 минут обед", today=date(2024, 1, 2), output_dir=tmp_path, chat_id=1)
+    predictor = TagPredictor(k=1)
+    predictor.update_from_events(get_event_log().iter_events())
+    monkeypatch.setattr(tag_predictor, "_PREDICTOR", predictor)
+
+    [entry] = get_note_journal().last(1, 1)
+    await rewrite_journaled_note(entry, "30 минут обед с командой", today=date(2024, 1, 2))
+    assert predictor.predict("30 минут обед с командой").maintag == "w2"
+    assert predictor.predict("30 минут обед") is None
+
+    build_undo_message(1)
+    assert predictor.predict("30 минут обед").maintag == "rt"
+    assert predictor.predict("30 минут обед с командой") is None
+
+    build_undo_message(1)
+    assert predictor.predict("30 минут обед") is None
+    rebuilt = TagPredictor(k=1)
+    assert rebuilt.update_from_events(get_event_log().iter_events()) == 4
+    assert rebuilt.predict("30 минут обед") is None
+    assert rebuilt.predict("30 минут обед с командой") is None
+
+
+@pytest.mark.anyio
+async def test_confident_prediction_skips_classifier(tmp_path, monkeypatch):
+    from time_bot import tag_predictor
+    from time_bot.pipeline import process_message_text
+    from time_bot.models import TimeEntry
+
+    predictor = TagPredictor(k=3)
+    predictor.update_from_events(_event(i, *row) for i, row in enumerate(HISTORY))
+    settings = get_settings().model_copy(update={"tag_predictor_enabled": True, "tag_predictor_min_confidence": 0.3})
+    monkeypatch.setattr("time_bot.pipeline.get_settings", lambda: settings)
+    monkeypatch.setattr("time_bot.tag_predictor.get_settings", lambda: settings)
+    monkeypatch.setattr(tag_predictor, "_PREDICTOR", predictor)
+
+    async def _no_classify(message_text: str):
+        raise AssertionError("classifier should be skipped")
+
+    seen_tags = []
+
+    async def _fake_parse(message_text: str, today: date, *, tags=None):
+        seen_tags.append(tags)
+        return TimeEntry(title="Кодинг", raw_text=message_text, minutes=90, date=today, maintag="w2")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _no_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fake_parse)
+
+    result = await process_message_text("90 минут кодинг", today=date(2024, 1, 2), output_dir=tmp_path)
+    assert result.note_type == "time_log"
+    assert seen_tags == [("w1", "coding")]
+    assert len(predictor) == 6
+
+
+@pytest.mark.anyio
+async def test_broken_predictor_never_fails_a_saved_message(tmp_path, monkeypatch):
+    from time_bot.models import MessageClassification, TimeEntry
+    from time_bot.pipeline import process_message_text
+
+    settings = get_settings().model_copy(update={"tag_predictor_enabled": True})
+    monkeypatch.setattr("time_bot.pipeline.get_settings", lambda: settings)
+    loads = []
+
+    def _broken_load():
+        loads.append(1)
+        raise ValueError("corrupt tag_predictor.npz")
+
+    async def _classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _parse(message_text: str, today: date, *, tags=None):
+        return TimeEntry(title="Обед", raw_text=message_text, minutes=30, date=today, maintag="rt")
+
+    monkeypatch.setattr("time_bot.pipeline.get_tag_predictor", _broken_load)
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _parse)
+
+    result = await process_message_text("30 минут обед", today=date(2024, 1, 2), output_dir=tmp_path)
+    assert result.note_path.exists()
+    assert loads == [1]
+
+    class _FailingLearner(TagPredictor):
+        def learn(self, text, maintag, subtag):
+            raise OSError("disk full")
+
+    monkeypatch.setattr("time_bot.pipeline.get_tag_predictor", lambda: _FailingLearner(k=1))
+    result = await process_message_text("45 минут обед", today=date(2024, 1, 2), output_dir=tmp_path)
+    assert result.note_path.exists()
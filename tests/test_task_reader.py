@@ -1,9 +1,7 @@
 from datetime import date
 from pathlib import Path
 
-import pytest
-
-from time_bot.bot import utils as bot_utils
+from time_bot.bot import views
 from time_bot.task_reader import TaskRecord, read_tasks
 
 
@@ -45,8 +43,20 @@ def test_read_tasks_parses_frontmatter(tmp_path):
     assert record.file_path == file_path
 
 
-@pytest.mark.anyio
-async def test_build_tasks_overview_message_orders_sections(monkeypatch, tmp_path):
+def _task_index(monkeypatch, tmp_path, records):
+    class DummySettings:
+        obsidian_tasks_path = tmp_path
+        timezone = "Europe/Moscow"
+        obsidian_vault_dir = tmp_path
+        vault_scan_workers = 1
+
+    monkeypatch.setattr(views, "get_settings", lambda: DummySettings())
+    monkeypatch.setattr(views, "read_tasks", lambda _, **kwargs: records)
+    monkeypatch.setattr(views, "get_today", lambda tz: date(2025, 7, 30))
+    return views.build_task_index()
+
+
+def test_task_index_orders_sections(monkeypatch, tmp_path):
     records = [
         TaskRecord("Сегодня", date(2025, 7, 30), False, tmp_path / "today.md"),
         TaskRecord("Просроченная", date(2025, 7, 29), False, tmp_path / "over.md"),
@@ -55,19 +65,28 @@ async def test_build_tasks_overview_message_orders_sections(monkeypatch, tmp_pat
         TaskRecord("Сделана", date(2025, 7, 30), True, tmp_path / "done.md"),
     ]
 
-    class DummySettings:
-        obsidian_tasks_path = tmp_path
-        timezone = "Europe/Moscow"
-        obsidian_vault_dir = tmp_path
-
-    monkeypatch.setattr(bot_utils, "get_settings", lambda: DummySettings())
-    monkeypatch.setattr(bot_utils, "read_tasks", lambda _: records)
-    monkeypatch.setattr(bot_utils, "get_today", lambda tz: date(2025, 7, 30))
-
-    message = bot_utils.build_tasks_overview_message()
+    message, keyboard = views.render_tasks_page(_task_index(monkeypatch, tmp_path, records))
     today_idx = message.index("Сегодня:")
     overdue_idx = message.index("Просроченные:")
     future_idx = message.index("Будущие:")
     undated_idx = message.index("Без даты:")
     assert today_idx < overdue_idx < future_idx < undated_idx
     assert "Сделана" not in message
+    assert len(keyboard.inline_keyboard) == 2
+
+
+def test_task_pages_render_only_the_visible_slice(monkeypatch, tmp_path):
+    records = [TaskRecord(f"Задача {i:03}", date(2025, 7, 30), False, tmp_path / f"{i}.md") for i in range(45)]
+    records.append(TaskRecord("Без срока", None, False, tmp_path / "none.md"))
+    index = _task_index(monkeypatch, tmp_path, records)
+
+    message, keyboard = views.render_tasks_page(index, "all", 2, page_size=20)
+    visible = [f"{i + 1}. 2025-07-30 — Задача {i:03} [{i}.md]" for i in range(40, 45)]
+    assert message.splitlines()[1:] == ["Сегодня:", *visible, "", "Без даты:", "1. без даты — Без срока [none.md]"]
+    previous, current, following = keyboard.inline_keyboard[-1]
+    assert current.text == "3/3"
+    assert views.TasksPage.unpack(previous.callback_data) == views.TasksPage(section="all", page=1)
+    assert views.TasksPage.unpack(following.callback_data).page == 0
+
+    message, _ = views.render_tasks_page(index, "undated", 5, page_size=20)
+    assert message == "Открытые задачи:\nБез даты:\n1. без даты — Без срока [none.md]"
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import GetMe, SendMessage
+
+from time_bot.bot.throttling import SendRateLimiter, TokenBucket
+
+
+def test_token_bucket_reserves_in_fifo_order(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    clock.now = 10
+    assert bucket.reserve() == 0.0
+
+
+def test_token_bucket_pause_blocks_for_retry_after(clock):
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=clock)
+    bucket.pause(5)
+    assert bucket.reserve() == pytest.approx(6.0)
+
+
+@pytest.mark.anyio
+async def test_limiter_retries_after_flood_wait(monkeypatch, clock):
+    sleeps: list[float] = []
+
+    async def _fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr("time_bot.bot.throttling.asyncio.sleep", _fake_sleep)
+    limiter = SendRateLimiter(global_rate=30, chat_rate=1, chat_burst=3, max_retries=2, clock=clock)
+    method = SendMessage(chat_id=1, text="hi")
+    calls = []
+
+    async def _make_request(bot, request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise TelegramRetryAfter(method=request, message="Too Many Requests", retry_after=3)
+        return "ok"
+
+    assert await limiter(_make_request, None, method) == "ok"
+    assert len(calls) == 2
+    assert sleeps and sleeps[-1] >= 3
+
+
+@pytest.mark.anyio
+async def test_limiter_skips_requests_without_chat():
+    limiter = SendRateLimiter()
+
+    async def _make_request(bot, request):
+        return "me"
+
+    assert await limiter(_make_request, None, GetMe()) == "me"
+
+
+@pytest.mark.anyio
+async def test_sender_waiting_for_its_chat_does_not_hold_a_global_token(monkeypatch, clock):
+    sleeps: list[float] = []
+    never = asyncio.Event()
+    yield_to_loop = asyncio.sleep
+
+    async def _fake_sleep(delay):
+        sleeps.append(delay)
+        await never.wait()
+
+    monkeypatch.setattr("time_bot.bot.throttling.asyncio.sleep", _fake_sleep)
+    limiter = SendRateLimiter(global_rate=2, chat_rate=1, chat_burst=1, clock=clock)
+
+    async def _make_request(bot, request):
+        return request.chat_id
+
+    assert await limiter(_make_request, None, SendMessage(chat_id=1, text="a")) == 1
+    backpressured = asyncio.create_task(limiter(_make_request, None, SendMessage(chat_id=1, text="b")))
+    await yield_to_loop(0)
+    assert sleeps == [1.0]
+
+    other_chat = limiter(_make_request, None, SendMessage(chat_id=2, text="c"))
+    assert await asyncio.wait_for(other_chat, timeout=1) == 2
+    assert sleeps == [1.0]
+    backpressured.cancel()
@@ -0,0 +1,95 @@
+from datetime import date
+
+import pytest
+
+from time_bot.daily_notes import migrate_to_daily
+from time_bot.models import TaskEntry, TimeEntry
+from time_bot.note_builder import build_note, build_task_note
+from time_bot.stats import get_daily_stats, is_time_note, iter_time_entries
+from time_bot.task_reader import read_tasks
+from time_bot.time_utils import get_timezone
+from time_bot.vault_layout import (
+    apply_moves,
+    iter_note_files,
+    note_date,
+    partition_dirs_between,
+    plan_partition_moves,
+    rewrite_links,
+    validate_partition_format,
+)
+
+TZ = get_timezone("Europe/Riga")
+
+
+def _time_note(directory, name: str, day: date, minutes: int = 30) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_text(
+        f"---\ntags:\n  - time_system\ntime: {minutes}\ndate: {day.isoformat()}\nmaintag: w1\n---\n\nКод\n",
+        encoding="utf-8",
+    )
+
+
+def test_builders_place_notes_in_partitions(tmp_path):
+    entry = TimeEntry(title="Код", raw_text="код", minutes=30, date=date(2024, 3, 5), maintag="w1")
+    note = build_note(entry, tmp_path, TZ, partition_format="%Y/%m")
+    assert note.file_path.startswith(str(tmp_path / "2024" / "03"))
+
+    task = TaskEntry(title="Купить хлеб", raw_text="купить хлеб", project=["routine"])
+    task_note = build_task_note(task, tmp_path / "tasks", TZ, partition_format="%Y/%m")
+    assert str(tmp_path / "tasks") in task_note.file_path
+    assert task_note.file_path.count("/") == str(tmp_path / "tasks").count("/") + 3
+
+    with pytest.raises(ValueError):
+        validate_partition_format("%Y/%H")
+
+
+def test_scans_only_list_partitions_of_the_range(tmp_path):
+    _time_note(tmp_path / "2024" / "01", "Код 2024-01-31 10-00.md", date(2024, 1, 31))
+    _time_note(tmp_path / "2024" / "02", "Код 2024-02-01 10-00.md", date(2024, 2, 1), minutes=45)
+    _time_note(tmp_path, "Код 2024-02-01 09-00.md", date(2024, 2, 1), minutes=15)
+    (tmp_path / "notes").mkdir()
+    _time_note(tmp_path / "notes", "Код 2024-02-01 11-00.md", date(2024, 2, 1))
+
+    assert partition_dirs_between(tmp_path, date(2024, 1, 30), date(2024, 2, 2), "%Y/%m") == [
+        tmp_path / "2024" / "01",
+        tmp_path / "2024" / "02",
+    ]
+    listed = {path.name for path in iter_note_files(tmp_path, "%Y/%m", date_from=date(2024, 2, 1), date_to=date(2024, 2, 1))}
+    assert listed == {"Код 2024-02-01 10-00.md", "Код 2024-02-01 09-00.md"}
+    assert len(list(iter_time_entries(tmp_path, partition_format="%Y/%m"))) == 3
+    assert get_daily_stats(tmp_path, date(2024, 2, 1), partition_format="%Y/%m").total_minutes == 60
+
+
+def test_migration_moves_notes_and_rewrites_links(tmp_path):
+    _time_note(tmp_path, "Код 2024-01-31 10-00.md", date(2024, 1, 31))
+    (tmp_path / "Заметка.md").write_text("без даты", encoding="utf-8")
+    tasks_dir = tmp_path / "tasks"
+    tasks_dir.mkdir()
+    (tasks_dir / "Купить Хлеб 2024-02-03 08-15.md").write_text(
+        "---\ntags:\n  - task\ndone: false\n---\n\nКупить хлеб\n", encoding="utf-8"
+    )
+    (tmp_path / "Index.md").write_text(
+        "[[tasks/Купить Хлеб 2024-02-03 08-15|хлеб]] [[Код 2024-01-31 10-00]] [код](Код%202024-01-31%2010-00.md)\n",
+        encoding="utf-8",
+    )
+    assert note_date(tmp_path / "Код 2024-01-31 10-00.md") == date(2024, 1, 31)
+
+    time_moves, skipped = plan_partition_moves(tmp_path, "%Y/%m", include=is_time_note)
+    task_moves, _ = plan_partition_moves(tasks_dir, "%Y/%m")
+    assert skipped == []
+    moves = time_moves + task_moves
+    apply_moves(moves)
+    assert rewrite_links(tmp_path, moves) == 1
+
+    assert (tmp_path / "2024" / "01" / "Код 2024-01-31 10-00.md").exists()
+    assert (tmp_path / "Заметка.md").exists()
+    assert (tmp_path / "Index.md").read_text(encoding="utf-8") == (
+        "[[tasks/2024/02/Купить Хлеб 2024-02-03 08-15|хлеб]] [[Код 2024-01-31 10-00]]"
+        " [код](2024/01/Код%202024-01-31%2010-00.md)\n"
+    )
+    tasks = read_tasks(tasks_dir, partition_format="%Y/%m", created_from=date(2024, 2, 1), created_to=date(2024, 2, 29))
+    assert [task.title for task in tasks] == ["Купить хлеб"]
+    assert read_tasks(tasks_dir, partition_format="%Y/%m", created_from=date(2024, 1, 1), created_to=date(2024, 1, 31)) == []
+
+    plan = migrate_to_daily(tmp_path, "time", partition_format="%Y/%m")
+    assert list(plan) == [tmp_path / "2024" / "01" / "Time Log 2024-01-31.md"]
@@ -0,0 +1,61 @@
+import threading
+import time
+
+from time_bot.stats import iter_time_entries
+from time_bot.task_reader import read_tasks
+from time_bot.vault_scan import INFLIGHT_PER_WORKER, iter_markdown_tree, scan_notes
+
+
+def test_scan_notes_streams_all_results_with_bounded_inflight(tmp_path):
+    paths = [tmp_path / f"{index}.md" for index in range(50)]
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _parse(path):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.002)
+        with lock:
+            active -= 1
+        return path.name
+
+    assert list(scan_notes(paths, _parse, workers=1)) == [path.name for path in paths]
+    assert sorted(scan_notes(paths, _parse, workers=4)) == sorted(path.name for path in paths)
+    assert peak <= 4
+
+    consumed = iter(range(1000))
+    submitted = []
+
+    def _lazy_paths():
+        for index in consumed:
+            submitted.append(index)
+            yield tmp_path / f"{index}.md"
+
+    stream = scan_notes(_lazy_paths(), _parse, workers=2)
+    next(stream)
+    stream.close()
+    assert len(submitted) <= 2 * INFLIGHT_PER_WORKER + 1
+
+
+def test_parallel_readers_match_serial(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / ".obsidian").mkdir(parents=True)
+    (vault / ".obsidian" / "ignored.md").write_text("---\ndone: false\n---\n", encoding="utf-8")
+    (vault / "sub").mkdir()
+    for index in range(20):
+        folder = vault / "sub" if index % 2 else vault
+        (folder / f"Note {index} 2024-01-01 10-00.md").write_text(
+            f"---\ntime: {index + 1}\ndate: 2024-01-01\nmaintag: w1\ndone: false\n---\n\nNote {index}\n",
+            encoding="utf-8",
+        )
+
+    assert len(list(iter_markdown_tree(vault))) == 20
+    serial = sorted((record.title, record.minutes) for record in iter_time_entries(vault, with_titles=True))
+    parallel = sorted(
+        (record.title, record.minutes) for record in iter_time_entries(vault, with_titles=True, workers=4)
+    )
+    assert serial == parallel and len(serial) == 10
+    assert read_tasks(vault, workers=4) == read_tasks(vault)
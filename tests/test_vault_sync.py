@@ -0,0 +1,74 @@
+import shutil
+import subprocess
+import threading
+
+import pytest
+
+from time_bot import vault_events
+from time_bot.metrics import METRICS
+from time_bot.vault_sync import VaultSync, git_action
+
+
+def test_burst_of_writes_triggers_one_sync(tmp_path):
+    batches = []
+    done = threading.Event()
+
+    def _action(paths):
+        batches.append(list(paths))
+        done.set()
+
+    sync = VaultSync(_action, window_seconds=0.2, max_batch=100)
+    sync.start()
+    try:
+        for index in range(50):
+            vault_events.note_written("time_log", tmp_path / f"note {index}.md")
+        assert done.wait(5)
+    finally:
+        sync.stop()
+    assert len(batches) == 1
+    assert len(batches[0]) == 50
+
+
+def test_failed_sync_keeps_paths_and_retries(tmp_path):
+    attempts = []
+    done = threading.Event()
+
+    def _flaky(paths):
+        attempts.append(list(paths))
+        if len(attempts) == 1:
+            raise RuntimeError("remote unreachable")
+        done.set()
+
+    failures_before = METRICS.snapshot()["counters"].get("vault_sync.failures", 0)
+    sync = VaultSync(_flaky, window_seconds=0.01, backoff_seconds=0.05)
+    sync.start()
+    try:
+        vault_events.note_written("task", tmp_path / "task.md")
+        assert done.wait(5)
+    finally:
+        sync.stop()
+    assert attempts == [[tmp_path / "task.md"], [tmp_path / "task.md"]]
+    assert METRICS.snapshot()["counters"]["vault_sync.failures"] == failures_before + 1
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_action_commits_written_and_deleted_notes(tmp_path):
+    def _git(*args):
+        return subprocess.run(["git", *args], cwd=tmp_path, capture_output=True, text=True, check=True).stdout
+
+    _git("init", "-q")
+    _git("config", "user.email", "bot@example.com")
+    _git("config", "user.name", "bot")
+    kept = tmp_path / "Обед 2024-01-01 12-00.md"
+    removed = tmp_path / "[draft] note.md"
+    kept.write_text("a", encoding="utf-8")
+    removed.write_text("b", encoding="utf-8")
+    (tmp_path / "unrelated.md").write_text("c", encoding="utf-8")
+
+    action = git_action(tmp_path)
+    action([kept, removed])
+    removed.unlink()
+    action([removed, tmp_path / "never existed.md"])
+
+    assert _git("rev-list", "--count", "HEAD").strip() == "2"
+    assert _git("-c", "core.quotepath=off", "ls-files").splitlines() == [kept.name]
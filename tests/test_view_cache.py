@@ -0,0 +1,74 @@
+import asyncio
+import os
+import threading
+from datetime import date
+
+import pytest
+
+from time_bot import vault_events
+from time_bot.bot.view_cache import ViewCache
+from time_bot.models import MessageClassification, TimeEntry
+from time_bot.pipeline import process_message_text
+
+
+@pytest.fixture()
+def cache(clock):
+    view_cache = ViewCache(max_age_seconds=60, clock=clock)
+    view_cache.clock = clock
+    vault_events.add_listener(view_cache.invalidate)
+    yield view_cache
+    vault_events.remove_listener(view_cache.invalidate)
+
+
+@pytest.mark.anyio
+async def test_cached_until_write_folder_change_or_ttl(tmp_path, monkeypatch, cache):
+    builds = []
+    loop_thread = threading.get_ident()
+
+    def _build():
+        builds.append(threading.get_ident())
+        return f"build {len(builds)}"
+
+    async def _get():
+        return await cache.get("stats", _build, note_types=("time_log",), folders=[tmp_path])
+
+    assert await _get() == "build 1"
+    assert await _get() == "build 1"
+    assert loop_thread not in builds
+
+    vault_events.note_written("task", tmp_path / "task.md")
+    assert await _get() == "build 1"
+
+    async def _fake_classify(message_text: str):
+        return MessageClassification(intent="time_log", raw_text=message_text)
+
+    async def _fake_parse(message_text: str, today: date):
+        return TimeEntry(title="Обед", raw_text=message_text, minutes=30, date=today, maintag="rt")
+
+    monkeypatch.setattr("time_bot.pipeline.classify_message_intent", _fake_classify)
+    monkeypatch.setattr("time_bot.pipeline.parse_time_entry_with_sgr", _fake_parse)
+    await process_message_text("30 минут обед", today=date(2024, 1, 1), output_dir=tmp_path / "out")
+    assert await _get() == "build 2"
+
+    os.utime(tmp_path, ns=(0, 1))
+    assert await _get() == "build 3"
+
+    cache.clock.now = 61
+    assert await _get() == "build 4"
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_share_one_build(cache):
+    release = threading.Event()
+    calls = []
+
+    def _build():
+        calls.append(1)
+        release.wait(5)
+        return "tasks"
+
+    tasks = [asyncio.create_task(cache.get("tasks", _build, note_types=("task",))) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    release.set()
+    assert await asyncio.gather(*tasks) == ["tasks"] * 5
+    assert len(calls) == 1